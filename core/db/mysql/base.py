@@ -0,0 +1,14 @@
+from django.db.backends.mysql import base
+
+from core.db.pool import PooledConnectionMixin
+
+
+class DatabaseWrapper(PooledConnectionMixin, base.DatabaseWrapper):
+    """Бэкенд MySQL с пулом соединений ([MySQL Database] pool_size), см. core/db/pool.py."""
+
+    def is_raw_connection_usable(self, connection):
+        try:
+            connection.ping()
+        except self.Database.Error:
+            return False
+        return True
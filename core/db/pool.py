@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+
+class ConnectionPool:
+    """
+    Пул соединений с БД на процесс, общий для всех потоков: потоков WSGI-сервера
+    и потоков, в которых под ASGI выполняются синхронные представления и
+    запросы асинхронного ORM. Django по-прежнему закрывает соединение в конце
+    запроса, но закрытие возвращает его в пул, и следующий запрос в любом
+    потоке берет готовое соединение без подключения и init_command.
+
+    size - сколько соединений может быть открыто (выданных и свободных);
+    если все заняты, запрос ждет освободившееся до timeout секунд.
+    max_age - время жизни соединения в секундах (None - без ограничения).
+    health_checks - проверять свободное соединение перед выдачей.
+    """
+
+    def __init__(self, size, timeout=10, max_age=None, health_checks=False):
+        self.size = size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.health_checks = health_checks
+        self.created = 0
+        self._idle = deque()
+        self._created_at = {}
+        self._open = 0
+        self._condition = threading.Condition()
+
+    def _expired(self, created_at):
+        return self.max_age is not None and time.monotonic() - created_at >= self.max_age
+
+    def acquire(self, connect, is_usable):
+        """
+        Соединение из пула. connect() открывает новое, is_usable(connection) -
+        проверка свободного соединения при health_checks.
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            connection = self._take(deadline)
+            if connection is None:
+                return self._connect(connect)
+            if self.health_checks and not is_usable(connection):
+                self._discard(connection)
+                continue
+            return connection
+
+    def _take(self, deadline):
+        """Свободное соединение или None, если можно открыть новое (место уже занято)."""
+        stale = []
+        try:
+            with self._condition:
+                while True:
+                    while self._idle:
+                        connection = self._idle.pop()
+                        if not self._expired(self._created_at[id(connection)]):
+                            return connection
+                        stale.append(connection)
+                        self._forget(connection)
+                    if self._open < self.size:
+                        self._open += 1
+                        return None
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise OperationalError(
+                            f"Нет свободных соединений в пуле ({self.size}) за {self.timeout} с."
+                        )
+                    self._condition.wait(remaining)
+        finally:
+            for connection in stale:
+                _close_quietly(connection)
+
+    def _connect(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._created_at[id(connection)] = time.monotonic()
+            self.created += 1
+        return connection
+
+    def _forget(self, connection):
+        # Вызывается под self._condition
+        self._created_at.pop(id(connection), None)
+        self._open -= 1
+        self._condition.notify()
+
+    def _discard(self, connection):
+        with self._condition:
+            self._forget(connection)
+        _close_quietly(connection)
+
+    def release(self, connection, reusable=True):
+        """Возвращает соединение в пул; reusable=False - закрыть (после ошибки)."""
+        with self._condition:
+            created_at = self._created_at.get(id(connection))
+            if reusable and created_at is not None and not self._expired(created_at):
+                self._idle.append(connection)
+                self._condition.notify()
+                return
+        if created_at is not None:
+            self._discard(connection)
+        else:
+            _close_quietly(connection)
+
+    def close_all(self):
+        """Закрывает свободные соединения; выданные закроются при возврате."""
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+            for connection in idle:
+                self._forget(connection)
+        for connection in idle:
+            _close_quietly(connection)
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options):
+    """
+    Пул для алиаса БД в текущем процессе. После fork (gunicorn --preload)
+    у дочернего процесса свой пул: соединения родителя не используются.
+    """
+    key = (os.getpid(), alias)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(
+                    size=options.get('size', 10),
+                    timeout=options.get('timeout', 10),
+                    max_age=options.get('max_age'),
+                    health_checks=options.get('health_checks', False),
+                )
+    return pool
+
+
+def close_pools():
+    for pool in list(_pools.values()):
+        pool.close_all()
+
+
+class PooledConnectionMixin:
+    """
+    Примесь к DatabaseWrapper бэкенда Django: соединения берутся из
+    ConnectionPool, параметры - из OPTIONS['pool'] ({'size', 'timeout',
+    'max_age', 'health_checks'}). Без OPTIONS['pool'] бэкенд работает как обычно.
+    CONN_MAX_AGE при пуле должен быть 0: соединение возвращается в пул в
+    конце каждого запроса, а время его жизни ограничивает max_age.
+    """
+
+    def get_pool_options(self):
+        return self.settings_dict['OPTIONS'].get('pool')
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.get_pool_options())
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        if not self.get_pool_options():
+            return connect(conn_params)
+        return self.pool.acquire(lambda: connect(conn_params), self.is_raw_connection_usable)
+
+    def is_raw_connection_usable(self, connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        except self.Database.Error:
+            return False
+        finally:
+            cursor.close()
+        return True
+
+    def _close(self):
+        if self.connection is None or not self.get_pool_options():
+            return super()._close()
+        # После ошибки соединения состояние сессии неизвестно, в пул его не возвращаем
+        reusable = not self.errors_occurred
+        if reusable and (self.in_atomic_block or not self.autocommit):
+            try:
+                self.connection.rollback()
+            except self.Database.Error:
+                reusable = False
+        self.pool.release(self.connection, reusable)
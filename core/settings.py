@@ -15,12 +15,81 @@ except configparser.Error as e:
     exit()
 
 try:
+    # СУБД: mysql (секция [MySQL Database]) или sqlite (файл sqlite_path относительно каталога проекта)
+    DB_ENGINE = config.get('Database', 'engine', fallback='mysql')
+    DB_SQLITE_PATH = config.get('Database', 'sqlite_path', fallback='db.sqlite3')
     DB_NAME = config['MySQL Database']['name']
     DB_USER = config['MySQL Database']['user']
     DB_PASSWORD = config['MySQL Database']['password']
     DB_HOST = config['MySQL Database']['host']
     DB_PORT = config['MySQL Database']['port']
+    # Повторное использование соединений: conn_max_age - время жизни соединения в секундах
+    # (0 - новое соединение на каждый запрос), health_checks - проверять соединение перед
+    # повторным использованием, pool_size > 0 - пул соединений на процесс, общий для
+    # потоков WSGI и ASGI (запрос ждет свободное соединение до pool_timeout секунд)
+    DB_CONN_MAX_AGE = config.getint('MySQL Database', 'conn_max_age', fallback=0)
+    DB_HEALTH_CHECKS = config.getboolean('MySQL Database', 'health_checks', fallback=False)
+    DB_POOL_SIZE = config.getint('MySQL Database', 'pool_size', fallback=0)
+    DB_POOL_TIMEOUT = config.getfloat('MySQL Database', 'pool_timeout', fallback=10)
     PAGE_SIZE = config['Other']['page_size']
+    # Размер части для пакетных запросов (IN (...) и bulk_create)
+    BULK_CHUNK_SIZE = config.getint('Other', 'bulk_chunk_size', fallback=1000)
+    # Сколько скомпилированных масок серийных номеров держать в кэше процесса
+    MASK_CACHE_SIZE = config.getint('Other', 'mask_cache_size', fallback=256)
+
+    # Проверка масок больших пакетов в пуле процессов: пакеты от parallel_threshold
+    # номеров делятся между workers процессами (0 - по числу ядер)
+    VALIDATION_PARALLEL_THRESHOLD = config.getint('Validation', 'parallel_threshold', fallback=200000)
+    VALIDATION_WORKERS = config.getint('Validation', 'workers', fallback=0)
+
+    # Реестр типов оборудования в памяти перечитывается при изменении типов,
+    # но не реже чем раз в type_registry_max_age секунд
+    TYPE_REGISTRY_MAX_AGE = config.getint('Other', 'type_registry_max_age', fallback=60)
+
+    # Подсчет count в списках: exact | cached | estimate
+    COUNT_MODE = config.get('Count', 'mode', fallback='exact')
+    COUNT_CACHE_TTL = config.getint('Count', 'cache_ttl', fallback=60)
+    COUNT_ESTIMATE_THRESHOLD = config.getint('Count', 'estimate_threshold', fallback=100000)
+
+    # Поиск по serial_number/note: trigram | fulltext (только MySQL) | none
+    SEARCH_BACKEND = config.get('Search', 'backend', fallback='trigram')
+
+    # Фоновые задания импорта
+    IMPORT_JOB_LEASE_SECONDS = config.getint('Jobs', 'lease_seconds', fallback=300)
+    IMPORT_JOB_MAX_ATTEMPTS = config.getint('Jobs', 'max_attempts', fallback=3)
+    IMPORT_JOB_POLL_INTERVAL = config.getfloat('Jobs', 'poll_interval', fallback=2)
+
+    # Аутентификация
+    AUTH_MODE = config.get('Auth', 'mode', fallback='db')
+    AUTH_USER_CACHE_TTL = config.getint('Auth', 'user_cache_ttl', fallback=60)
+    AUTH_UPDATE_LAST_LOGIN = config.getboolean('Auth', 'update_last_login', fallback=True)
+
+    # Лента изменений: сколько секунд перечитывать пропущенные номера журнала
+    CHANGES_GAP_TIMEOUT_SECONDS = config.getfloat('Changes', 'gap_timeout_seconds', fallback=300)
+
+    # Удаленное оборудование старше after_days дней переносится в архив (manage.py archive_equipment)
+    ARCHIVE_AFTER_DAYS = config.getint('Archive', 'after_days', fallback=90)
+
+    CACHE_BACKEND = config.get('Cache', 'backend', fallback='django.core.cache.backends.locmem.LocMemCache')
+    CACHE_LOCATION = config.get('Cache', 'location', fallback='')
+    RESPONSE_CACHE_ENABLED = config.getboolean('Cache', 'response_cache', fallback=False)
+    RESPONSE_CACHE_TTL = config.getint('Cache', 'response_cache_ttl', fallback=300)
+    # Сервер работает одним процессом: локального кэша достаточно для ETag и кэшей версий
+    CACHE_SINGLE_PROCESS = config.getboolean('Cache', 'single_process', fallback=False)
+
+    # Замеры запросов: доля запросов с Server-Timing и гистограммами /metrics (0 - выключено),
+    # порог журнала медленных запросов к БД в мс (0 - выключен), токен доступа к /metrics
+    METRICS_SAMPLE_RATE = config.getfloat('Metrics', 'sample_rate', fallback=0.0)
+    METRICS_SERVER_TIMING = config.getboolean('Metrics', 'server_timing', fallback=True)
+    METRICS_SLOW_QUERY_MS = config.getfloat('Metrics', 'slow_query_ms', fallback=0)
+    METRICS_TOKEN = config.get('Metrics', 'token', fallback='')
+
+    # Сжатие ответов API (списки, выгрузка) по Accept-Encoding: ответы от min_size байт,
+    # уровень gzip и качество brotli (brotli - если установлен пакет brotli)
+    COMPRESSION_ENABLED = config.getboolean('Compression', 'enabled', fallback=True)
+    COMPRESSION_MIN_SIZE = config.getint('Compression', 'min_size', fallback=1024)
+    COMPRESSION_GZIP_LEVEL = config.getint('Compression', 'gzip_level', fallback=6)
+    COMPRESSION_BROTLI_QUALITY = config.getint('Compression', 'brotli_quality', fallback=5)
 except KeyError as e:
     print(f"Отсутствует ключ в секции 'MySQL Database' в settings.ini: {e}")
     exit()
@@ -51,6 +120,8 @@ INSTALLED_APPS = [
 CORS_ALLOW_ALL_ORIGINS = True 
 
 MIDDLEWARE = [
+    'equipment.middleware.InstrumentationMiddleware',
+    'equipment.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -79,6 +150,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
 DATABASES = {
     'default': {
@@ -88,12 +160,37 @@ DATABASES = {
         'PASSWORD': DB_PASSWORD,
         'HOST': DB_HOST,
         'PORT': DB_PORT,
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': DB_HEALTH_CHECKS,
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
     }
 }
 
+if DB_POOL_SIZE > 0:
+    # Соединение возвращается в пул в конце каждого запроса (CONN_MAX_AGE=0),
+    # conn_max_age ограничивает время его жизни в пуле (0 - без ограничения)
+    DATABASES['default'].update({
+        'ENGINE': 'core.db.mysql',
+        'CONN_MAX_AGE': 0,
+    })
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'size': DB_POOL_SIZE,
+        'timeout': DB_POOL_TIMEOUT,
+        'max_age': DB_CONN_MAX_AGE or None,
+        'health_checks': DB_HEALTH_CHECKS,
+    }
+
+if DB_ENGINE == 'sqlite':
+    # Локальная база без сервера, например для бенчмарков (manage.py bench_api)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / DB_SQLITE_PATH,
+        }
+    }
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -120,14 +217,30 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# SPA: исходная страница и сборка manage.py build_spa (файлы с хешем, .gz и .br)
+SPA_SOURCE_DIR = os.path.join(BASE_DIR, 'public')
+SPA_BUILD_DIR = os.path.join(BASE_DIR, 'public', 'dist')
+
+# Кэш хранит счетчики версий данных и кэшированные count. При нескольких
+# процессах (gunicorn workers) нужен общий бэкенд, например
+# django.core.cache.backends.memcached.PyMemcacheCache или FileBasedCache.
+# С локальным бэкендом ETag, кэш страниц и count_mode=cached отключены,
+# если не задан [Cache] single_process=true (equipment/versions.py).
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+    }
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'equipment.pagination.CountStrategyPagination',
     'PAGE_SIZE': PAGE_SIZE,
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication'
+        'equipment.authentication.EquipmentJWTAuthentication',
     ),
 
     'DEFAULT_PERMISSION_CLASSES': (
@@ -146,7 +259,7 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),    # Время жизни refresh токена
     'ROTATE_REFRESH_TOKENS': False, # Если True, при каждом обновлении будет выдаваться новый refresh токен
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True, # Обновлять last_login пользователя при логине
+    'UPDATE_LAST_LOGIN': AUTH_UPDATE_LAST_LOGIN, # Обновлять last_login пользователя при логине ([Auth] update_last_login)
 
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY, # Использует SECRET_KEY из Django настроек
@@ -165,6 +278,8 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
+    'TOKEN_OBTAIN_SERIALIZER': 'equipment.authentication.EquipmentTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'equipment.authentication.EquipmentTokenRefreshSerializer',
 
     'JTI_CLAIM': 'jti',
 
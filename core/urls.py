@@ -4,14 +4,14 @@ from rest_framework_simplejwt.views import ( # Для эндпоинта /api/us
     TokenObtainPairView,
     TokenRefreshView,
 )
-from django.views.static import serve 
-from django.conf import settings 
-import os
+from equipment.views import metrics_view, spa_asset_view, spa_view
 
 urlpatterns = [
-    path('', serve, {'document_root': os.path.join(settings.BASE_DIR, 'public'), 'path': 'index.html'}),
+    path('', spa_view, name='spa'),
+    path('assets/<str:name>', spa_asset_view, name='spa_asset'),
     path('admin/', admin.site.urls),
     path('api/', include('equipment.urls')),
     path('api/user/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('metrics', metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,26 +1,60 @@
-from django.contrib import admin
-from .models import EquipmentType, Equipment
+from django.contrib import admin, messages
+from django.utils import timezone
+from .models import ArchivedEquipment, EquipmentType, Equipment, ImportJob
+from .bulk import RESULT_CONFLICT, undelete_equipment
+from .signals import ACTION_DELETE, notify_equipment_changed
 
 @admin.register(EquipmentType)
 class EquipmentTypeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'serial_number_mask')
+    list_display = ('id', 'name', 'serial_number_mask', 'stats__active_count', 'stats__deleted_count')
+    list_select_related = ('stats',)
     search_fields = ('name',)
 
 @admin.register(Equipment)
 class EquipmentAdmin(admin.ModelAdmin):
-    list_display = ('id', 'equipment_type', 'serial_number', 'note', 'is_deleted')
+    list_display = ('id', 'equipment_type', 'serial_number', 'note', 'is_deleted', 'deleted_at')
     list_filter = ('equipment_type', 'is_deleted')
     search_fields = ('serial_number', 'note')
     actions = ['mark_deleted', 'mark_undeleted']
 
     def mark_deleted(self, request, queryset):
-        queryset.update(is_deleted=True)
+        ids = list(queryset.filter(is_deleted=False).values_list('pk', flat=True))
+        Equipment.objects.filter(pk__in=ids).update(is_deleted=True, deleted_at=timezone.now())
+        notify_equipment_changed(ids, ACTION_DELETE)
     mark_deleted.short_description = "Пометить как удаленные"
 
     def mark_undeleted(self, request, queryset):
-        queryset.update(is_deleted=False)
+        ids = list(queryset.filter(is_deleted=True).values_list('pk', flat=True))
+        # Номер может быть уже занят активной записью того же типа
+        for result in undelete_equipment(ids):
+            if result["status"] == RESULT_CONFLICT:
+                self.message_user(request, f"#{result['id']}: {result['error']}", level=messages.WARNING)
     mark_undeleted.short_description = "Снять пометку удаленные"
 
     def get_queryset(self, request):
         # Показываем все записи в админке, включая "удаленные"
-        return Equipment.objects.all()
\ No newline at end of file
+        return Equipment.objects.all()
+
+@admin.register(ArchivedEquipment)
+class ArchivedEquipmentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'equipment_type', 'serial_number', 'note', 'deleted_at', 'archived_at')
+    list_filter = ('equipment_type',)
+    search_fields = ('serial_number', 'note')
+    readonly_fields = ('id', 'equipment_type', 'serial_number', 'note', 'deleted_at', 'archived_at')
+    actions = ['restore']
+
+    def restore(self, request, queryset):
+        ids = list(queryset.values_list('pk', flat=True))
+        for result in undelete_equipment(ids):
+            if result["status"] == RESULT_CONFLICT:
+                self.message_user(request, f"#{result['id']}: {result['error']}", level=messages.WARNING)
+    restore.short_description = "Вернуть из архива"
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'total_rows', 'processed_rows', 'created_count', 'error_count', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('user', 'total_rows', 'processed_rows', 'created_count', 'error_count', 'chunk_count', 'created_at', 'started_at', 'finished_at')
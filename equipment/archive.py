@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import transaction
+
+from .models import ArchivedEquipment, Equipment, EquipmentSearchToken
+from . import versions
+
+
+def get_archive_after_days():
+    return getattr(settings, 'ARCHIVE_AFTER_DAYS', 90)
+
+
+def archive_deleted_equipment(before, batch_size=None, log=None):
+    """
+    Переносит в ArchivedEquipment записи, мягко удаленные раньше before.
+    Каждая часть из batch_size записей (по возрастанию id) переносится своей
+    транзакцией, поэтому прерванный запуск можно просто повторить.
+    Возвращает число перенесенных записей.
+    """
+    batch_size = batch_size or getattr(settings, 'BULK_CHUNK_SIZE', 1000)
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Equipment.objects.select_for_update()
+                .filter(is_deleted=True, deleted_at__lt=before)
+                .order_by('pk')[:batch_size]
+            )
+            if not rows:
+                break
+            ids = [item.pk for item in rows]
+            ArchivedEquipment.objects.bulk_create([
+                ArchivedEquipment(id=item.pk, equipment_type_id=item.equipment_type_id,
+                                  serial_number=item.serial_number, note=item.note,
+                                  deleted_at=item.deleted_at)
+                for item in rows
+            ])
+            EquipmentSearchToken.objects.filter(equipment_id__in=ids).delete()
+            # Без сигналов post_delete: запись не удаляется, а переезжает, в журнал
+            # изменений она не попадает (для клиентов она по-прежнему удалена)
+            queryset = Equipment.objects.filter(pk__in=ids)
+            queryset._raw_delete(queryset.db)
+            versions.bump_version_on_commit(versions.EQUIPMENT)
+        total += len(ids)
+        if log:
+            log(f"Перенесено в архив: {total}")
+    return total
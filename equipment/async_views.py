@@ -0,0 +1,174 @@
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException, AuthenticationFailed, NotAuthenticated, NotFound, ParseError, PermissionDenied
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .authentication import EquipmentJWTAuthentication
+from .conditional import get_response_cache_ttl, response_cache_enabled, response_cache_key
+from .export import ASYNC_EXPORT_STREAMS, EXPORT_FORMATS
+from .lean import ListEncoder
+from .records import RecordQuerySet
+from .registry import type_registry
+from .stats import aget_type_stats
+from .versions import versions_shared
+from .views import EquipmentTypeViewSet, EquipmentViewSet
+
+
+class AsyncReadView(View):
+    """
+    Асинхронные list/retrieve для ASGI (uvicorn, daphne). Рядом с синхронными
+    ViewSet, а не вместо них: запросы, фильтры, пагинация, сериализатор и ETag
+    берутся у viewset_class, поэтому ответы совпадают с /api/...
+
+    Под WSGI такое представление тоже работает, но каждый запрос выполняется
+    через async_to_sync. Под ASGI запрос не занимает поток: 304 по ETag,
+    ответы из кэша и аутентификация в режимах cached/stateless обходятся без
+    потоков, а каждый запрос к БД асинхронного ORM Django уходит в поток
+    только на время самого запроса.
+    """
+    viewset_class = None
+    # list | retrieve | export, задается в as_view()
+    action = None
+    authentication_class = EquipmentJWTAuthentication
+    http_method_names = ['get', 'head', 'options']
+    renderer = JSONRenderer()
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request)
+        try:
+            await self.authenticate(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(request, exc)
+
+    async def authenticate(self, request):
+        authenticator = self.authentication_class()
+        result = await authenticator.aauthenticate(request)
+        if result is not None:
+            request.user, request.auth = result
+        # Request без аутентификаторов: при обращении к user не пытается аутентифицировать заново
+        request.authenticators = ()
+        viewset = self.get_viewset(request)
+        for permission in viewset.get_permissions():
+            if not permission.has_permission(request, viewset):
+                if result is None:
+                    raise NotAuthenticated()
+                raise PermissionDenied(getattr(permission, 'message', None))
+
+    def handle_exception(self, request, exc):
+        """Ответ об ошибке в том же формате, что у DRF."""
+        detail = exc.detail
+        response = self.render(detail if isinstance(detail, (list, dict)) else {'detail': detail}, exc.status_code)
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            response['WWW-Authenticate'] = self.authentication_class().authenticate_header(request)
+        return response
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        return HttpResponse(self.renderer.render(data), status=status_code, content_type=self.renderer.media_type)
+
+    def get_viewset(self, request, **kwargs):
+        return self.viewset_class(
+            request=request, action=self.action, format_kwarg=None, args=(), kwargs=kwargs, headers={}
+        )
+
+    async def get(self, request, **kwargs):
+        # Фильтры и сериализатор обращаются к реестру типов синхронно
+        await type_registry.arefresh()
+        viewset = self.get_viewset(request, **kwargs)
+        if self.action == 'export':
+            return await self.export(request, viewset)
+
+        if not versions_shared():
+            # Как у ConditionalResponseMixin: без общих версий ответ без ETag и кэша
+            return self.render(await self.read(request, viewset, **kwargs))
+
+        etag = viewset.get_etag(request)
+        if viewset._not_modified(request, etag):
+            return viewset._finalize_conditional(HttpResponse(status=status.HTTP_304_NOT_MODIFIED), etag)
+        if self.action == 'list' and response_cache_enabled():
+            cache_key = response_cache_key(etag)
+            data = await cache.aget(cache_key)
+            if data is None:
+                data = await self.list(request, viewset)
+                await cache.aset(cache_key, data, get_response_cache_ttl())
+        else:
+            data = await self.read(request, viewset, **kwargs)
+        return viewset._finalize_conditional(self.render(data), etag)
+
+    async def read(self, request, viewset, **kwargs):
+        if self.action == 'retrieve':
+            return await self.retrieve(request, viewset, **kwargs)
+        return await self.list(request, viewset)
+
+    async def list(self, request, viewset):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        paginator = viewset.paginator
+        if paginator is None:
+            objects = [obj async for obj in queryset] if isinstance(queryset, (QuerySet, RecordQuerySet)) else list(queryset)
+            return await self.serialize(viewset, objects, many=True)
+        page = await paginator.apaginate_queryset(queryset, request, view=viewset)
+        return paginator.get_paginated_data(await self.serialize(viewset, page, many=True))
+
+    async def retrieve(self, request, viewset, pk):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        obj = await queryset.filter(pk=pk).afirst()
+        if obj is None:
+            raise NotFound(f"No {queryset.model._meta.object_name} matches the given query.")
+        return await self.serialize(viewset, obj)
+
+    async def serialize(self, viewset, data, many=False):
+        """Сериализатор viewset_class; данные, которые он читает из БД, нужно загрузить заранее."""
+        return viewset.get_serializer(data, many=many).data
+
+    async def export(self, request, viewset):
+        raise NotFound()
+
+
+class EquipmentTypeAsyncView(AsyncReadView):
+    """
+    GET /api/async/equipment-type/ и /api/async/equipment-type/<id>/ -
+    то же, что /api/equipment-type/. Список без фильтров отдается из реестра типов.
+    """
+    viewset_class = EquipmentTypeViewSet
+
+    async def serialize(self, viewset, data, many=False):
+        # Статистика типов читается асинхронно и передается сериализатору готовой
+        objects = data if many else [data]
+        context = viewset.get_serializer_context()
+        context['type_stats'] = await aget_type_stats([obj.pk for obj in objects])
+        return viewset.get_serializer(data, many=many, context=context).data
+
+
+class EquipmentAsyncView(AsyncReadView):
+    """
+    GET /api/async/equipment/, /api/async/equipment/<id>/ и
+    /api/async/equipment/export/ - то же, что /api/equipment/...
+    с теми же фильтрами, поиском, пагинацией и is_deleted.
+    """
+    viewset_class = EquipmentViewSet
+
+    async def list(self, request, viewset):
+        # Тот же быстрый путь, что у EquipmentViewSet.list
+        encoder = ListEncoder.from_request(request)
+        queryset = viewset.get_list_queryset(encoder)
+        page = await viewset.paginator.apaginate_queryset(queryset, request, view=viewset)
+        results, types = encoder.encode(page)
+        data = viewset.paginator.get_paginated_data(results)
+        if types is not None:
+            data['equipment_types'] = types
+        return data
+
+    async def export(self, request, viewset):
+        output = request.query_params.get('output', 'csv')
+        if output not in ASYNC_EXPORT_STREAMS:
+            raise ParseError(f"Неизвестный формат выгрузки '{output}', допустимые: {', '.join(ASYNC_EXPORT_STREAMS)}.")
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        response = StreamingHttpResponse(ASYNC_EXPORT_STREAMS[output](queryset), content_type=EXPORT_FORMATS[output])
+        response['Content-Disposition'] = f'attachment; filename="equipment.{output}"'
+        return response
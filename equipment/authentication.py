@@ -0,0 +1,191 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import TokenRevocation
+
+
+AUTH_MODE_DB = 'db'
+AUTH_MODE_CACHED = 'cached'
+AUTH_MODE_STATELESS = 'stateless'
+AUTH_MODES = (AUTH_MODE_DB, AUTH_MODE_CACHED, AUTH_MODE_STATELESS)
+
+# Время входа: копируется из refresh-токена во все выданные по нему access-токены,
+# по нему проверяется отзыв
+AUTH_TIME_CLAIM = 'auth_time'
+
+
+def get_auth_mode():
+    mode = getattr(settings, 'AUTH_MODE', AUTH_MODE_DB)
+    if mode not in AUTH_MODES:
+        raise ImproperlyConfigured(
+            f"Неизвестный режим аутентификации '{mode}', допустимые: {', '.join(AUTH_MODES)}."
+        )
+    return mode
+
+
+def get_user_cache_ttl():
+    return getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+
+
+def _user_key(user_id):
+    return f"equipment:auth:user:{user_id}"
+
+
+def _revoked_key(user_id):
+    return f"equipment:auth:revoked:{user_id}"
+
+
+# Значение в кэше для пользователя без отзыва (None - значения в кэше нет)
+NOT_REVOKED = 0
+
+
+def forget_user(user_id):
+    """Убирает пользователя из кэша: следующий запрос перечитает его из БД."""
+    cache.delete(_user_key(user_id))
+
+
+def revoke_user_tokens(user_id):
+    """
+    Отзывает все токены пользователя, выданные до этого момента (в том числе
+    refresh: новые access по ним не выдаются). Отметка хранится в БД и
+    работает во всех процессах; кэш Django - только ускорение чтения. При
+    общем кэше отзыв действует сразу, при локальном кэше другие процессы
+    увидят его не позже чем через user_cache_ttl секунд.
+    """
+    revoked_at = time.time()
+    TokenRevocation.objects.update_or_create(user_id=user_id, defaults={'revoked_at': revoked_at})
+    forget_user(user_id)
+    cache.set(_revoked_key(user_id), revoked_at, timeout=get_user_cache_ttl())
+
+
+def get_revoked_at(user_id):
+    """Время отзыва токенов пользователя или NOT_REVOKED: из кэша, при промахе - из БД."""
+    revoked_at = cache.get(_revoked_key(user_id))
+    if revoked_at is None:
+        revoked_at = (
+            TokenRevocation.objects.filter(user_id=user_id).values_list('revoked_at', flat=True).first()
+            or NOT_REVOKED
+        )
+        cache.set(_revoked_key(user_id), revoked_at, timeout=get_user_cache_ttl())
+    return revoked_at
+
+
+async def aget_revoked_at(user_id):
+    """get_revoked_at() для async-представлений."""
+    revoked_at = cache.get(_revoked_key(user_id))
+    if revoked_at is None:
+        revoked_at = (
+            await TokenRevocation.objects.filter(user_id=user_id).values_list('revoked_at', flat=True).afirst()
+            or NOT_REVOKED
+        )
+        cache.set(_revoked_key(user_id), revoked_at, timeout=get_user_cache_ttl())
+    return revoked_at
+
+
+def check_revocation(token, revoked_at):
+    if revoked_at == NOT_REVOKED:
+        return
+    auth_time = token.get(AUTH_TIME_CLAIM, token.get('iat'))
+    if auth_time is None or auth_time <= revoked_at:
+        raise AuthenticationFailed("Токен отозван.", code="token_revoked")
+
+
+def check_not_revoked(token):
+    check_revocation(token, get_revoked_at(token.get(api_settings.USER_ID_CLAIM)))
+
+
+class EquipmentJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация с выбором способа получения пользователя ([Auth] mode):
+
+    - db - как JWTAuthentication: пользователь читается из БД на каждый запрос;
+    - cached - пользователь берется из кэша Django на user_cache_ttl секунд;
+      при сохранении или удалении пользователя запись кэша сбрасывается;
+    - stateless - без обращения к БД: пользователь - TokenUser по утверждениям
+      токена (user_id, username, is_staff), которые записываются при входе.
+
+    Во всех режимах проверяется отзыв токенов (revoke_user_tokens()): чтение
+    из кэша, а при промахе - запрос к БД не чаще раза в user_cache_ttl секунд
+    на пользователя. Смена пароля, деактивация и удаление пользователя отзывают
+    его токены, см. equipment/signals.py.
+    """
+
+    def get_user(self, validated_token):
+        check_not_revoked(validated_token)
+        user = self.get_user_without_db(validated_token)
+        if user is None:
+            user = super().get_user(validated_token)
+            self.remember_user(validated_token, user)
+        return user
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() для async-представлений (equipment/async_views.py).
+        Если пользователь есть в токене или в кэше, запрос обходится без
+        потоков; чтение пользователя из БД выполняется в потоке.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        revoked_at = await aget_revoked_at(validated_token.get(api_settings.USER_ID_CLAIM))
+        check_revocation(validated_token, revoked_at)
+        user = self.get_user_without_db(validated_token)
+        if user is None:
+            user = await sync_to_async(super().get_user)(validated_token)
+            self.remember_user(validated_token, user)
+        return user, validated_token
+
+    def get_user_without_db(self, validated_token):
+        """Пользователь по токену (stateless) или из кэша (cached); None - нужен запрос к БД."""
+        mode = get_auth_mode()
+        if mode == AUTH_MODE_STATELESS:
+            if api_settings.USER_ID_CLAIM not in validated_token:
+                raise InvalidToken("Токен не содержит идентификатор пользователя.")
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+        if mode == AUTH_MODE_CACHED:
+            user = cache.get(_user_key(validated_token.get(api_settings.USER_ID_CLAIM)))
+            if user is not None and api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+                raise AuthenticationFailed("Пользователь неактивен.", code="user_inactive")
+            return user
+        return None
+
+    def remember_user(self, validated_token, user):
+        if get_auth_mode() == AUTH_MODE_CACHED:
+            cache.set(_user_key(validated_token.get(api_settings.USER_ID_CLAIM)), user, timeout=get_user_cache_ttl())
+
+
+class EquipmentTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Выдача токенов при входе. В токены добавляются время входа и утверждения,
+    нужные режиму stateless (username, is_staff).
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[AUTH_TIME_CLAIM] = time.time()
+        token['username'] = user.get_username()
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        return token
+
+
+class EquipmentTokenRefreshSerializer(TokenRefreshSerializer):
+    """Обновление access-токена с проверкой отзыва refresh-токена."""
+
+    def validate(self, attrs):
+        check_not_revoked(RefreshToken(attrs['refresh']))
+        return super().validate(attrs)
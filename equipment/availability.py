@@ -0,0 +1,118 @@
+from django.db import connection
+
+from .bulk import chunked, get_bulk_chunk_size
+from .masks import partition_serial_numbers
+from .models import ArchivedEquipment, Equipment, EquipmentType
+from .registry import type_registry
+
+# Максимум пар (тип, номер) в одном запросе проверки
+MAX_CHECK_ITEMS = 500000
+
+# Состояния номера: есть действующая запись, есть только удаленные, нет записей.
+# Отдельно - номера, не подходящие под маску типа
+STATUS_FOUND = 'found'
+STATUS_DELETED = 'deleted'
+STATUS_NOT_FOUND = 'not_found'
+STATUS_INVALID = 'invalid'
+STATUSES = (STATUS_FOUND, STATUS_DELETED, STATUS_NOT_FOUND, STATUS_INVALID)
+
+
+def group_by_type(pairs):
+    """Пары (тип, номер) -> {тип: [номера]}; повторы убираются, порядок запроса сохраняется."""
+    groups = {}
+    for type_id, serial_number in pairs:
+        groups.setdefault(type_id, {})[serial_number] = None
+    return {type_id: list(serial_numbers) for type_id, serial_numbers in groups.items()}
+
+
+def check_serial_numbers(equipment_type, serial_numbers, chunk_size=None):
+    """
+    Состояние номеров одного типа: один запрос IN (...) по индексу
+    (тип, серийный номер) на часть номеров, а для не найденных в основной
+    таблице - такой же проход по архиву. Возвращает словарь:
+    found - {номер: id действующей записи}, deleted - {номер: id последней
+    удаленной записи}, not_found - [номера], invalid - [номера не по маске].
+    Номера не по маске тоже ищутся: маска типа могла измениться после создания записей.
+    """
+    chunk_size = chunk_size or get_bulk_chunk_size()
+    found = {}
+    deleted = {}
+    for chunk in chunked(serial_numbers, chunk_size):
+        wanted = set(chunk)
+        rows = _select_by_serial_numbers(Equipment, ('serial_number', 'id', 'is_deleted'), equipment_type, chunk)
+        for serial_number, pk, is_deleted in rows:
+            # Регистронезависимая сортировка MySQL вернет и номер в другом регистре
+            if serial_number not in wanted:
+                continue
+            if not is_deleted:
+                found[serial_number] = pk
+            elif pk > deleted.get(serial_number, 0):
+                deleted[serial_number] = pk
+    missing = [sn for sn in serial_numbers if sn not in found and sn not in deleted]
+    for chunk in chunked(missing, chunk_size):
+        wanted = set(chunk)
+        rows = _select_by_serial_numbers(ArchivedEquipment, ('serial_number', 'id'), equipment_type, chunk)
+        for serial_number, pk in rows:
+            if serial_number in wanted and pk > deleted.get(serial_number, 0):
+                deleted[serial_number] = pk
+    for serial_number in found:
+        deleted.pop(serial_number, None)
+    _, invalid = partition_serial_numbers(equipment_type.get_mask_validator(), serial_numbers)
+    return {
+        STATUS_FOUND: found,
+        STATUS_DELETED: deleted,
+        STATUS_NOT_FOUND: [sn for sn in missing if sn not in deleted],
+        STATUS_INVALID: invalid,
+    }
+
+
+def _select_by_serial_numbers(model, fields, equipment_type, serial_numbers):
+    """
+    Значения fields строк model данного типа с номерами из serial_numbers.
+    SQL собирается вручную: ORM готовит каждое значение IN (...) отдельно,
+    и на частях по тысяче номеров это дольше самого запроса по индексу.
+    """
+    quote_name = connection.ops.quote_name
+    opts = model._meta
+    columns = ", ".join(quote_name(opts.get_field(field).column) for field in fields)
+    placeholders = ", ".join(["%s"] * len(serial_numbers))
+    sql = (
+        f"SELECT {columns} FROM {quote_name(opts.db_table)} "
+        f"WHERE {quote_name(opts.get_field('equipment_type').column)} = %s "
+        f"AND {quote_name(opts.get_field('serial_number').column)} IN ({placeholders})"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [equipment_type.pk, *serial_numbers])
+        return cursor.fetchall()
+
+
+def check_availability(groups, chunk_size=None):
+    """
+    Проверка наличия номеров по группам {тип: [номера]} (см. group_by_type).
+    Ответ: summary - число номеров в каждом состоянии, results - по одному
+    элементу на тип. Номера несуществующего типа не найдены и не подходят под маску.
+    """
+    types = type_registry.in_bulk(groups)
+    missing_types = set(groups) - set(types)
+    if missing_types:
+        # Тип создан только что и реестр еще не перечитан
+        types.update(EquipmentType.objects.in_bulk(missing_types))
+    summary = dict.fromkeys(STATUSES, 0)
+    results = []
+    for type_id, serial_numbers in groups.items():
+        equipment_type = types.get(type_id)
+        if equipment_type is None:
+            result = {
+                'equipment_type_id': type_id,
+                'error': "Указанный тип оборудования не существует.",
+                STATUS_FOUND: {},
+                STATUS_DELETED: {},
+                STATUS_NOT_FOUND: serial_numbers,
+                STATUS_INVALID: serial_numbers,
+            }
+        else:
+            result = {'equipment_type_id': type_id, **check_serial_numbers(equipment_type, serial_numbers, chunk_size)}
+        for status in STATUSES:
+            summary[status] += len(result[status])
+        results.append(result)
+    return {'summary': summary, 'results': results}
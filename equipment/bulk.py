@@ -0,0 +1,432 @@
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+
+from .masks import partition_serial_numbers
+from .models import ArchivedEquipment, Equipment
+from .registry import type_registry
+from .search import get_search_backend
+from .signals import ACTION_CREATE, ACTION_DELETE, ACTION_UNDELETE, ACTION_UPDATE, notify_equipment_changed
+
+# Результаты массовых операций по каждому id
+RESULT_DELETED = 'deleted'
+RESULT_UNDELETED = 'undeleted'
+RESULT_UPDATED = 'updated'
+RESULT_UNCHANGED = 'unchanged'
+RESULT_ALREADY_DELETED = 'already_deleted'
+RESULT_NOT_DELETED = 'not_deleted'
+RESULT_NOT_FOUND = 'not_found'
+RESULT_INVALID = 'invalid'
+RESULT_CONFLICT = 'conflict'
+
+# Результаты, которые не считаются ошибкой
+SUCCESS_RESULTS = frozenset({
+    RESULT_DELETED, RESULT_UNDELETED, RESULT_UPDATED, RESULT_UNCHANGED,
+    RESULT_ALREADY_DELETED, RESULT_NOT_DELETED,
+})
+
+
+def chunked(items, size):
+    """Разбивает последовательность на части не длиннее size."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def get_bulk_chunk_size():
+    return getattr(settings, 'BULK_CHUNK_SIZE', 1000)
+
+
+TYPE_NOT_FOUND_ERROR = "Указанный тип оборудования не существует."
+
+
+def _get_type(types, type_id):
+    """Тип из реестра, запомненный на время операции; None - типа нет (удален)."""
+    if type_id not in types:
+        types[type_id] = type_registry.get(type_id)
+    return types[type_id]
+
+
+def mask_error(serial_number, equipment_type):
+    return {
+        "serial_number": serial_number,
+        "error": f"Серийный номер '{serial_number}' не соответствует маске '{equipment_type.serial_number_mask}'."
+    }
+
+
+def duplicate_error(serial_number, equipment_type):
+    return {
+        "serial_number": serial_number,
+        "error": f"Оборудование с типом '{equipment_type.name}' и серийным номером '{serial_number}' уже существует."
+    }
+
+
+def create_failed_error(serial_number, exc):
+    return {
+        "serial_number": serial_number,
+        "error": f"Не удалось создать оборудование '{serial_number}': {str(exc)}"
+    }
+
+
+def find_existing_serial_numbers(equipment_type, serial_numbers, chunk_size=None):
+    """
+    Возвращает множество серийных номеров из serial_numbers, которые уже заняты
+    активным (не удаленным) оборудованием данного типа.
+    Один запрос с IN (...) на каждую часть вместо exists() на каждый номер.
+    """
+    chunk_size = chunk_size or get_bulk_chunk_size()
+    serial_numbers = list(serial_numbers)
+    existing = set()
+    for chunk in chunked(serial_numbers, chunk_size):
+        existing.update(
+            Equipment.objects.filter(
+                equipment_type=equipment_type,
+                serial_number__in=chunk,
+                is_deleted=False
+            ).values_list('serial_number', flat=True)
+        )
+    return existing
+
+
+def _insert_one_by_one(equipment_type, items, error_list):
+    """
+    Запасной путь для части, на которой bulk_create упал (например, параллельный
+    запрос успел занять номер). Каждая вставка в своей точке сохранения, чтобы
+    ошибка одного номера не откатывала остальные.
+    """
+    created = []
+    for position, sn, note in items:
+        try:
+            with transaction.atomic():
+                created.append(Equipment.objects.create(
+                    equipment_type=equipment_type,
+                    serial_number=sn,
+                    note=note
+                ))
+        except IntegrityError:
+            error_list.append((position, duplicate_error(sn, equipment_type)))
+        except Exception as e: # Ловим другие возможные ошибки при создании (например, проблемы с БД)
+            error_list.append((position, create_failed_error(sn, e)))
+    return created
+
+
+def _insert_chunk(equipment_type, items, error_list):
+    objs = [
+        Equipment(equipment_type=equipment_type, serial_number=sn, note=note)
+        for _, sn, note in items
+    ]
+    try:
+        with transaction.atomic():
+            Equipment.objects.bulk_create(objs)
+            if objs and objs[0].pk is None:
+                # MySQL не возвращает первичные ключи из bulk_create, дочитываем созданные
+                # записи одним запросом (пара тип + номер уникальна среди активных).
+                objs = list(
+                    Equipment.objects.filter(
+                        equipment_type=equipment_type,
+                        serial_number__in=[sn for _, sn, _ in items],
+                        is_deleted=False
+                    ).order_by('id')
+                )
+                for obj in objs:
+                    obj.equipment_type = equipment_type
+            # bulk_create не отправляет post_save, оповещаем явно в той же транзакции:
+            # записи журнала изменений и статистика типов фиксируются вместе со
+            # вставкой. Штучные вставки запасного пути оповещаются через post_save сами.
+            notify_equipment_changed([obj.pk for obj in objs], ACTION_CREATE)
+    except DatabaseError:
+        return _insert_one_by_one(equipment_type, items, error_list)
+    return objs
+
+
+def create_equipment_items(equipment_type, items, chunk_size=None):
+    """
+    Пакетное создание оборудования одного типа из пар (серийный номер, примечание).
+
+    1. Все номера проверяются по маске в памяти.
+    2. Занятые номера ищутся одним множественным запросом на часть.
+    3. Оставшиеся вставляются через bulk_create частями по chunk_size,
+       каждая часть в своей транзакции.
+
+    Возвращает (created_instances, errors), где errors - список
+    (позиция во входном списке, ошибка). Ошибки проверки идут в порядке входа,
+    ошибки вставки (гонка с параллельным запросом) - после них.
+    """
+    chunk_size = chunk_size or get_bulk_chunk_size()
+    error_list = []
+
+    serial_numbers = [sn for sn, _ in items]
+    mask_valid, _ = partition_serial_numbers(equipment_type.get_mask_validator(), serial_numbers)
+    mask_valid_set = set(mask_valid)
+    existing = find_existing_serial_numbers(equipment_type, mask_valid_set, chunk_size)
+
+    to_create = []
+    seen = set()
+    for position, (sn, note) in enumerate(items):
+        if sn not in mask_valid_set:
+            error_list.append((position, mask_error(sn, equipment_type)))
+            continue
+        # Повтор номера внутри одного пакета ведет себя как уже существующий
+        if sn in existing or sn in seen:
+            error_list.append((position, duplicate_error(sn, equipment_type)))
+            continue
+        seen.add(sn)
+        to_create.append((position, sn, note))
+
+    created_instances = []
+    for chunk in chunked(to_create, chunk_size):
+        created_instances.extend(_insert_chunk(equipment_type, chunk, error_list))
+
+    return created_instances, error_list
+
+
+def create_equipment_batch(equipment_type, serial_numbers, note=None, chunk_size=None):
+    """
+    Пакетное создание оборудования одного типа с общим примечанием.
+    Возвращает (created_instances, error_list); формат ошибок совпадает
+    с прежним поштучным созданием.
+    """
+    created_instances, errors = create_equipment_items(
+        equipment_type, [(sn, note) for sn in serial_numbers], chunk_size
+    )
+    return created_instances, [error for _, error in errors]
+
+
+
+def _result(pk, status, error=None):
+    result = {"id": pk, "status": status}
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+def soft_delete_equipment(ids, chunk_size=None):
+    """
+    Массовое мягкое удаление. Одно UPDATE ... WHERE id IN (...) на часть,
+    каждая часть в своей транзакции. Возвращает результаты по каждому id
+    в порядке ids (повторы убираются).
+    """
+    chunk_size = chunk_size or get_bulk_chunk_size()
+    results = []
+    for chunk in chunked(list(dict.fromkeys(ids)), chunk_size):
+        with transaction.atomic():
+            rows = dict(
+                Equipment.objects.select_for_update().filter(pk__in=chunk)
+                .values_list('pk', 'is_deleted')
+            )
+            to_delete = [pk for pk in chunk if rows.get(pk) is False]
+            Equipment.objects.filter(pk__in=to_delete).update(is_deleted=True, deleted_at=timezone.now())
+            notify_equipment_changed(to_delete, ACTION_DELETE)
+        for pk in chunk:
+            if pk not in rows:
+                results.append(_result(pk, RESULT_NOT_FOUND))
+            elif rows[pk]:
+                results.append(_result(pk, RESULT_ALREADY_DELETED))
+            else:
+                results.append(_result(pk, RESULT_DELETED))
+    return results
+
+
+def restore_from_archive(ids):
+    """
+    Возвращает архивные записи в основную таблицу под прежними id и
+    индексирует их для поиска. Вызывается внутри транзакции.
+    """
+    archived = list(ArchivedEquipment.objects.filter(pk__in=ids))
+    Equipment.objects.bulk_create([
+        Equipment(id=item.pk, equipment_type_id=item.equipment_type_id,
+                  serial_number=item.serial_number, note=item.note)
+        for item in archived
+    ])
+    # Без сигналов post_delete: запись не удаляется, а переезжает обратно
+    archived_queryset = ArchivedEquipment.objects.filter(pk__in=ids)
+    archived_queryset._raw_delete(archived_queryset.db)
+    get_search_backend().index(ids)
+
+
+def _undelete_rows(ids, archived):
+    """Восстанавливает ids: в основной таблице - UPDATE, из архива - перенос обратно."""
+    Equipment.objects.filter(pk__in=[pk for pk in ids if pk not in archived]).update(
+        is_deleted=False, deleted_at=None
+    )
+    from_archive = [pk for pk in ids if pk in archived]
+    if from_archive:
+        restore_from_archive(from_archive)
+
+
+def undelete_equipment(ids, chunk_size=None):
+    """
+    Массовое восстановление. Запись не восстанавливается (conflict), если
+    ее номер того же типа уже занят активным оборудованием или другой записью,
+    восстановленной раньше в этом же запросе: уникальность пары тип + номер
+    действует только среди не удаленных записей. Записи, перенесенные в архив
+    (manage.py archive_equipment), возвращаются в основную таблицу.
+    """
+    chunk_size = chunk_size or get_bulk_chunk_size()
+    results = []
+    restored = set()
+    types = {}
+    for chunk in chunked(list(dict.fromkeys(ids)), chunk_size):
+        conflicts = {}
+        invalid = {}
+        with transaction.atomic():
+            rows = {
+                pk: (equipment_type_id, sn, is_deleted)
+                for pk, equipment_type_id, sn, is_deleted in
+                Equipment.objects.select_for_update().filter(pk__in=chunk)
+                .values_list('pk', 'equipment_type_id', 'serial_number', 'is_deleted')
+            }
+            archived = set()
+            missing = [pk for pk in chunk if pk not in rows]
+            if missing:
+                for pk, equipment_type_id, sn in (
+                    ArchivedEquipment.objects.select_for_update().filter(pk__in=missing)
+                    .values_list('pk', 'equipment_type_id', 'serial_number')
+                ):
+                    rows[pk] = (equipment_type_id, sn, True)
+                    archived.add(pk)
+            by_type = {}
+            for pk in chunk:
+                if pk in rows and rows[pk][2]:
+                    by_type.setdefault(rows[pk][0], []).append(pk)
+            to_undelete = []
+            for equipment_type_id, pks in by_type.items():
+                equipment_type = _get_type(types, equipment_type_id)
+                if equipment_type is None:
+                    invalid.update(dict.fromkeys(pks, TYPE_NOT_FOUND_ERROR))
+                    continue
+                existing = find_existing_serial_numbers(
+                    equipment_type_id, {rows[pk][1] for pk in pks}, chunk_size
+                )
+                for pk in pks:
+                    key = (equipment_type_id, rows[pk][1])
+                    if rows[pk][1] in existing or key in restored:
+                        conflicts[pk] = duplicate_error(rows[pk][1], equipment_type)["error"]
+                        continue
+                    restored.add(key)
+                    to_undelete.append(pk)
+            try:
+                with transaction.atomic():
+                    _undelete_rows(to_undelete, archived)
+            except IntegrityError:
+                # Номер заняли параллельно после проверки, восстанавливаем по одной
+                restored_ids = []
+                for pk in to_undelete:
+                    try:
+                        with transaction.atomic():
+                            _undelete_rows([pk], archived)
+                        restored_ids.append(pk)
+                    except IntegrityError:
+                        conflicts[pk] = duplicate_error(rows[pk][1], types[rows[pk][0]])["error"]
+                to_undelete = restored_ids
+            notify_equipment_changed(to_undelete, ACTION_UNDELETE)
+        for pk in chunk:
+            if pk not in rows:
+                results.append(_result(pk, RESULT_NOT_FOUND))
+            elif pk in conflicts:
+                results.append(_result(pk, RESULT_CONFLICT, conflicts[pk]))
+            elif pk in invalid:
+                results.append(_result(pk, RESULT_INVALID, invalid[pk]))
+            elif not rows[pk][2]:
+                results.append(_result(pk, RESULT_NOT_DELETED))
+            else:
+                results.append(_result(pk, RESULT_UNDELETED))
+    return results
+
+
+def _update_one_by_one(objs, results, types):
+    """Запасной путь, если bulk_update упал на ограничении уникальности (гонка)."""
+    updated = []
+    for obj in objs:
+        try:
+            with transaction.atomic():
+                Equipment.objects.filter(pk=obj.pk).update(serial_number=obj.serial_number, note=obj.note)
+            updated.append(obj.pk)
+        except IntegrityError:
+            equipment_type = types[obj.equipment_type_id]
+            results[obj.pk] = _result(obj.pk, RESULT_CONFLICT, duplicate_error(obj.serial_number, equipment_type)["error"])
+    return updated
+
+
+def update_equipment_items(items, chunk_size=None):
+    """
+    Массовое изменение активного оборудования. items - список (id, changes),
+    где changes - dict с ключами serial_number и/или note.
+
+    Новые номера проходят те же проверки, что и при создании: маска типа и
+    уникальность среди активных записей (одним запросом IN на часть), включая
+    повторы внутри запроса. Изменения только примечания группируются по
+    значению и применяются одним UPDATE на значение, смена номеров - через
+    bulk_update (UPDATE ... CASE). Возвращает результаты по каждому id.
+    """
+    chunk_size = chunk_size or get_bulk_chunk_size()
+    results = []
+    taken = set()
+    types = {}
+    for chunk in chunked(list(dict(items).items()), chunk_size):
+        chunk_results = {}
+        with transaction.atomic():
+            rows = {
+                obj.pk: obj for obj in
+                Equipment.objects.select_for_update().filter(pk__in=[pk for pk, _ in chunk], is_deleted=False)
+                .only('pk', 'equipment_type_id', 'serial_number', 'note')
+            }
+            serial_changes = {}
+            for pk, changes in chunk:
+                obj = rows.get(pk)
+                if obj is None:
+                    chunk_results[pk] = _result(pk, RESULT_NOT_FOUND)
+                    continue
+                sn = changes.get('serial_number', obj.serial_number)
+                if sn == obj.serial_number:
+                    continue
+                equipment_type = _get_type(types, obj.equipment_type_id)
+                if equipment_type is None:
+                    chunk_results[pk] = _result(pk, RESULT_INVALID, TYPE_NOT_FOUND_ERROR)
+                    continue
+                if not equipment_type.get_mask_validator().is_valid(sn):
+                    chunk_results[pk] = _result(pk, RESULT_INVALID, mask_error(sn, equipment_type)["error"])
+                    continue
+                serial_changes.setdefault(obj.equipment_type_id, {})[pk] = sn
+
+            for equipment_type_id, changed in serial_changes.items():
+                equipment_type = types[equipment_type_id]
+                existing = find_existing_serial_numbers(equipment_type_id, set(changed.values()), chunk_size)
+                for pk, sn in changed.items():
+                    if sn in existing or (equipment_type_id, sn) in taken:
+                        chunk_results[pk] = _result(pk, RESULT_CONFLICT, duplicate_error(sn, equipment_type)["error"])
+                    else:
+                        taken.add((equipment_type_id, sn))
+
+            note_groups = {}
+            to_bulk_update = []
+            for pk, changes in chunk:
+                if pk in chunk_results:
+                    continue
+                obj = rows[pk]
+                sn = changes.get('serial_number', obj.serial_number)
+                note = changes.get('note', obj.note)
+                if sn == obj.serial_number and note == obj.note:
+                    chunk_results[pk] = _result(pk, RESULT_UNCHANGED)
+                elif sn == obj.serial_number:
+                    note_groups.setdefault(note, []).append(pk)
+                else:
+                    obj.serial_number = sn
+                    obj.note = note
+                    to_bulk_update.append(obj)
+
+            updated = []
+            for note, pks in note_groups.items():
+                Equipment.objects.filter(pk__in=pks).update(note=note)
+                updated.extend(pks)
+            if to_bulk_update:
+                try:
+                    with transaction.atomic():
+                        Equipment.objects.bulk_update(to_bulk_update, ['serial_number', 'note'])
+                    updated.extend(obj.pk for obj in to_bulk_update)
+                except IntegrityError:
+                    updated.extend(_update_one_by_one(to_bulk_update, chunk_results, types))
+            notify_equipment_changed(updated, ACTION_UPDATE)
+            for pk in updated:
+                chunk_results[pk] = _result(pk, RESULT_UPDATED)
+        results.extend(chunk_results[pk] for pk, _ in chunk)
+    return results
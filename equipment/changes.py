@@ -0,0 +1,188 @@
+import base64
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import ArchivedEquipment, Equipment, EquipmentChange
+
+logger = logging.getLogger(__name__)
+
+# Номера выдаются при вставке, а транзакции фиксируются не обязательно в том
+# же порядке: пропуск между прочитанными номерами может быть еще не
+# зафиксированной транзакцией. Такие номера запоминаются в курсоре и
+# перечитываются следующими запросами, пока запись после пропуска не станет
+# старше этого порога. Пропуск, который курсор так и не дождался, не
+# забывается молча: read_changes() бросает ChangesGapAbandoned.
+DEFAULT_GAP_TIMEOUT_SECONDS = 300
+
+# Не больше стольких пропусков в курсоре, при переполнении - ChangesGapAbandoned
+MAX_GAPS = 100
+
+MAX_LIMIT = 1000
+
+
+class ChangesExpired(Exception):
+    """Изменения после курсора уже удалены из журнала, нужна полная синхронизация."""
+
+
+class ChangesGapAbandoned(ChangesExpired):
+    """
+    Пропуск из курсора не заполнился за get_gap_timeout() секунд или пропусков
+    больше MAX_GAPS: изменение из пропуска могло быть зафиксировано позже и
+    не дойти до клиента, нужна полная синхронизация.
+    """
+
+
+def get_gap_timeout():
+    return getattr(settings, 'CHANGES_GAP_TIMEOUT_SECONDS', DEFAULT_GAP_TIMEOUT_SECONDS)
+
+
+def parse_cursor(value):
+    """
+    Курсор ленты -> (since, gaps). Курсор - номер последнего полученного
+    изменения или, если есть пропуски, base64 JSON {"s": номер, "g": [[первый,
+    последний, время], ...]}: время (unix) - когда записана строка после пропуска.
+    Бросает ValueError для некорректного курсора.
+    """
+    value = (value or '0').strip()
+    if value.isdigit():
+        return int(value), []
+    try:
+        data = json.loads(base64.urlsafe_b64decode(value.encode('ascii')).decode('utf-8'))
+        since = data['s']
+        gaps = [(first, last, seen_at) for first, last, seen_at in data['g']]
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise ValueError("Некорректный курсор.")
+    numbers = [since, *(number for gap in gaps for number in gap)]
+    if not all(isinstance(number, int) and number >= 0 for number in numbers):
+        raise ValueError("Некорректный курсор.")
+    return since, gaps
+
+
+def format_cursor(since, gaps):
+    if not gaps:
+        return str(since)
+    payload = json.dumps({'s': since, 'g': [list(gap) for gap in gaps]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def record_changes(ids, action):
+    """Добавляет в журнал по записи на каждый id (в текущей транзакции)."""
+    EquipmentChange.objects.bulk_create(
+        [EquipmentChange(equipment_id=equipment_id, action=action) for equipment_id in ids],
+        batch_size=getattr(settings, 'BULK_CHUNK_SIZE', 1000)
+    )
+
+
+def read_changes(since=0, limit=MAX_LIMIT, gaps=()):
+    """
+    Изменения с номером больше since и с номерами из пропусков gaps (см.
+    parse_cursor()), не больше limit штук.
+
+    Возвращает (changes, cursor, has_more). changes - список
+    (номер, id оборудования, действие, Equipment или None), по одному на
+    оборудование: если запись менялась в пачке несколько раз, остается
+    последнее изменение, а Equipment - ее текущее состояние (None после
+    физического удаления). cursor - since для следующего запроса (строка,
+    format_cursor()). Бросает ChangesExpired, если журнал после since уже очищен,
+    и ChangesGapAbandoned, если пропуск из курсора пришлось бросить (update_gaps()).
+    """
+    if since:
+        # Очистка оставляет последнюю удаляемую запись как границу, поэтому
+        # курсор меньше первой записи журнала означает пропущенные изменения
+        first = EquipmentChange.objects.order_by('pk').values_list('pk', flat=True).first()
+        if first is not None and since < first:
+            raise ChangesExpired()
+
+    condition = Q(pk__gt=since)
+    for first, last, _ in gaps:
+        condition |= Q(pk__range=(first, last))
+    rows = list(
+        EquipmentChange.objects.filter(condition).order_by('pk')
+        .values_list('pk', 'equipment_id', 'action', 'changed_at')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    gaps = update_gaps(since, gaps, rows, has_more)
+
+    latest = {}
+    for seq, equipment_id, action, _ in rows:
+        latest.pop(equipment_id, None)
+        latest[equipment_id] = (seq, action)
+    instances = Equipment.objects.select_related('equipment_type').in_bulk(list(latest))
+    missing = [equipment_id for equipment_id in latest if equipment_id not in instances]
+    if missing:
+        # Давно удаленные записи могли быть перенесены в архив
+        instances.update(ArchivedEquipment.objects.select_related('equipment_type').in_bulk(missing))
+    changes = [
+        (seq, equipment_id, action, instances.get(equipment_id))
+        for equipment_id, (seq, action) in latest.items()
+    ]
+    cursor = max(since, rows[-1][0]) if rows else since
+    return changes, format_cursor(cursor, gaps), has_more
+
+
+def update_gaps(since, gaps, rows, has_more=False):
+    """
+    Пропуски после чтения строк rows (по возрастанию номера): из прежних
+    убираются прочитанные номера, между новыми строками добавляются
+    непрочитанные. Новый пропуск, строка после которого уже старше
+    get_gap_timeout() секунд, считается откатом и не запоминается.
+
+    Бросает ChangesGapAbandoned, если прежний пропуск так и не заполнился за
+    get_gap_timeout() или пропусков больше MAX_GAPS: курсор не перескакивает
+    номера, которые клиент еще может получить. При has_more (строки обрезаны
+    по limit) брошенным считается только пропуск, целиком прочитанный в rows.
+    """
+    seen = [row[0] for row in rows]
+    result = []
+    for first, last, seen_at in gaps:
+        start = first
+        for pk in seen:
+            if pk > last:
+                break
+            if pk >= start:
+                if pk > start:
+                    result.append((start, pk - 1, seen_at))
+                start = pk + 1
+        if start <= last:
+            result.append((start, last, seen_at))
+    deadline = time.time() - get_gap_timeout()
+    abandoned = [
+        gap for gap in result
+        if gap[2] <= deadline and not (has_more and gap[1] >= seen[-1])
+    ]
+    expected = since + 1
+    for pk, _, _, changed_at in rows:
+        if pk <= since:
+            continue
+        seen_at = int(changed_at.timestamp())
+        if pk > expected and seen_at > deadline:
+            result.append((expected, pk - 1, seen_at))
+        expected = pk + 1
+    if abandoned or len(result) > MAX_GAPS:
+        logger.warning(
+            "Лента изменений: курсор %s бросает пропуски (не дождались фиксации: %s, всего пропусков: %s), "
+            "клиенту нужна полная синхронизация.", since, abandoned, len(result)
+        )
+        raise ChangesGapAbandoned()
+    return sorted(result)
+
+
+def prune_changes(before):
+    """
+    Удаляет из журнала изменения старше before, кроме последнего из них: оно
+    остается границей, по которой read_changes() узнает устаревшие курсоры.
+    Возвращает число удаленных записей.
+    """
+    boundary = (
+        EquipmentChange.objects.filter(changed_at__lt=before)
+        .order_by('-pk').values_list('pk', flat=True).first()
+    )
+    if boundary is None:
+        return 0
+    deleted, _ = EquipmentChange.objects.filter(pk__lt=boundary).delete()
+    return deleted
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core import checks
+
+from .versions import versions_shared
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_versions(app_configs, **kwargs):
+    """Кэш страниц и count_mode=cached включены, но отключаются из-за локального кэша."""
+    if versions_shared():
+        return []
+    enabled = []
+    if getattr(settings, 'RESPONSE_CACHE_ENABLED', False):
+        enabled.append('[Cache] response_cache')
+    if getattr(settings, 'COUNT_MODE', None) == 'cached':
+        enabled.append('[Count] mode')
+    if not enabled:
+        return []
+    return [checks.Warning(
+        f"{', '.join(enabled)} не действует: бэкенд кэша локален для процесса, "
+        "и запись в одном процессе не сбросила бы кэш в остальных.",
+        hint="Задайте общий [Cache] backend (memcached, redis, файлы, БД) "
+             "или [Cache] single_process=true, если сервер работает одним процессом.",
+        id='equipment.W001',
+    )]
@@ -0,0 +1,168 @@
+import gzip
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    # Необязательная зависимость (pip install brotli): без нее только gzip
+    brotli = None
+
+BROTLI = 'br'
+GZIP = 'gzip'
+
+# Типы ответов API, которые сжимаются. HTML (админка с CSRF-токеном) не сжимается
+# на лету из-за BREACH; страница SPA отдается заранее сжатой (equipment/spa.py)
+COMPRESSIBLE_TYPES = frozenset({
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/plain',
+})
+
+ACCEPT_ENCODING_RE = re.compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*(?:,|$)')
+
+
+def compression_enabled():
+    return getattr(settings, 'COMPRESSION_ENABLED', True)
+
+
+def get_min_size():
+    return getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+
+def get_gzip_level():
+    return getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+
+
+def get_brotli_quality():
+    return getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+
+
+def supported_encodings():
+    """Кодировки в порядке предпочтения сервера."""
+    return (BROTLI, GZIP) if brotli is not None else (GZIP,)
+
+
+def choose_encoding(accept_encoding, available=None):
+    """
+    Кодировка ответа по заголовку Accept-Encoding: из available (по умолчанию
+    supported_encodings()) с наибольшим q, при равном - в порядке available.
+    None - отдавать без сжатия.
+    """
+    if not accept_encoding:
+        return None
+    available = supported_encodings() if available is None else available
+    weights = {}
+    for coding, q in ACCEPT_ENCODING_RE.findall(accept_encoding.lower()):
+        try:
+            weights[coding] = float(q) if q else 1.0
+        except ValueError:
+            continue
+    best = None
+    best_q = 0
+    for coding in available:
+        q = weights.get(coding, weights.get('*', 0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data, encoding, quality=None):
+    """Сжатие байтов целиком; quality - уровень gzip или качество brotli."""
+    if encoding == BROTLI:
+        return brotli.compress(data, quality=get_brotli_quality() if quality is None else quality)
+    # mtime=0: одинаковое содержимое дает одинаковые байты (ETag, сборка SPA)
+    return gzip.compress(data, compresslevel=get_gzip_level() if quality is None else quality, mtime=0)
+
+
+class StreamCompressor:
+    """Сжатие потока частями: compress() на каждую часть, finish() в конце."""
+
+    def __init__(self, encoding):
+        if encoding == BROTLI:
+            self._compressor = brotli.Compressor(quality=get_brotli_quality())
+            self._compress = self._compressor.process
+            self._finish = self._compressor.finish
+        else:
+            # wbits=31 - формат gzip
+            self._compressor = zlib.compressobj(get_gzip_level(), zlib.DEFLATED, 31)
+            self._compress = self._compressor.compress
+            self._finish = self._compressor.flush
+
+    def compress(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return self._compress(data)
+
+    def finish(self):
+        return self._finish()
+
+
+def compress_stream(chunks, encoding):
+    compressor = StreamCompressor(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_stream(chunks, encoding):
+    compressor = StreamCompressor(encoding)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def should_compress(request, response):
+    if not compression_enabled() or request.method != 'GET':
+        return False
+    if response.status_code != 200 or response.has_header('Content-Encoding'):
+        return False
+    if 'no-transform' in response.get('Cache-Control', ''):
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type not in COMPRESSIBLE_TYPES:
+        return False
+    # Выгрузка заранее неизвестного размера сжимается всегда
+    return response.streaming or len(response.content) >= get_min_size()
+
+
+def compress_response(request, response):
+    """
+    Сжимает ответ API (список, выгрузка, запись) кодировкой из Accept-Encoding.
+    Vary: Accept-Encoding ставится всем сжимаемым ответам, чтобы кэши не отдали
+    сжатый вариант клиенту без поддержки сжатия. ETag становится слабым: по нему
+    ConditionalResponseMixin по-прежнему отвечает 304.
+    """
+    if not should_compress(request, response):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    if response.streaming:
+        if response.is_async:
+            response.streaming_content = acompress_stream(response.streaming_content, encoding)
+        else:
+            response.streaming_content = compress_stream(response.streaming_content, encoding)
+        del response['Content-Length']
+    else:
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    response['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,102 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .versions import get_versions, versions_shared
+
+
+def response_cache_enabled():
+    return getattr(settings, 'RESPONSE_CACHE_ENABLED', False) and versions_shared()
+
+
+def get_response_cache_ttl():
+    return getattr(settings, 'RESPONSE_CACHE_TTL', 300)
+
+
+def response_cache_key(etag):
+    return "equipment:response:" + etag.strip('"')
+
+
+class ConditionalResponseMixin:
+    """
+    Условные GET для list и retrieve.
+
+    ETag строится из версий данных областей version_scopes (equipment/versions.py),
+    действия, id и параметров запроса, поэтому вычисляется без обращения к БД.
+    Если клиент прислал совпадающий If-None-Match, сразу отдается 304 без фильтрации,
+    подсчета и сериализации. Любая запись в таблицу (создание, изменение, мягкое
+    удаление, массовые операции) увеличивает версию и меняет ETag.
+
+    При RESPONSE_CACHE_ENABLED сериализованные страницы списков дополнительно
+    кэшируются на сервере под тем же ключом, старые версии просто не запрашиваются.
+    Если счетчики версий не общие для процессов (versions_shared()), ответы
+    отдаются без ETag и кэша.
+    """
+    version_scopes = ()
+
+    def get_etag(self, request):
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+        )
+        accepted = getattr(request, 'accepted_renderer', None)
+        parts = [
+            type(self).__name__,
+            self.action or '',
+            repr(sorted(self.kwargs.items())),
+            repr(params),
+            accepted.format if accepted is not None else '',
+            ".".join(str(version) for version in get_versions(self.version_scopes)),
+        ]
+        return '"{}"'.format(hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest())
+
+    def _not_modified(self, request, etag):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if not if_none_match:
+            return False
+        # Слабое сравнение: сжатый ответ получает W/ перед тем же ETag (equipment/compression.py)
+        etags = {value.removeprefix('W/') for value in parse_etags(if_none_match)}
+        return '*' in etags or etag in etags
+
+    def _finalize_conditional(self, response, etag):
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            # Браузер хранит ответ, но перепроверяет его каждый раз через If-None-Match
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def conditional_response(self, request, build, cache_data=False):
+        if not versions_shared():
+            return build()
+        etag = self.get_etag(request)
+        if self._not_modified(request, etag):
+            return self._finalize_conditional(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+        use_cache = cache_data and response_cache_enabled()
+        cache_key = response_cache_key(etag)
+        if use_cache:
+            data = cache.get(cache_key)
+            if data is not None:
+                return self._finalize_conditional(Response(data), etag)
+
+        response = build()
+        if use_cache and response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, get_response_cache_ttl())
+        return self._finalize_conditional(response, etag)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalResponseMixin, self).list(request, *args, **kwargs),
+            cache_data=True
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, lambda: super(ConditionalResponseMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -0,0 +1,137 @@
+import hashlib
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+from .records import RecordQuerySet
+from .versions import get_versions, versions_shared
+
+logger = logging.getLogger(__name__)
+
+COUNT_EXACT = 'exact'
+COUNT_CACHED = 'cached'
+COUNT_ESTIMATE = 'estimate'
+COUNT_MODES = (COUNT_EXACT, COUNT_CACHED, COUNT_ESTIMATE)
+
+
+def get_default_count_mode():
+    mode = getattr(settings, 'COUNT_MODE', COUNT_EXACT)
+    return mode if mode in COUNT_MODES else COUNT_EXACT
+
+
+def queryset_signature(queryset):
+    """Подпись фильтра: хэш SQL и параметров запроса."""
+    if isinstance(queryset, RecordQuerySet):
+        sql, params = queryset.sql_with_params()
+    else:
+        sql, params = queryset.query.sql_with_params()
+    return hashlib.sha1(f"{sql}|{params!r}".encode('utf-8')).hexdigest()
+
+
+def count_cache_key(queryset, scopes):
+    return "equipment:count:{}:{}".format(
+        queryset_signature(queryset),
+        ".".join(str(version) for version in get_versions(scopes))
+    )
+
+
+def estimate_count(queryset):
+    """
+    Оценка числа строк по статистике таблиц (план запроса), без обхода данных.
+    Возвращает None, если СУБД не дает оценку (например, SQLite).
+    """
+    if isinstance(queryset, RecordQuerySet):
+        # Вместе с архивом: сумма оценок по каждой таблице
+        estimates = [estimate_count(branch) for branch in queryset.branches]
+        return None if None in estimates else sum(estimates)
+    connection = connections[queryset.db]
+    sql, params = queryset.values('pk').query.sql_with_params()
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                # Для соединения вложенными циклами оценка результата - произведение
+                # rows * filtered по всем таблицам плана.
+                cursor.execute(f"EXPLAIN {sql}", params)
+                columns = [col[0] for col in cursor.description]
+                estimate = 1.0
+                for values in cursor.fetchall():
+                    row = dict(zip(columns, values))
+                    filtered = row.get('filtered')
+                    filtered = 100.0 if filtered is None else float(filtered)
+                    estimate *= (row.get('rows') or 0) * filtered / 100
+                return int(estimate)
+            if connection.vendor == 'postgresql':
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                return int(plan[0]['Plan']['Plan Rows'])
+    except (DatabaseError, KeyError, IndexError, TypeError, ValueError) as e:
+        logger.warning("Не удалось оценить количество строк: %s", e)
+    return None
+
+
+def count_queryset(queryset, mode=None, scopes=()):
+    """
+    Считает строки queryset выбранной стратегией.
+
+    exact    - COUNT(*) на каждый запрос;
+    cached   - COUNT(*) кэшируется по подписи фильтра на COUNT_CACHE_TTL секунд.
+               В ключ входят версии областей scopes, поэтому любая запись
+               (создание, изменение, мягкое удаление) делает старые значения недоступными.
+               Если версии не общие для процессов (versions_shared()) - как exact;
+    estimate - оценка по статистике, если она не меньше COUNT_ESTIMATE_THRESHOLD,
+               иначе как cached.
+
+    Возвращает (количество, фактически использованная стратегия).
+    """
+    mode = mode if mode in COUNT_MODES else get_default_count_mode()
+
+    if mode == COUNT_ESTIMATE:
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= getattr(settings, 'COUNT_ESTIMATE_THRESHOLD', 100000):
+            return estimate, COUNT_ESTIMATE
+        mode = COUNT_CACHED
+
+    if mode == COUNT_CACHED and not versions_shared():
+        # Запись в другом процессе не сбросила бы кэшированное значение
+        mode = COUNT_EXACT
+
+    if mode == COUNT_CACHED:
+        key = count_cache_key(queryset, scopes)
+        count = cache.get(key)
+        if count is not None:
+            return count, COUNT_CACHED
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, 'COUNT_CACHE_TTL', 60))
+        return count, COUNT_EXACT
+
+    return queryset.count(), COUNT_EXACT
+
+
+async def acount_queryset(queryset, mode=None, scopes=()):
+    """count_queryset() для async-представлений: те же стратегии и ключи кэша."""
+    mode = mode if mode in COUNT_MODES else get_default_count_mode()
+
+    if mode == COUNT_ESTIMATE:
+        # EXPLAIN идет через курсор, у которого нет асинхронного варианта
+        estimate = await sync_to_async(estimate_count)(queryset)
+        if estimate is not None and estimate >= getattr(settings, 'COUNT_ESTIMATE_THRESHOLD', 100000):
+            return estimate, COUNT_ESTIMATE
+        mode = COUNT_CACHED
+
+    if mode == COUNT_CACHED and not versions_shared():
+        # Запись в другом процессе не сбросила бы кэшированное значение
+        mode = COUNT_EXACT
+
+    if mode == COUNT_CACHED:
+        key = count_cache_key(queryset, scopes)
+        count = await cache.aget(key)
+        if count is not None:
+            return count, COUNT_CACHED
+        count = await queryset.acount()
+        await cache.aset(key, count, getattr(settings, 'COUNT_CACHE_TTL', 60))
+        return count, COUNT_EXACT
+
+    return await queryset.acount(), COUNT_EXACT
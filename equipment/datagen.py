@@ -0,0 +1,121 @@
+import math
+import random
+import time
+from datetime import timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+
+from .bulk import find_existing_serial_numbers, get_bulk_chunk_size
+from .masks import SerialSpace, mask_capacity
+from .models import ArchivedEquipment, Equipment, EquipmentType
+from .search import get_search_backend
+from .stats import recount_types
+from . import versions
+
+# Символы масок синтетических типов; повтор - больший вес
+MASK_CHARS = 'NNNAAAXXXaZ'
+NOTE_WORDS = ('склад', 'стойка', 'этаж', 'кабинет', 'резерв', 'ремонт', 'аренда', 'филиал')
+
+
+def random_mask(rng, min_capacity):
+    """Случайная маска длиной 8-12 символов, под которую подходит не меньше min_capacity номеров."""
+    while True:
+        mask = "".join(rng.choice(MASK_CHARS) for _ in range(rng.randint(8, 12)))
+        if mask_capacity(mask) >= min_capacity:
+            return mask
+
+
+def scrambled_serial_numbers(mask, start, count):
+    """
+    Номера маски с порядковыми номерами start..start+count-1 после перестановки
+    i -> (i * step) mod capacity, где step взаимно прост с capacity: номера
+    выглядят случайными, но не повторяются, и следующий запуск с большим start
+    продолжает ту же последовательность. step зависит только от маски.
+    """
+    space = SerialSpace(mask)
+    capacity = space.capacity
+    rng = random.Random(mask)
+    step = rng.randrange(capacity // 3, capacity) | 1
+    while math.gcd(step, capacity) != 1:
+        step += 2
+    return [space.serial_number((index * step) % capacity) for index in range(start, start + count)]
+
+
+def get_or_create_types(count, prefix, rng, min_capacity):
+    """Типы '<prefix>NNN'; существующие переиспользуются вместе со своими масками."""
+    existing = {t.name: t for t in EquipmentType.objects.filter(name__startswith=prefix)}
+    types = []
+    for number in range(1, count + 1):
+        name = f"{prefix}{number:03d}"
+        equipment_type = existing.get(name)
+        if equipment_type is None:
+            equipment_type = EquipmentType.objects.create(name=name, serial_number_mask=random_mask(rng, min_capacity))
+        types.append(equipment_type)
+    return types
+
+
+def split_count(total, parts):
+    """Делит total между parts типами по закону Ципфа: первые типы крупнее."""
+    weights = [1 / rank for rank in range(1, parts + 1)]
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    counts[0] += total - sum(counts)
+    return counts
+
+
+def generate_equipment(count, type_count=20, prefix='bench-', seed=1, deleted_ratio=0.05, note_ratio=0.3,
+                       batch_size=None, index=True, log=None):
+    """
+    Добавляет count записей оборудования с номерами, подходящими под маски,
+    распределенных по type_count синтетическим типам. Данные детерминированы
+    seed; повторный запуск дописывает новые номера. Вставка идет bulk_create
+    без проверок и без ленты изменений; в конце пересчитывается статистика
+    типов и перестраивается поисковый индекс (index=False - не перестраивать).
+    Возвращает число вставленных записей.
+    """
+    batch_size = batch_size or get_bulk_chunk_size()
+    rng = random.Random(seed)
+    min_capacity = max(count, 1000) * 10
+    types = get_or_create_types(type_count, prefix, rng, min_capacity)
+    # Продолжаем последовательность номеров каждого типа после уже вставленных
+    offsets = dict(Equipment.objects.filter(equipment_type__in=types)
+                   .values_list('equipment_type_id').annotate(total=Count('id')))
+    for type_id, total in (ArchivedEquipment.objects.filter(equipment_type__in=types)
+                           .values_list('equipment_type_id').annotate(total=Count('id'))):
+        offsets[type_id] = offsets.get(type_id, 0) + total
+
+    now = timezone.now()
+    inserted = 0
+    started = time.perf_counter()
+    for equipment_type, type_total in zip(types, split_count(count, type_count)):
+        start = offsets.get(equipment_type.pk, 0)
+        for chunk_start in range(0, type_total, batch_size):
+            size = min(batch_size, type_total - chunk_start)
+            serial_numbers = scrambled_serial_numbers(equipment_type.serial_number_mask, start + chunk_start, size)
+            # Номера, занятые записями не из генератора, пропускаем
+            existing = find_existing_serial_numbers(equipment_type, serial_numbers, batch_size)
+            objs = []
+            for sn in serial_numbers:
+                if sn in existing:
+                    continue
+                deleted = rng.random() < deleted_ratio
+                note = (f"{rng.choice(NOTE_WORDS)} {rng.randint(1, 500)}, {rng.choice(NOTE_WORDS)} {rng.randint(1, 50)}"
+                        if rng.random() < note_ratio else None)
+                objs.append(Equipment(
+                    equipment_type=equipment_type, serial_number=sn, note=note, is_deleted=deleted,
+                    deleted_at=now - timedelta(days=rng.randint(0, 365)) if deleted else None,
+                ))
+            Equipment.objects.bulk_create(objs)
+            inserted += len(objs)
+        if log:
+            elapsed = time.perf_counter() - started
+            log(f"{equipment_type.name} ({equipment_type.serial_number_mask}): +{type_total}, "
+                f"всего {inserted}, {inserted / elapsed:.0f} записей/с")
+
+    # bulk_create идет мимо сигналов, статистику типов пересчитываем целиком
+    recount_types([equipment_type.pk for equipment_type in types])
+    versions.bump_version(versions.EQUIPMENT)
+    if index and inserted:
+        get_search_backend().rebuild(log=log)
+    return inserted
@@ -0,0 +1,129 @@
+import csv
+import json
+
+from .bulk import get_bulk_chunk_size
+
+
+# Плоское представление строки выгрузки: (имя колонки, путь в values_list)
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('equipment_type_id', 'equipment_type_id'),
+    ('equipment_type_name', 'equipment_type__name'),
+    ('serial_number', 'serial_number'),
+    ('note', 'note'),
+    ('is_deleted', 'is_deleted'),
+)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def iter_rows(queryset, columns=EXPORT_COLUMNS, chunk_size=None):
+    """
+    Кортежи значений queryset частями по chunk_size в порядке id.
+    Каждая часть - отдельный запрос с id > последнего выданного (keyset), поэтому
+    память не зависит от размера выгрузки и на MySQL, где драйвер читает результат
+    запроса целиком.
+    """
+    chunk_size = chunk_size or get_bulk_chunk_size()
+    queryset = _rows_queryset(queryset, columns)
+    last_id = None
+    while True:
+        page = queryset if last_id is None else queryset.filter(pk__gt=last_id)
+        rows = list(page[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+async def aiter_rows(queryset, columns=EXPORT_COLUMNS, chunk_size=None):
+    """iter_rows() для async-представлений: части читаются асинхронным ORM."""
+    chunk_size = chunk_size or get_bulk_chunk_size()
+    queryset = _rows_queryset(queryset, columns)
+    last_id = None
+    while True:
+        page = queryset if last_id is None else queryset.filter(pk__gt=last_id)
+        rows = [row async for row in page[:chunk_size]]
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def _rows_queryset(queryset, columns):
+    paths = [path for _, path in columns]
+    if paths[0] != 'id':
+        raise ValueError("Первой колонкой выгрузки должен быть id.")
+    return queryset.order_by('pk').values_list(*paths)
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: write() возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_writer():
+    writer = csv.writer(_Echo())
+
+    def write_rows(rows):
+        return "".join(
+            writer.writerow([
+                ('true' if value else 'false') if isinstance(value, bool) else value
+                for value in row
+            ])
+            for row in rows
+        )
+    return writer, write_rows
+
+
+def _ndjson_writer(columns):
+    names = [name for name, _ in columns]
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    return lambda rows: "".join(encode(dict(zip(names, row))) + "\n" for row in rows)
+
+
+def stream_csv(queryset, columns=EXPORT_COLUMNS, chunk_size=None):
+    writer, write_rows = _csv_writer()
+    yield writer.writerow([name for name, _ in columns])
+    for rows in iter_rows(queryset, columns, chunk_size):
+        yield write_rows(rows)
+
+
+def stream_ndjson(queryset, columns=EXPORT_COLUMNS, chunk_size=None):
+    write_rows = _ndjson_writer(columns)
+    for rows in iter_rows(queryset, columns, chunk_size):
+        yield write_rows(rows)
+
+
+async def astream_csv(queryset, columns=EXPORT_COLUMNS, chunk_size=None):
+    writer, write_rows = _csv_writer()
+    yield writer.writerow([name for name, _ in columns])
+    async for rows in aiter_rows(queryset, columns, chunk_size):
+        yield write_rows(rows)
+
+
+async def astream_ndjson(queryset, columns=EXPORT_COLUMNS, chunk_size=None):
+    write_rows = _ndjson_writer(columns)
+    async for rows in aiter_rows(queryset, columns, chunk_size):
+        yield write_rows(rows)
+
+
+EXPORT_STREAMS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+}
+
+# Асинхронные итераторы для StreamingHttpResponse под ASGI
+ASYNC_EXPORT_STREAMS = {
+    'csv': astream_csv,
+    'ndjson': astream_ndjson,
+}
@@ -0,0 +1,107 @@
+import operator
+from functools import reduce
+
+from django.db.models import Q
+from django_filters import rest_framework as django_filters
+from rest_framework import filters
+
+from .models import Equipment, EquipmentRecord
+from .registry import type_registry
+from .search import INDEXED_FIELDS, contains_q, startswith_q
+
+
+def unindexed_q(queryset):
+    """Условие для записей queryset, которых нет в поисковом индексе (архив)."""
+    return getattr(queryset.model, 'search_unindexed_q', None)
+
+
+class IndexedSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter, который ищет по serial_number/note через поисковый индекс
+    (equipment/search.py) вместо LIKE '%...%' по всей таблице.
+    Поиск по имени типа идет по реестру типов в памяти и сводится к
+    equipment_type_id IN (...). Остальные поля обрабатываются как в SearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        indexed_fields = [field for field in search_fields if field in INDEXED_FIELDS]
+        type_name_fields = [field for field in search_fields if field == 'equipment_type__name']
+        other_fields = [
+            field for field in search_fields
+            if field not in indexed_fields and field not in type_name_fields
+        ]
+        other_lookups = [self.construct_search(str(field), queryset) for field in other_fields]
+
+        conditions = []
+        for term in search_terms:
+            term_conditions = []
+            if indexed_fields:
+                term_conditions.append(contains_q(indexed_fields, term, unindexed_q=unindexed_q(queryset)))
+            if type_name_fields:
+                folded = term.casefold()
+                type_ids = [
+                    equipment_type.pk for equipment_type in type_registry.all()
+                    if folded in equipment_type.name.casefold()
+                ]
+                if type_ids:
+                    term_conditions.append(Q(equipment_type_id__in=type_ids))
+            term_conditions.extend(Q(**{lookup: term}) for lookup in other_lookups)
+            if not term_conditions:
+                return queryset.none()
+            conditions.append(reduce(operator.or_, term_conditions))
+        return queryset.filter(reduce(operator.and_, conditions))
+
+
+class EquipmentFilterSet(django_filters.FilterSet):
+    """
+    Фильтры списка оборудования. Подстрочные фильтры по серийному номеру и
+    примечанию идут через поисковый индекс.
+    /api/equipment/?serial_number__icontains=ABC
+    /api/equipment/?serial_number__istartswith=1AA
+    """
+    serial_number__icontains = django_filters.CharFilter(field_name='serial_number', method='filter_indexed_contains')
+    serial_number__istartswith = django_filters.CharFilter(field_name='serial_number', method='filter_indexed_startswith')
+    note__icontains = django_filters.CharFilter(field_name='note', method='filter_indexed_contains')
+
+    class Meta:
+        model = Equipment
+        fields = {
+            'equipment_type__id': ['exact'],
+            'equipment_type__name': ['exact', 'icontains'],
+            'serial_number': ['exact'],
+            'is_deleted': ['exact'] # Позволит фильтровать и удаленные, если нужно /api/equipment/?is_deleted=true
+        }
+
+    def filter_indexed_contains(self, queryset, name, value):
+        return queryset.filter(contains_q([name], value, unindexed_q=unindexed_q(queryset)))
+
+    def filter_indexed_startswith(self, queryset, name, value):
+        return queryset.filter(startswith_q(name, value, unindexed_q=unindexed_q(queryset)))
+
+
+class EquipmentRecordFilterSet(EquipmentFilterSet):
+    """Те же фильтры для списка вместе с архивом (is_deleted=true|all)."""
+
+    class Meta(EquipmentFilterSet.Meta):
+        model = EquipmentRecord
+
+    def filter_queryset(self, queryset):
+        # Как в FilterSet, но без проверки, что фильтр вернул QuerySet:
+        # здесь это RecordQuerySet (equipment/records.py)
+        for name, value in self.form.cleaned_data.items():
+            queryset = self.filters[name].filter(queryset, value)
+        return queryset
+
+
+class EquipmentFilterBackend(django_filters.DjangoFilterBackend):
+    """DjangoFilterBackend, который для выборки вместе с архивом берет EquipmentRecordFilterSet."""
+
+    def get_filterset_class(self, view, queryset=None):
+        if queryset is not None and queryset.model is EquipmentRecord:
+            return EquipmentRecordFilterSet
+        return super().get_filterset_class(view, queryset)
@@ -0,0 +1,218 @@
+import csv
+import json
+import logging
+
+from django.db import DatabaseError, transaction
+
+from .bulk import create_equipment_items, get_bulk_chunk_size
+from .registry import type_registry
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+SERIAL_NUMBER_MAX_LENGTH = 255
+
+
+class RowError(ValueError):
+    """Строку входного файла не удалось разобрать."""
+
+
+class InputDecodeError(ValueError):
+    """Строка тела запроса не в ожидаемой кодировке."""
+
+    def __init__(self, line_num, encoding):
+        super().__init__(f"Строка {line_num} не в кодировке {encoding}.")
+        self.line_num = line_num
+
+
+def decode_lines(stream, encoding='utf-8'):
+    """
+    Построчное чтение байтового потока (тела запроса) без загрузки целиком.
+    Строка не в кодировке encoding - InputDecodeError с ее номером: подменять
+    байты символом-заменителем нельзя, он попал бы в примечания.
+    """
+    for line_num, raw in enumerate(stream, start=1):
+        try:
+            line = raw.decode(encoding)
+        except UnicodeDecodeError:
+            raise InputDecodeError(line_num, encoding) from None
+        if line_num == 1:
+            line = line.lstrip('\ufeff')
+        yield line
+
+
+def iter_csv_records(lines):
+    """
+    Записи CSV с заголовком equipment_type_id,serial_number[,note].
+    Выдает (номер строки, dict или RowError).
+    """
+    reader = csv.DictReader(lines)
+    for record in reader:
+        if None in record:
+            yield reader.line_num, RowError("Лишние колонки в строке.")
+        else:
+            yield reader.line_num, record
+
+
+def iter_ndjson_records(lines):
+    """Записи NDJSON: по JSON-объекту в строке. Выдает (номер строки, dict или RowError)."""
+    for line_num, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_num, RowError("Строка не является корректным JSON.")
+            continue
+        if not isinstance(record, dict):
+            yield line_num, RowError("Строка должна быть JSON-объектом.")
+            continue
+        yield line_num, record
+
+
+RECORD_READERS = {
+    'csv': iter_csv_records,
+    'ndjson': iter_ndjson_records,
+}
+
+
+def parse_record(record):
+    """Приводит запись к (equipment_type_id, serial_number, note) или бросает RowError."""
+    if isinstance(record, RowError):
+        raise record
+    try:
+        equipment_type_id = int(record.get('equipment_type_id'))
+    except (TypeError, ValueError):
+        raise RowError("Не указан или некорректен equipment_type_id.")
+    serial_number = record.get('serial_number')
+    if not isinstance(serial_number, str) or not serial_number:
+        raise RowError("Не указан serial_number.")
+    if len(serial_number) > SERIAL_NUMBER_MAX_LENGTH:
+        raise RowError(f"Серийный номер длиннее {SERIAL_NUMBER_MAX_LENGTH} символов.")
+    note = record.get('note')
+    if note == '':
+        note = None
+    if note is not None and not isinstance(note, str):
+        note = str(note)
+    return equipment_type_id, serial_number, note
+
+
+class EquipmentImporter:
+    """
+    Потоковый импорт оборудования разных типов частями по chunk_size строк.
+
+    Для каждой части: строки разбираются, группируются по типу и передаются в
+    create_equipment_items() - те же проверки маски и уникальности, что и при
+    POST /api/equipment/. После каждой части выдается отчет с ошибками по строкам,
+    в конце - итог. В памяти одновременно находится не больше одной части.
+    """
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or get_bulk_chunk_size()
+        self.rows = 0
+        self.created = 0
+        self.error_count = 0
+
+    def process_chunk(self, records):
+        """records - список (номер строки, запись). Возвращает (created, errors)."""
+        errors = []
+        by_type = {}
+        for line_num, record in records:
+            try:
+                equipment_type_id, serial_number, note = parse_record(record)
+            except RowError as e:
+                errors.append({"line": line_num, "serial_number": None, "error": str(e)})
+                continue
+            by_type.setdefault(equipment_type_id, []).append((line_num, serial_number, note))
+
+        created = 0
+        for equipment_type_id, rows in by_type.items():
+            equipment_type = type_registry.get(equipment_type_id)
+            if equipment_type is None:
+                errors.extend(
+                    {"line": line_num, "serial_number": sn, "error": "Указанный тип оборудования не существует."}
+                    for line_num, sn, _ in rows
+                )
+                continue
+            created_instances, type_errors = create_equipment_items(
+                equipment_type, [(sn, note) for _, sn, note in rows], self.chunk_size
+            )
+            created += len(created_instances)
+            errors.extend(
+                {"line": rows[position][0], **error}
+                for position, error in type_errors
+            )
+        errors.sort(key=lambda error: error["line"])
+        return created, errors
+
+    def run(self, records):
+        """
+        Генератор отчетов по частям; последний отчет - итог с "done": True.
+        Если чтение входа или запись части в БД прервались, итог приходит с
+        "done": False и "error": части до failed_chunk сохранены полностью,
+        failed_chunk и следующие - нет (часть пишется одной транзакцией).
+        """
+        chunk = []
+        chunk_num = 0
+        try:
+            for item in records:
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    chunk_num += 1
+                    yield self._report(chunk_num, chunk)
+                    chunk = []
+            if chunk:
+                chunk_num += 1
+                yield self._report(chunk_num, chunk)
+        except InputDecodeError as e:
+            yield self._summary(chunk_num, {"error": str(e), "line": e.line_num, "failed_chunk": chunk_num + 1})
+            return
+        except DatabaseError:
+            logger.exception("Импорт прерван на части %s", chunk_num)
+            yield self._summary(chunk_num - 1, {
+                "error": "Ошибка базы данных, часть не сохранена.", "failed_chunk": chunk_num
+            })
+            return
+        yield self._summary(chunk_num)
+
+    def _summary(self, chunks, failure=None):
+        return {
+            "done": failure is None,
+            "chunks": chunks,
+            "rows": self.rows,
+            "created": self.created,
+            "errors": self.error_count,
+            **(failure or {}),
+        }
+
+    def _report(self, chunk_num, chunk):
+        with transaction.atomic():
+            created, errors = self.process_chunk(chunk)
+        self.rows += len(chunk)
+        self.created += created
+        self.error_count += len(errors)
+        return {
+            "chunk": chunk_num,
+            "rows": len(chunk),
+            "created": created,
+            "errors": errors,
+            "total_rows": self.rows,
+            "total_created": self.created,
+        }
+
+
+def stream_import(lines, input_format, chunk_size=None):
+    """
+    NDJSON-отчеты импорта для StreamingHttpResponse. Статус 200 к этому моменту
+    уже отправлен, поэтому об ошибке посреди потока сообщает итоговая строка
+    (EquipmentImporter.run), а не обрыв ответа.
+    """
+    importer = EquipmentImporter(chunk_size)
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    for report in importer.run(RECORD_READERS[input_format](lines)):
+        yield encode(report) + "\n"
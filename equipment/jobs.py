@@ -0,0 +1,203 @@
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .bulk import get_bulk_chunk_size
+from .importing import EquipmentImporter, RowError, parse_record
+from .models import ImportJob, ImportJobChunk, ImportJobError
+
+logger = logging.getLogger(__name__)
+
+
+def get_lease_seconds():
+    return getattr(settings, 'IMPORT_JOB_LEASE_SECONDS', 300)
+
+
+def get_max_attempts():
+    return getattr(settings, 'IMPORT_JOB_MAX_ATTEMPTS', 3)
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def submit_import_job(records, user=None, chunk_size=None):
+    """
+    Создает задание импорта из записей (номер строки, dict) - тех же, что дают
+    читатели CSV/NDJSON в equipment/importing.py. Записи разбираются сразу,
+    нечитаемые строки сохраняются как ошибки задания; остальные раскладываются
+    по частям. Задание становится видно воркерам только целиком.
+    """
+    chunk_size = chunk_size or get_bulk_chunk_size()
+    with transaction.atomic():
+        # user_id, а не user: в режиме stateless пользователь - TokenUser без строки в БД
+        job = ImportJob.objects.create(user_id=user.pk if user and user.is_authenticated else None)
+        chunk_rows = []
+        errors = []
+        number = 0
+        total_rows = 0
+        error_count = 0
+
+        def flush():
+            nonlocal number, chunk_rows
+            if chunk_rows:
+                number += 1
+                ImportJobChunk.objects.create(job=job, number=number, rows=chunk_rows)
+                chunk_rows = []
+
+        for line_num, record in records:
+            total_rows += 1
+            try:
+                equipment_type_id, serial_number, note = parse_record(record)
+            except RowError as e:
+                errors.append(ImportJobError(job=job, line=line_num, serial_number=None, error=str(e)))
+                error_count += 1
+                continue
+            chunk_rows.append([line_num, equipment_type_id, serial_number, note])
+            if len(chunk_rows) >= chunk_size:
+                flush()
+            if len(errors) >= chunk_size:
+                ImportJobError.objects.bulk_create(errors)
+                errors = []
+        flush()
+        ImportJobError.objects.bulk_create(errors)
+
+        job.total_rows = total_rows
+        job.chunk_count = number
+        # Строки с ошибками разбора считаются обработанными сразу
+        job.error_count = error_count
+        job.processed_rows = error_count
+        if number == 0:
+            job.status = ImportJob.STATUS_DONE
+            job.finished_at = timezone.now()
+        job.save()
+    return job
+
+
+def _claimable():
+    return Q(status=ImportJobChunk.STATUS_PENDING) | Q(
+        status=ImportJobChunk.STATUS_RUNNING, locked_until__lt=timezone.now()
+    )
+
+
+def claim_chunk(worker_id, lease_seconds=None):
+    """
+    Захватывает одну доступную часть: ожидающую или с истекшей арендой (воркер
+    упал). Захват - условный UPDATE по id, поэтому параллельные воркеры не
+    получают одну и ту же часть на любой СУБД. Возвращает часть или None.
+    """
+    lease_seconds = lease_seconds or get_lease_seconds()
+    candidates = list(
+        ImportJobChunk.objects.filter(_claimable())
+        .order_by('job_id', 'number').values_list('pk', flat=True)[:10]
+    )
+    for pk in candidates:
+        updated = ImportJobChunk.objects.filter(_claimable(), pk=pk).update(
+            status=ImportJobChunk.STATUS_RUNNING,
+            locked_by=worker_id,
+            locked_until=timezone.now() + timedelta(seconds=lease_seconds),
+            attempts=F('attempts') + 1,
+        )
+        if updated:
+            chunk = ImportJobChunk.objects.select_related('job').get(pk=pk)
+            if chunk.job.status == ImportJob.STATUS_PENDING:
+                ImportJob.objects.filter(pk=chunk.job_id, status=ImportJob.STATUS_PENDING).update(
+                    status=ImportJob.STATUS_RUNNING, started_at=timezone.now()
+                )
+            return chunk
+    return None
+
+
+def _finish_job_if_complete(job_id):
+    remaining = ImportJobChunk.objects.filter(job_id=job_id).exclude(
+        status__in=[ImportJobChunk.STATUS_DONE, ImportJobChunk.STATUS_FAILED]
+    )
+    if remaining.exists():
+        return
+    failed = ImportJobChunk.objects.filter(job_id=job_id, status=ImportJobChunk.STATUS_FAILED).exists()
+    ImportJob.objects.filter(
+        pk=job_id, status__in=[ImportJob.STATUS_PENDING, ImportJob.STATUS_RUNNING]
+    ).update(
+        status=ImportJob.STATUS_FAILED if failed else ImportJob.STATUS_DONE,
+        finished_at=timezone.now()
+    )
+
+
+def process_chunk(chunk, worker_id):
+    """
+    Обрабатывает захваченную часть. Вставка оборудования, ошибки, отметка части
+    и счетчики задания фиксируются одной транзакцией: если воркер упадет
+    посередине, ничего не сохранится и часть будет обработана заново.
+    Возвращает True, если часть обработана этим воркером.
+    """
+    try:
+        with transaction.atomic():
+            # Аренда могла истечь и часть ушла другому воркеру
+            owned = ImportJobChunk.objects.select_for_update().filter(
+                pk=chunk.pk, status=ImportJobChunk.STATUS_RUNNING, locked_by=worker_id
+            ).exists()
+            if not owned:
+                return False
+            importer = EquipmentImporter()
+            records = [
+                (line_num, {'equipment_type_id': equipment_type_id, 'serial_number': sn, 'note': note})
+                for line_num, equipment_type_id, sn, note in chunk.rows
+            ]
+            created, errors = importer.process_chunk(records)
+            ImportJobError.objects.bulk_create([
+                ImportJobError(job_id=chunk.job_id, line=error['line'],
+                               serial_number=error['serial_number'], error=error['error'])
+                for error in errors
+            ])
+            ImportJobChunk.objects.filter(pk=chunk.pk).update(
+                status=ImportJobChunk.STATUS_DONE, locked_until=None, last_error=''
+            )
+            ImportJob.objects.filter(pk=chunk.job_id).update(
+                processed_rows=F('processed_rows') + len(chunk.rows),
+                created_count=F('created_count') + created,
+                error_count=F('error_count') + len(errors),
+            )
+        # После фиксации: иначе два воркера, закончившие последние части
+        # одновременно, не увидят чужих незафиксированных отметок
+        _finish_job_if_complete(chunk.job_id)
+        return True
+    except Exception as e:
+        logger.exception("Ошибка обработки части %s задания импорта %s", chunk.pk, chunk.job_id)
+        failed = chunk.attempts >= get_max_attempts()
+        ImportJobChunk.objects.filter(pk=chunk.pk, locked_by=worker_id).update(
+            status=ImportJobChunk.STATUS_FAILED if failed else ImportJobChunk.STATUS_PENDING,
+            locked_until=None,
+            last_error=str(e),
+        )
+        if failed:
+            _finish_job_if_complete(chunk.job_id)
+        return False
+
+
+def run_worker(worker_id=None, once=False, poll_interval=None, stop=None, sleep=None):
+    """
+    Цикл воркера: захватить часть, обработать, повторить. Несколько воркеров
+    (в разных процессах или на разных машинах) работают параллельно.
+    once=True - выйти, когда очередь пуста. Возвращает число обработанных частей.
+    """
+    worker_id = worker_id or default_worker_id()
+    poll_interval = poll_interval if poll_interval is not None else getattr(settings, 'IMPORT_JOB_POLL_INTERVAL', 2)
+    sleep = sleep or time.sleep
+    processed = 0
+    while not (stop and stop()):
+        chunk = claim_chunk(worker_id)
+        if chunk is None:
+            if once:
+                break
+            sleep(poll_interval)
+            continue
+        if process_chunk(chunk, worker_id):
+            processed += 1
+    return processed
@@ -0,0 +1,103 @@
+from functools import lru_cache
+
+from rest_framework.exceptions import ParseError
+
+from .metrics import measure_serialization
+from .models import EquipmentType
+from .registry import type_registry
+from .serializers import EquipmentListSerializer, EquipmentTypeSerializer
+
+# Поля строки списка в порядке EquipmentListSerializer (без write_only)
+LIST_FIELDS = tuple(
+    field for field in EquipmentListSerializer.Meta.fields if field != 'equipment_type_id'
+)
+TYPE_FIELDS = tuple(EquipmentTypeSerializer.Meta.fields)
+
+FIELDS_PARAM = 'fields'
+SHAPE_PARAM = 'shape'
+# nested - тип вложен в каждую строку, как у сериализатора;
+# normalized - в строке id типа, сами типы один раз в equipment_types
+SHAPE_NESTED = 'nested'
+SHAPE_NORMALIZED = 'normalized'
+SHAPES = (SHAPE_NESTED, SHAPE_NORMALIZED)
+
+
+class ListEncoder:
+    """
+    Быстрый путь списка оборудования: строки читаются через values() только
+    с нужными колонками и превращаются в ответ без полей DRF. Без параметров
+    ответ совпадает с EquipmentListSerializer; тип берется из реестра типов,
+    поэтому JOIN с таблицей типов не нужен.
+
+    ?fields=id,serial_number - только эти поля (и только эти колонки в SQL);
+    ?shape=normalized - в строках id типа, типы страницы отдельно в equipment_types.
+    """
+
+    def __init__(self, fields=LIST_FIELDS, shape=SHAPE_NESTED):
+        self.fields = fields
+        self.shape = shape
+        self.with_type = 'equipment_type' in fields
+        self.nest_types = self.with_type and shape == SHAPE_NESTED
+
+    @classmethod
+    def from_request(cls, request):
+        shape = request.query_params.get(SHAPE_PARAM) or SHAPE_NESTED
+        if shape not in SHAPES:
+            raise ParseError(f"Неизвестная форма ответа '{shape}', допустимые: {', '.join(SHAPES)}.")
+        requested = request.query_params.get(FIELDS_PARAM)
+        if not requested:
+            return get_encoder(LIST_FIELDS, shape)
+        names = {name.strip() for name in requested.split(',') if name.strip()}
+        unknown = names - set(LIST_FIELDS)
+        if unknown or not names:
+            raise ParseError(
+                f"Неизвестные поля: {', '.join(sorted(unknown))}, допустимые: {', '.join(LIST_FIELDS)}."
+                if unknown else f"Укажите хотя бы одно поле: {', '.join(LIST_FIELDS)}."
+            )
+        # Порядок полей - как в полном ответе, независимо от порядка в параметре
+        return get_encoder(tuple(field for field in LIST_FIELDS if field in names), shape)
+
+    def queryset(self, queryset, key_fields=()):
+        """values() с полями ответа и ключами курсорной пагинации (key_fields)."""
+        extra = [field for field in key_fields if field not in self.fields]
+        return queryset.values(*self.fields, *extra)
+
+    def encode(self, rows):
+        """
+        Строки values() -> (results, equipment_types). equipment_types - список
+        типов страницы для shape=normalized, иначе None. Строки, в которых нет
+        лишних ключей и не нужно вкладывать тип, отдаются как есть.
+        """
+        with measure_serialization():
+            rows = list(rows)
+            types = self.type_data({row['equipment_type'] for row in rows}) if self.with_type else {}
+            fields = self.fields
+            if self.nest_types:
+                results = [{field: row[field] for field in fields} for row in rows]
+                for item in results:
+                    item['equipment_type'] = types.get(item['equipment_type'])
+            elif rows and len(rows[0]) != len(fields):
+                results = [{field: row[field] for field in fields} for row in rows]
+            else:
+                results = rows
+            if self.shape != SHAPE_NORMALIZED:
+                return results, None
+            return results, [types[type_id] for type_id in sorted(types)]
+
+    def type_data(self, type_ids):
+        """Представления типов (как у EquipmentTypeSerializer) по id из реестра типов."""
+        types = type_registry.in_bulk(type_ids)
+        missing = set(type_ids) - set(types)
+        if missing:
+            # Тип создан только что и реестр еще не перечитан
+            types.update(EquipmentType.objects.in_bulk(missing))
+        return {
+            type_id: {field: getattr(equipment_type, field) for field in TYPE_FIELDS}
+            for type_id, equipment_type in types.items()
+        }
+
+
+@lru_cache(maxsize=None)
+def get_encoder(fields, shape):
+    """Кодировщики общие для запросов с одинаковыми fields и shape."""
+    return ListEncoder(fields, shape)
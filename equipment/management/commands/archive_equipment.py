@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from equipment.archive import archive_deleted_equipment, get_archive_after_days
+
+
+class Command(BaseCommand):
+    help = "Переносит оборудование, удаленное больше заданного числа дней назад, в архивную таблицу."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help="Сколько дней удаленная запись остается в основной таблице (по умолчанию из settings.ini, секция [Archive])."
+        )
+        parser.add_argument('--batch-size', type=int, default=None, help="Записей за одну транзакцию.")
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else get_archive_after_days()
+        if days < 0:
+            raise CommandError("--days не может быть отрицательным.")
+        archived = archive_deleted_equipment(
+            timezone.now() - timedelta(days=days),
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Перенесено в архив: {archived}."))
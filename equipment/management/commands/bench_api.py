@@ -0,0 +1,272 @@
+import json
+import platform
+import statistics
+import time
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from equipment.authentication import EquipmentTokenObtainPairSerializer
+from equipment.datagen import scrambled_serial_numbers
+from equipment.models import Equipment, EquipmentType
+
+# Глубина постраничной пагинации (номер страницы) и курсорной (сколько раз пройти next)
+PAGE_DEPTHS = (1, 10, 100, 1000, 10000)
+CURSOR_DEPTHS = (1, 10, 100)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Case:
+    """Сценарий бенчмарка: один HTTP-запрос; mutating - выполняется в транзакции с откатом."""
+
+    def __init__(self, name, method, path, data=None, mutating=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.data = data
+        self.mutating = mutating
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк API оборудования на текущих данных (см. generate_equipment): создание пакетов, "
+        "списки с фильтрами, поиском и сортировкой, глубина пагинации, обновление и мягкое удаление. "
+        "Изменяющие сценарии откатываются. Результат в JSON можно сравнить с прошлым запуском (--compare)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default=None,
+                            help="Пользователь, от имени которого идут запросы (по умолчанию первый активный суперпользователь).")
+        parser.add_argument('--repeat', type=int, default=20, help="Замеров на сценарий.")
+        parser.add_argument('--warmup', type=int, default=2, help="Незамеряемых запросов перед замерами.")
+        parser.add_argument('--create-batch', type=int, default=1000, help="Номеров в пакете создания.")
+        parser.add_argument('--bulk-size', type=int, default=1000, help="id в массовом удалении.")
+        parser.add_argument('--cases', default=None, help="Только эти сценарии (имена через запятую).")
+        parser.add_argument('--label', default='', help="Метка запуска в результатах (ветка, коммит, настройка).")
+        parser.add_argument('--output', default=None, help="Сохранить результаты в JSON-файл.")
+        parser.add_argument('--compare', default=None, help="JSON-файл прошлого запуска для сравнения.")
+        parser.add_argument('--threshold', type=float, default=20,
+                            help="Рост p50 в процентах, который считается регрессией.")
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help="Завершиться с ошибкой, если есть регрессии.")
+        parser.add_argument('--json', action='store_true', help="Вывести результат в JSON.")
+
+    def get_user(self, username):
+        users = get_user_model().objects.filter(is_active=True)
+        user = users.filter(username=username).first() if username else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("Не найден активный пользователь, укажите --username.")
+        return user
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or options['warmup'] < 0:
+            raise CommandError("--repeat должно быть не меньше 1, --warmup не может быть отрицательным.")
+        user = self.get_user(options['username'])
+        token = str(EquipmentTokenObtainPairSerializer.get_token(user).access_token)
+        host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*',) and not host.startswith('.')), 'localhost')
+        self.client = APIClient(SERVER_NAME=host)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        cases = self.build_cases(options)
+        if options['cases']:
+            selected = {name.strip() for name in options['cases'].split(',')}
+            unknown = selected - {case.name for case in cases}
+            if unknown:
+                raise CommandError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}.")
+            cases = [case for case in cases if case.name in selected]
+
+        results = [self.run_case(case, options) for case in cases]
+
+        report = {
+            'benchmark': 'api',
+            'label': options['label'],
+            'started_at': timezone.now().isoformat(),
+            'environment': self.environment(),
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        comparison = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                comparison = compare_reports(json.load(f), report, options['threshold'])
+            report['comparison'] = comparison
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False))
+        else:
+            self.write_table(results, comparison)
+        if comparison and options['fail_on_regression']:
+            regressions = [row['case'] for row in comparison if row['regression']]
+            if regressions:
+                raise CommandError(f"Регрессии: {', '.join(regressions)}.")
+
+    def environment(self):
+        equipment = Equipment.objects.aggregate(total=Count('id'))['total']
+        return {
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'equipment': equipment,
+            'equipment_types': EquipmentType.objects.count(),
+            'page_size': int(settings.PAGE_SIZE),
+            'count_mode': getattr(settings, 'COUNT_MODE', 'exact'),
+            'search_backend': getattr(settings, 'SEARCH_BACKEND', 'trigram'),
+            'auth_mode': getattr(settings, 'AUTH_MODE', 'db'),
+        }
+
+    def build_cases(self, options):
+        """Сценарии по текущим данным: самый крупный тип, запись из середины, подстрока номера."""
+        largest = (Equipment.objects.filter(is_deleted=False).values('equipment_type_id')
+                   .annotate(total=Count('id')).order_by('-total').first())
+        if largest is None:
+            raise CommandError("Нет активного оборудования: сначала manage.py generate_equipment.")
+        equipment_type = EquipmentType.objects.get(pk=largest['equipment_type_id'])
+        active = Equipment.objects.filter(equipment_type=equipment_type, is_deleted=False).order_by('id')
+        sample = active[largest['total'] // 2]
+        serial_number = sample.serial_number
+        term = serial_number[len(serial_number) // 2 - 2:len(serial_number) // 2 + 2]
+        bulk_ids = list(active.values_list('id', flat=True)[:options['bulk_size']])
+        existing_serial_numbers = list(active.values_list('serial_number', flat=True)[:options['create_batch']])
+        # Номера, следующие в последовательности генератора за уже вставленными
+        type_rows = Equipment.objects.filter(equipment_type=equipment_type).count()
+        new_serial_numbers = scrambled_serial_numbers(
+            equipment_type.serial_number_mask, type_rows, options['create_batch']
+        )
+        type_id = equipment_type.pk
+
+        cases = [
+            Case('list', 'get', '/api/equipment/'),
+            Case('list_deleted', 'get', '/api/equipment/?is_deleted=true'),
+            Case('filter_type', 'get', f'/api/equipment/?equipment_type__id={type_id}'),
+            Case('filter_serial_number', 'get', f'/api/equipment/?serial_number={serial_number}'),
+            Case('search', 'get', f'/api/equipment/?search={term}'),
+            Case('serial_number_icontains', 'get', f'/api/equipment/?serial_number__icontains={term}'),
+            Case('serial_number_istartswith', 'get', f'/api/equipment/?serial_number__istartswith={serial_number[:4]}'),
+            Case('note_icontains', 'get', '/api/equipment/?note__icontains=склад'),
+            Case('ordering_serial_number', 'get', '/api/equipment/?ordering=-serial_number'),
+            Case('ordering_type_name', 'get', '/api/equipment/?ordering=equipment_type__name'),
+            Case('filter_type_ordering', 'get', f'/api/equipment/?equipment_type__id={type_id}&ordering=serial_number'),
+            Case('retrieve', 'get', f'/api/equipment/{sample.pk}/'),
+            Case('check_batch', 'post', '/api/equipment/check/',
+                 {'equipment_type_id': type_id, 'serial_numbers': existing_serial_numbers + new_serial_numbers}),
+        ]
+        page_count = -(-Equipment.objects.filter(is_deleted=False).count() // int(settings.PAGE_SIZE))
+        cases += [
+            Case(f'page_{depth}', 'get', f'/api/equipment/?page={depth}')
+            for depth in PAGE_DEPTHS if depth <= page_count
+        ]
+        cases += [
+            Case(f'cursor_{depth}', 'get', path)
+            for depth, path in self.cursor_paths(CURSOR_DEPTHS)
+        ]
+        cases += [
+            Case('create_batch', 'post', '/api/equipment/',
+                 {'equipment_type_id': type_id, 'serial_numbers': new_serial_numbers, 'note': 'bench'}, mutating=True),
+            Case('update', 'patch', f'/api/equipment/{sample.pk}/', {'note': 'bench'}, mutating=True),
+            Case('soft_delete', 'delete', f'/api/equipment/{sample.pk}/', mutating=True),
+            Case('bulk_delete', 'post', '/api/equipment/bulk-delete/', {'ids': bulk_ids}, mutating=True),
+        ]
+        return cases
+
+    def cursor_paths(self, depths):
+        """Пути страниц курсорной пагинации на заданной глубине (проход по next)."""
+        path = '/api/equipment/?pagination=cursor'
+        paths = []
+        for depth in range(1, max(depths) + 1):
+            if depth in depths:
+                paths.append((depth, path))
+            next_link = self.client.get(path).json().get('next')
+            if not next_link:
+                break
+            parts = urlsplit(next_link)
+            path = f"{parts.path}?{parts.query}"
+        return paths
+
+    def request(self, case):
+        if case.data is None:
+            return getattr(self.client, case.method)(case.path)
+        return getattr(self.client, case.method)(case.path, case.data, format='json')
+
+    def run_case(self, case, options):
+        timings = []
+        queries = []
+        status_code = None
+        for number in range(options['warmup'] + options['repeat']):
+            with transaction.atomic() if case.mutating else nullcontext():
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = self.request(case)
+                    elapsed = time.perf_counter() - started
+                if case.mutating:
+                    transaction.set_rollback(True)
+            status_code = response.status_code
+            if status_code >= 400:
+                raise CommandError(f"{case.name}: {case.method.upper()} {case.path} вернул {status_code}.")
+            if number >= options['warmup']:
+                timings.append(elapsed)
+                queries.append(len(captured.captured_queries))
+        return {
+            'case': case.name,
+            'method': case.method.upper(),
+            'path': case.path if len(case.path) <= 200 else case.path[:200] + '...',
+            'status': status_code,
+            'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+            'min_ms': round(min(timings) * 1000, 3),
+            'queries': max(queries),
+        }
+
+    def write_table(self, results, comparison):
+        self.stdout.write(f"{'сценарий':>28} {'p50 мс':>9} {'p95 мс':>9} {'SQL':>5}" + (
+            f" {'было p50':>9} {'изм. %':>7} {'было SQL':>9}" if comparison else ""
+        ))
+        rows = {row['case']: row for row in comparison or ()}
+        for result in results:
+            line = f"{result['case']:>28} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['queries']:>5}"
+            row = rows.get(result['case'])
+            if row:
+                line += f" {row['baseline_p50_ms']:>9} {row['p50_change_pct']:>7} {row['baseline_queries']:>9}"
+                if row['regression']:
+                    line += "  регрессия"
+            self.stdout.write(line)
+
+
+def compare_reports(baseline, current, threshold):
+    """
+    Сравнение с прошлым запуском по сценариям, которые есть в обоих.
+    Регрессия - рост p50 больше чем на threshold процентов или больше SQL-запросов.
+    """
+    baseline_results = {result['case']: result for result in baseline.get('results', ())}
+    rows = []
+    for result in current['results']:
+        before = baseline_results.get(result['case'])
+        if before is None:
+            continue
+        change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+        rows.append({
+            'case': result['case'],
+            'baseline_p50_ms': before['p50_ms'],
+            'p50_ms': result['p50_ms'],
+            'p50_change_pct': round(change, 1),
+            'baseline_queries': before['queries'],
+            'queries': result['queries'],
+            'regression': change > threshold or result['queries'] > before['queries'],
+        })
+    return rows
@@ -0,0 +1,96 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve
+from rest_framework.test import APIRequestFactory
+
+from equipment.authentication import AUTH_MODES, EquipmentTokenObtainPairSerializer, forget_user
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк JWT-аутентификации: время и число запросов к БД на один GET "
+        "к API в каждом режиме [Auth] mode. Данные не изменяются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default=None,
+                            help="Пользователь, от имени которого идут запросы (по умолчанию первый активный суперпользователь).")
+        parser.add_argument('--path', default='/api/equipment/', help="Путь запроса.")
+        parser.add_argument('--requests', type=int, default=200, help="Запросов на режим.")
+        parser.add_argument('--modes', default=','.join(AUTH_MODES), help="Режимы через запятую.")
+        parser.add_argument('--conditional', action='store_true',
+                            help="Передавать If-None-Match с ETag первого ответа (ответы 304).")
+        parser.add_argument('--json', action='store_true', help="Вывести результат в JSON.")
+
+    def get_user(self, username):
+        users = get_user_model().objects.filter(is_active=True)
+        user = users.filter(username=username).first() if username else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("Не найден активный пользователь, укажите --username.")
+        return user
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',')]
+        for mode in modes:
+            if mode not in AUTH_MODES:
+                raise CommandError(f"Неизвестный режим '{mode}', допустимые: {', '.join(AUTH_MODES)}.")
+        user = self.get_user(options['username'])
+        token = str(EquipmentTokenObtainPairSerializer.get_token(user).access_token)
+        host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*',) and not host.startswith('.')), 'localhost')
+        factory = APIRequestFactory(SERVER_NAME=host)
+        path = options['path']
+        view = resolve(path.split('?')[0]).func
+        user_table = get_user_model()._meta.db_table
+
+        def make_request(etag=None):
+            extra = {'HTTP_AUTHORIZATION': f"Bearer {token}"}
+            if etag:
+                extra['HTTP_IF_NONE_MATCH'] = etag
+            return factory.get(path, **extra)
+
+        results = []
+        for mode in modes:
+            with override_settings(AUTH_MODE=mode):
+                forget_user(user.pk)
+                # Прогрев: кэши пользователя, реестра типов, версий
+                response = view(make_request())
+                if response.status_code != 200:
+                    raise CommandError(f"Запрос {path} вернул {response.status_code}.")
+                etag = response.get('ETag') if options['conditional'] else None
+                queries = 0
+                auth_queries = 0
+                started = time.perf_counter()
+                for _ in range(options['requests']):
+                    with CaptureQueriesContext(connection) as captured:
+                        response = view(make_request(etag))
+                        if hasattr(response, 'render'):
+                            response.render()
+                    queries += len(captured.captured_queries)
+                    auth_queries += sum(1 for query in captured.captured_queries if user_table in query['sql'])
+                elapsed = time.perf_counter() - started
+            results.append({
+                'mode': mode,
+                'status': response.status_code,
+                'queries_per_request': round(queries / options['requests'], 2),
+                'auth_queries_per_request': round(auth_queries / options['requests'], 2),
+                'ms_per_request': round(elapsed * 1000 / options['requests'], 3),
+            })
+
+        report = {'benchmark': 'auth', 'path': path, 'requests': options['requests'],
+                  'conditional': options['conditional'], 'results': results}
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False))
+            return
+        self.stdout.write(f"GET {path}, запросов на режим: {options['requests']}")
+        self.stdout.write(f"{'режим':>10} {'код':>5} {'SQL/запрос':>11} {'auth_user':>10} {'мс/запрос':>10}")
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:>10} {result['status']:>5} {result['queries_per_request']:>11} "
+                f"{result['auth_queries_per_request']:>10} {result['ms_per_request']:>10}"
+            )
@@ -0,0 +1,149 @@
+import copy
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.db.utils import load_backend
+
+from core.db.pool import PooledConnectionMixin, get_pool
+
+from .bench_load import percentile
+
+# Режимы работы с соединениями:
+#   new        - CONN_MAX_AGE=0: подключение на каждый запрос (прежнее поведение);
+#   persistent - CONN_MAX_AGE: соединение живет в своем потоке между запросами;
+#   pool       - пул на процесс (OPTIONS['pool']), общий для всех потоков.
+MODES = ('new', 'persistent', 'pool')
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк соединений с БД: задержка запроса (p50, p95) и число подключений "
+        "при новом соединении на запрос, постоянных соединениях и пуле. "
+        "Каждый запрос - как запрос к API: проверка соединения в начале, "
+        "один SQL-запрос и закрытие (или возврат) в конце. Данные не изменяются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help="Алиас БД из DATABASES.")
+        parser.add_argument('--requests', type=int, default=2000, help="Запросов на режим.")
+        parser.add_argument('--threads', type=int, default=8,
+                            help="Потоков, как у WSGI-сервера или пула потоков ASGI.")
+        parser.add_argument('--modes', default=','.join(MODES),
+                            help=f"Режимы через запятую: {', '.join(MODES)}.")
+        parser.add_argument('--conn-max-age', type=int, default=60,
+                            help="CONN_MAX_AGE для режима persistent, секунд.")
+        parser.add_argument('--sql', default="SELECT 1", help="SQL-запрос, выполняемый на каждый запрос.")
+        parser.add_argument('--json', action='store_true', help="Вывести результат в JSON.")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['threads'] < 1:
+            raise CommandError("--requests и --threads должны быть не меньше 1.")
+        modes = [mode.strip() for mode in options['modes'].split(',')]
+        for mode in modes:
+            if mode not in MODES:
+                raise CommandError(f"Неизвестный режим '{mode}', допустимые: {', '.join(MODES)}.")
+
+        base_settings = connections[options['database']].settings_dict
+        results = [self.run_mode(mode, base_settings, options) for mode in modes]
+        report = {
+            'benchmark': 'db', 'vendor': connections[options['database']].vendor,
+            'requests': options['requests'], 'threads': options['threads'], 'results': results,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False))
+            return
+        self.stdout.write(
+            f"БД: {report['vendor']}, запросов на режим: {options['requests']}, потоков: {options['threads']}"
+        )
+        self.stdout.write(f"{'режим':>11} {'запр/с':>9} {'p50 мс':>8} {'p95 мс':>8} {'сред. мс':>9} {'подключений':>12}")
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:>11} {result['rps']:>9} {result['p50_ms']:>8} {result['p95_ms']:>8} "
+                f"{result['mean_ms']:>9} {result['connects']:>12}"
+            )
+
+    def get_wrapper_class(self, settings_dict, mode):
+        wrapper_class = load_backend(settings_dict['ENGINE']).DatabaseWrapper
+        if mode == 'pool' and not issubclass(wrapper_class, PooledConnectionMixin):
+            # Бэкенд без пула (например, sqlite): та же примесь, что в core.db.mysql
+            wrapper_class = type('PooledDatabaseWrapper', (PooledConnectionMixin, wrapper_class), {})
+        return wrapper_class
+
+    def get_settings(self, base_settings, mode, options):
+        settings_dict = copy.deepcopy(base_settings)
+        options_dict = settings_dict.setdefault('OPTIONS', {})
+        pool_options = options_dict.pop('pool', None)
+        if mode == 'new':
+            settings_dict['CONN_MAX_AGE'] = 0
+        elif mode == 'persistent':
+            settings_dict['CONN_MAX_AGE'] = options['conn_max_age']
+        else:
+            settings_dict['CONN_MAX_AGE'] = 0
+            options_dict['pool'] = {
+                **(pool_options or {}),
+                'size': max(options['threads'], (pool_options or {}).get('size', 0)),
+            }
+        return settings_dict
+
+    def run_mode(self, mode, base_settings, options):
+        alias = f"bench-{mode}"
+        settings_dict = self.get_settings(base_settings, mode, options)
+        wrapper_class = self.get_wrapper_class(settings_dict, mode)
+        lock = threading.Lock()
+        connected = 0
+
+        def count_connection(sender, connection, **kwargs):
+            nonlocal connected
+            if connection.alias == alias:
+                with lock:
+                    connected += 1
+
+        local = threading.local()
+        wrappers = []
+
+        def request():
+            wrapper = getattr(local, 'wrapper', None)
+            if wrapper is None:
+                wrapper = local.wrapper = wrapper_class(copy.deepcopy(settings_dict), alias)
+                with lock:
+                    wrappers.append(wrapper)
+            started = time.perf_counter()
+            # Как request_started / request_finished: close_old_connections()
+            wrapper.close_if_unusable_or_obsolete()
+            with wrapper.cursor() as cursor:
+                cursor.execute(options['sql'])
+                cursor.fetchall()
+            wrapper.close_if_unusable_or_obsolete()
+            return time.perf_counter() - started
+
+        connection_created.connect(count_connection, weak=False)
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                latencies = list(executor.map(lambda _: request(), range(options['requests'])))
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connection)
+            for wrapper in wrappers:
+                # Соединения потоков закрываются из этого потока
+                wrapper.inc_thread_sharing()
+                wrapper.close()
+        if mode == 'pool':
+            pool = get_pool(alias, settings_dict['OPTIONS']['pool'])
+            # connection_created отправляется и при выдаче из пула: считаем настоящие подключения
+            connected = pool.created
+            pool.close_all()
+
+        return {
+            'mode': mode,
+            'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+            'connects': connected,
+        }
@@ -0,0 +1,304 @@
+import asyncio
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from equipment.authentication import EquipmentTokenObtainPairSerializer
+
+# Встроенные цели: сервер приложения в этом же процессе
+#   wsgi      - core.wsgi, синхронный путь, пул из --threads потоков (как gunicorn --threads);
+#   asgi      - core.asgi, асинхронный путь /api/async/...;
+#   asgi-sync - core.asgi, синхронный путь: каждый запрос уходит в поток.
+TARGETS = ('wsgi', 'asgi', 'asgi-sync')
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def async_path(path):
+    """Путь синхронного API -> тот же путь асинхронного (/api/equipment/ -> /api/async/equipment/)."""
+    if not path.startswith('/api/') or path.startswith('/api/async/'):
+        return path
+    return '/api/async/' + path[len('/api/'):]
+
+
+class InProcessWSGI:
+    """WSGI-приложение в пуле потоков: одновременно обрабатывается не больше threads запросов."""
+
+    def __init__(self, threads, host):
+        from core.wsgi import application
+        self.application = application
+        self.host = host
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def _call(self, path, headers):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+            'SERVER_NAME': self.host, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1', 'HTTP_HOST': self.host,
+            'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+            'wsgi.errors': io.StringIO(), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers.items():
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+        started = []
+        response = self.application(
+            environ, lambda code, response_headers, exc_info=None: started.append((code, response_headers))
+        )
+        try:
+            for _ in response:
+                pass
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        code, response_headers = started[0]
+        return int(code.split()[0]), dict((name.lower(), value) for name, value in response_headers).get('etag')
+
+    async def request(self, path, headers, client=0):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, self._call, path, headers)
+
+    async def close(self):
+        self.pool.shutdown()
+
+
+class InProcessASGI:
+    """ASGI-приложение в цикле событий этого процесса."""
+
+    def __init__(self, host):
+        from core.asgi import application
+        self.application = application
+        self.host = host
+
+    async def request(self, path, headers, client=0):
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'client': ('127.0.0.1', 0), 'server': (self.host, 80),
+            'headers': [(b'host', self.host.encode())] + [
+                (name.lower().encode(), value.encode()) for name, value in headers.items()
+            ],
+        }
+        disconnected = asyncio.Event()
+        status = []
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response_headers = {name.decode().lower(): value.decode() for name, value in message['headers']}
+                status.append((message['status'], response_headers.get('etag')))
+
+        await self.application(scope, receive, send)
+        disconnected.set()
+        return status[0]
+
+    async def close(self):
+        pass
+
+
+class HTTPTarget:
+    """Внешний сервер по URL (uvicorn, gunicorn, ...): по соединению keep-alive на клиента."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise CommandError(f"Поддерживаются только адреса http://host:port, получено '{url}'.")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.connections = {}
+
+    async def _connection(self, client):
+        if client not in self.connections:
+            self.connections[client] = await asyncio.open_connection(self.host, self.port)
+        return self.connections[client]
+
+    async def request(self, path, headers, client=0):
+        try:
+            return await self._request(path, headers, client)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # Сервер закрыл соединение keep-alive: повторяем на новом
+            self.connections.pop(client, None)
+            return await self._request(path, headers, client)
+
+    async def _request(self, path, headers, client):
+        reader, writer = await self._connection(client)
+        lines = [f"GET {self.prefix}{path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+
+        status = int((await reader.readuntil(b"\r\n")).split()[1])
+        response_headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b';')[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif 'content-length' in response_headers:
+            await reader.readexactly(int(response_headers['content-length']))
+        if response_headers.get('connection', '').lower() == 'close':
+            writer.close()
+            self.connections.pop(client, None)
+        return status, response_headers.get('etag')
+
+    async def close(self):
+        for _, writer in self.connections.values():
+            writer.close()
+        self.connections.clear()
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный бенчмарк чтения API: запросы в секунду и задержки (p50, p99) "
+        "при большом числе одновременных клиентов для развертываний WSGI и ASGI. "
+        "Данные не изменяются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default=None,
+                            help="Пользователь, от имени которого идут запросы (по умолчанию первый активный суперпользователь).")
+        parser.add_argument('--path', default='/api/equipment/', help="Путь синхронного API.")
+        parser.add_argument('--async-path', default=None,
+                            help="Путь асинхронного API (по умолчанию --path с префиксом /api/async/).")
+        parser.add_argument('--requests', type=int, default=2000, help="Запросов на цель.")
+        parser.add_argument('--concurrency', type=int, default=64, help="Одновременных клиентов.")
+        parser.add_argument('--threads', type=int, default=8,
+                            help="Потоков WSGI-сервера для встроенной цели wsgi.")
+        parser.add_argument('--targets', default=','.join(TARGETS),
+                            help=f"Встроенные цели через запятую: {', '.join(TARGETS)}.")
+        parser.add_argument('--url', action='append', default=[], metavar='NAME=URL',
+                            help="Внешний сервер, например wsgi=http://127.0.0.1:8000 "
+                                 "(можно несколько; тогда встроенные цели не запускаются). "
+                                 "Для имен, начинающихся с asgi, запрашивается асинхронный путь.")
+        parser.add_argument('--conditional', action='store_true',
+                            help="Передавать If-None-Match с ETag (ответы 304).")
+        parser.add_argument('--json', action='store_true', help="Вывести результат в JSON.")
+
+    def get_user(self, username):
+        users = get_user_model().objects.filter(is_active=True)
+        user = users.filter(username=username).first() if username else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("Не найден активный пользователь, укажите --username.")
+        return user
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1 or options['threads'] < 1:
+            raise CommandError("--requests, --concurrency и --threads должны быть не меньше 1.")
+        user = self.get_user(options['username'])
+        token = str(EquipmentTokenObtainPairSerializer.get_token(user).access_token)
+        host = next((host for host in settings.ALLOWED_HOSTS if host not in ('*',) and not host.startswith('.')), 'localhost')
+        sync_path = options['path']
+        asgi_path = options['async_path'] or async_path(sync_path)
+
+        targets = []
+        if options['url']:
+            for value in options['url']:
+                name, sep, url = value.partition('=')
+                if not sep:
+                    raise CommandError(f"Ожидается NAME=URL, получено '{value}'.")
+                targets.append((name, lambda url=url: HTTPTarget(url), asgi_path if name.startswith('asgi') else sync_path))
+        else:
+            factories = {
+                'wsgi': (lambda: InProcessWSGI(options['threads'], host), sync_path),
+                'asgi': (lambda: InProcessASGI(host), asgi_path),
+                'asgi-sync': (lambda: InProcessASGI(host), sync_path),
+            }
+            for name in options['targets'].split(','):
+                name = name.strip()
+                if name not in factories:
+                    raise CommandError(f"Неизвестная цель '{name}', допустимые: {', '.join(TARGETS)}.")
+                targets.append((name, *factories[name]))
+
+        results = [
+            asyncio.run(self.run_target(name, factory(), path, token, options))
+            for name, factory, path in targets
+        ]
+        report = {
+            'benchmark': 'load', 'requests': options['requests'], 'concurrency': options['concurrency'],
+            'threads': options['threads'], 'conditional': options['conditional'], 'results': results,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False))
+            return
+        self.stdout.write(
+            f"Запросов на цель: {options['requests']}, клиентов: {options['concurrency']}, "
+            f"потоков WSGI: {options['threads']}"
+        )
+        self.stdout.write(f"{'цель':>10} {'путь':>28} {'запр/с':>9} {'p50 мс':>8} {'p99 мс':>8} {'max мс':>8} {'ошибки':>7}")
+        for result in results:
+            self.stdout.write(
+                f"{result['target']:>10} {result['path']:>28} {result['rps']:>9} {result['p50_ms']:>8} "
+                f"{result['p99_ms']:>8} {result['max_ms']:>8} {result['errors']:>7}"
+            )
+
+    async def run_target(self, name, target, path, token, options):
+        headers = {'Authorization': f"Bearer {token}"}
+        try:
+            # Прогрев: кэши, реестр типов, соединения; заодно ETag для --conditional
+            status, etag = await target.request(path, headers)
+            if status != 200:
+                raise CommandError(f"{name}: запрос {path} вернул {status}.")
+            if options['conditional'] and etag:
+                headers['If-None-Match'] = etag
+
+            remaining = options['requests']
+            latencies = []
+            statuses = {}
+
+            async def client(number):
+                nonlocal remaining
+                while remaining > 0:
+                    remaining -= 1
+                    started = time.perf_counter()
+                    try:
+                        code, _ = await target.request(path, headers, number)
+                    except Exception as e:
+                        code = type(e).__name__
+                    latencies.append(time.perf_counter() - started)
+                    statuses[code] = statuses.get(code, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(client(number) for number in range(options['concurrency'])))
+            elapsed = time.perf_counter() - started
+        finally:
+            await target.close()
+
+        expected = 304 if options['conditional'] else 200
+        return {
+            'target': name,
+            'path': path,
+            'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'max_ms': round(max(latencies) * 1000, 2),
+            'errors': sum(count for code, count in statuses.items() if code != expected),
+            'statuses': {str(code): count for code, count in statuses.items()},
+        }
@@ -0,0 +1,79 @@
+import json
+import os
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from equipment.masks import get_validator, partition_serial_numbers, random_serial_number, shutdown_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк проверки серийных номеров по маске: один процесс против пула "
+        "процессов разного размера. Работает без БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000000, help="Номеров в пакете.")
+        parser.add_argument('--mask', default='XXAAAAAXAA', help="Маска серийного номера.")
+        parser.add_argument('--workers', default=None,
+                            help="Список размеров пула через запятую (по умолчанию 1,2,4,... до числа ядер).")
+        parser.add_argument('--repeat', type=int, default=3, help="Повторов, берется лучшее время.")
+        parser.add_argument('--invalid-ratio', type=float, default=0.01, help="Доля неподходящих номеров.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--json', action='store_true', help="Вывести результат в JSON.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        mask = options['mask']
+        serial_numbers = [
+            random_serial_number(mask, rng) if rng.random() >= options['invalid_ratio'] else '!' * len(mask)
+            for _ in range(options['count'])
+        ]
+        if options['workers']:
+            worker_counts = [int(value) for value in options['workers'].split(',')]
+        else:
+            worker_counts = []
+            workers = 1
+            while workers < (os.cpu_count() or 1):
+                worker_counts.append(workers)
+                workers *= 2
+            worker_counts.append(os.cpu_count() or 1)
+
+        validator = get_validator(mask)
+        expected = validator.partition(serial_numbers)
+        results = []
+        for workers in worker_counts:
+            # Первый вызов поднимает пул, его не учитываем
+            partition_serial_numbers(validator, serial_numbers[:workers * 10], workers=workers, threshold=1)
+            best = None
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                outcome = partition_serial_numbers(validator, serial_numbers, workers=workers, threshold=1)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            if outcome != expected:
+                self.stderr.write(f"Результат для {workers} процессов отличается от однопроцессного!")
+            results.append({
+                'workers': workers,
+                'seconds': round(best, 4),
+                'serials_per_second': int(options['count'] / best) if best else None,
+            })
+            shutdown_pool()
+
+        baseline = results[0]['seconds']
+        for result in results:
+            result['speedup'] = round(baseline / result['seconds'], 2) if result['seconds'] else None
+
+        report = {'benchmark': 'validation', 'count': options['count'], 'mask': mask,
+                  'cpu_count': os.cpu_count(), 'results': results}
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False))
+            return
+        self.stdout.write(f"Номеров: {options['count']}, маска: {mask}, ядер: {os.cpu_count()}")
+        self.stdout.write(f"{'процессов':>10} {'секунд':>10} {'номеров/с':>12} {'ускорение':>10}")
+        for result in results:
+            self.stdout.write(
+                f"{result['workers']:>10} {result['seconds']:>10} {result['serials_per_second']:>12} {result['speedup']:>10}"
+            )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from equipment.spa import get_build_dir, write_build
+
+
+class Command(BaseCommand):
+    help = (
+        "Собирает SPA из public/index.html: стили и скрипт выносятся в файлы с хешем "
+        "содержимого в имени, для каждого файла пишутся варианты .gz и .br (если "
+        "установлен пакет brotli). Запускается после каждого изменения public/index.html."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None, help="Каталог сборки (по умолчанию public/dist).")
+
+    def handle(self, *args, **options):
+        build_dir = options['output'] or get_build_dir()
+        manifest = write_build(build_dir)
+        for name, entry in manifest.items():
+            encodings = ", ".join(entry['encodings']) or "без сжатия"
+            self.stdout.write(f"{name}: {entry['size']} байт ({encodings})")
+        self.stdout.write(self.style.SUCCESS(f"Сборка записана в {build_dir}."))
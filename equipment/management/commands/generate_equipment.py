@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from equipment.datagen import generate_equipment
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует синтетическое оборудование для бенчмарков: N записей с номерами, "
+        "подходящими под маски, по множеству типов. Повторный запуск дописывает данные."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000000, help="Сколько записей добавить.")
+        parser.add_argument('--types', type=int, default=20, help="Число синтетических типов.")
+        parser.add_argument('--prefix', default='bench-', help="Префикс имен синтетических типов.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--deleted-ratio', type=float, default=0.05, help="Доля мягко удаленных записей.")
+        parser.add_argument('--note-ratio', type=float, default=0.3, help="Доля записей с примечанием.")
+        parser.add_argument('--batch-size', type=int, default=None, help="Записей за один bulk_create.")
+        parser.add_argument('--no-index', action='store_true',
+                            help="Не перестраивать поисковый индекс (потом manage.py rebuild_search_index).")
+
+    def handle(self, *args, **options):
+        if options['count'] < 0 or options['types'] < 1:
+            raise CommandError("--count не может быть отрицательным, --types должно быть не меньше 1.")
+        started = time.perf_counter()
+        inserted = generate_equipment(
+            options['count'],
+            type_count=options['types'],
+            prefix=options['prefix'],
+            seed=options['seed'],
+            deleted_ratio=options['deleted_ratio'],
+            note_ratio=options['note_ratio'],
+            batch_size=options['batch_size'],
+            index=not options['no_index'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Добавлено записей: {inserted} за {time.perf_counter() - started:.1f} с."
+        ))
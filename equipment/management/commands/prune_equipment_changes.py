@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from equipment.changes import prune_changes
+
+
+class Command(BaseCommand):
+    help = "Удаляет из журнала изменений оборудования записи старше заданного числа дней."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help="Сколько дней хранить изменения.")
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError("--days должно быть не меньше 1.")
+        deleted = prune_changes(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f"Удалено изменений: {deleted}."))
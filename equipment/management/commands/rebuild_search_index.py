@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ImproperlyConfigured
+
+from equipment.search import SEARCH_BACKENDS, get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Строит или перестраивает поисковый индекс серийных номеров и примечаний."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', choices=sorted(SEARCH_BACKENDS),
+            help="Бэкенд поиска (по умолчанию из settings.ini, секция [Search])."
+        )
+        parser.add_argument('--batch-size', type=int, default=None, help="Записей за один проход.")
+
+    def handle(self, *args, **options):
+        if options['backend']:
+            backend = SEARCH_BACKENDS[options['backend']]()
+        else:
+            backend = get_search_backend()
+        try:
+            backend.rebuild(batch_size=options['batch_size'], log=self.stdout.write)
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Индекс '{backend.name}' перестроен."))
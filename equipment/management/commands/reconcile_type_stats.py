@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from equipment.stats import recount_types
+
+
+class Command(BaseCommand):
+    help = (
+        "Сверяет статистику типов оборудования (число действующих и удаленных записей) "
+        "с данными и исправляет расхождения."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', type=int, action='append', dest='type_ids',
+                            help="Только этот тип (id), можно указать несколько раз.")
+        parser.add_argument('--dry-run', action='store_true', help="Только показать расхождения.")
+        parser.add_argument('--fail-on-difference', action='store_true',
+                            help="Завершиться с ошибкой, если есть расхождения (для мониторинга).")
+
+    def handle(self, *args, **options):
+        differences = recount_types(options['type_ids'], dry_run=options['dry_run'])
+        for type_id, (stored, actual) in differences.items():
+            stored = "нет" if stored is None else f"{stored[0]}/{stored[1]}"
+            self.stdout.write(f"Тип {type_id}: было {stored}, по данным {actual[0]}/{actual[1]} (действующих/удаленных)")
+        verb = "Найдено" if options['dry_run'] else "Исправлено"
+        self.stdout.write(self.style.SUCCESS(f"{verb} расхождений: {len(differences)}."))
+        if differences and options['fail_on_difference']:
+            raise CommandError(f"Статистика расходится с данными у {len(differences)} типов.")
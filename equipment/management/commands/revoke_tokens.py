@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from equipment.authentication import revoke_user_tokens
+
+
+class Command(BaseCommand):
+    help = "Отзывает все выданные JWT-токены пользователя (выход на всех устройствах)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f"Пользователь '{options['username']}' не найден.")
+        revoke_user_tokens(user.pk)
+        self.stdout.write(self.style.SUCCESS(f"Токены пользователя '{user.username}' отозваны."))
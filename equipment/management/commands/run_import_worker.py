@@ -0,0 +1,38 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from equipment.jobs import default_worker_id, run_worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Воркер фоновых заданий импорта: забирает части заданий из очереди в БД и "
+        "выполняет их. Можно запускать несколько процессов параллельно."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Выйти, когда очередь пуста.")
+        parser.add_argument('--worker-id', default=None, help="Имя воркера (по умолчанию хост:pid).")
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help="Пауза между опросами пустой очереди, секунд.")
+
+    def handle(self, *args, **options):
+        worker_id = options['worker_id'] or default_worker_id()
+        stopping = []
+
+        def request_stop(signum, frame):
+            # Текущая часть дорабатывается, затем воркер выходит
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        self.stdout.write(f"Воркер {worker_id} запущен.")
+        processed = run_worker(
+            worker_id=worker_id,
+            once=options['once'],
+            poll_interval=options['poll_interval'],
+            stop=lambda: bool(stopping),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Воркер {worker_id} остановлен, обработано частей: {processed}."))
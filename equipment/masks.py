@@ -0,0 +1,285 @@
+import os
+import re
+import string
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+
+# Соответствие символов маски регулярным выражениям.
+# N – цифра от 0 до 9;
+# A – прописная буква латинского алфавита;
+# a – строчная буква латинского алфавита;
+# X – прописная буква латинского алфавита либо цифра от 0 до 9;
+# Z – символ из списка: “-”, “_”, “@”.
+MASK_PATTERNS = {
+    'N': r'\d',
+    'A': r'[A-Z]',
+    'a': r'[a-z]',
+    'X': r'[A-Z0-9]',
+    'Z': r'[-_@]'
+}
+
+ALLOWED_MASK_CHARS = frozenset(MASK_PATTERNS)
+
+# Допустимые символы для каждого символа маски (в порядке ASCII)
+MASK_ALPHABETS = {
+    'N': string.digits,
+    'A': string.ascii_uppercase,
+    'a': string.ascii_lowercase,
+    'X': string.digits + string.ascii_uppercase,
+    'Z': '-@_',
+}
+
+
+def random_serial_number(mask, rng):
+    """Случайный серийный номер, подходящий под маску (rng - random.Random)."""
+    return "".join(rng.choice(MASK_ALPHABETS[char_mask]) for char_mask in mask)
+
+
+# Позиция шаблона SerialSpace, в которой может стоять любой символ алфавита маски
+PATTERN_ANY = '*'
+
+
+class SerialSpace:
+    """
+    Упорядоченное множество серийных номеров маски, у которых позиции шаблона
+    (pattern той же длины, что маска) заданы явно; '*' - любой символ алфавита.
+    Номер с порядковым index - запись index в смешанной системе счисления, где
+    основание разряда - размер его алфавита. Алфавиты MASK_ALPHABETS упорядочены
+    по коду символа, поэтому порядок index совпадает с побайтовым порядком строк.
+    """
+
+    def __init__(self, mask, pattern=None):
+        pattern = pattern or PATTERN_ANY * len(mask)
+        if len(pattern) != len(mask):
+            raise ValueError(f"Длина шаблона '{pattern}' не совпадает с длиной маски '{mask}'.")
+        self.mask = mask
+        self.alphabets = []
+        for position, (char_mask, char) in enumerate(zip(mask, pattern)):
+            if char_mask not in MASK_ALPHABETS:
+                raise ValueError(f"Недопустимый символ маски '{char_mask}' в маске '{mask}'.")
+            alphabet = MASK_ALPHABETS[char_mask]
+            if char != PATTERN_ANY and char not in alphabet:
+                raise ValueError(
+                    f"Символ '{char}' в позиции {position + 1} шаблона не подходит под символ маски '{char_mask}'."
+                )
+            self.alphabets.append(alphabet if char == PATTERN_ANY else char)
+        self._positions = [{char: i for i, char in enumerate(alphabet)} for alphabet in self.alphabets]
+        self.capacity = 1
+        for alphabet in self.alphabets:
+            self.capacity *= len(alphabet)
+
+    def serial_number(self, index):
+        """Номер с порядковым номером index (0 <= index < capacity)."""
+        if not 0 <= index < self.capacity:
+            raise ValueError(f"Маска '{self.mask}' допускает только {self.capacity} номеров.")
+        chars = []
+        for alphabet in reversed(self.alphabets):
+            index, position = divmod(index, len(alphabet))
+            chars.append(alphabet[position])
+        return "".join(reversed(chars))
+
+    def index(self, serial_number):
+        """Порядковый номер serial_number или None, если номер не из этого множества."""
+        if len(serial_number) != len(self.alphabets):
+            return None
+        index = 0
+        for char, alphabet, positions in zip(serial_number, self.alphabets, self._positions):
+            position = positions.get(char)
+            if position is None:
+                return None
+            index = index * len(alphabet) + position
+        return index
+
+
+def mask_capacity(mask):
+    """Сколько всего серийных номеров подходит под маску."""
+    return SerialSpace(mask).capacity
+
+
+def mask_to_regex(mask):
+    """
+    Строит регулярное выражение для маски. Подряд идущие одинаковые символы
+    сворачиваются в квантификатор: 'NNNN' -> '\\d{4}'.
+    """
+    parts = []
+    i = 0
+    while i < len(mask):
+        char_mask = mask[i]
+        if char_mask not in MASK_PATTERNS:
+            raise ValueError(f"Недопустимый символ маски '{char_mask}' в маске '{mask}'.")
+        j = i
+        while j < len(mask) and mask[j] == char_mask:
+            j += 1
+        run = j - i
+        parts.append(MASK_PATTERNS[char_mask] if run == 1 else f"{MASK_PATTERNS[char_mask]}{{{run}}}")
+        i = j
+    return "".join(parts)
+
+
+class MaskValidator:
+    """
+    Скомпилированный валидатор серийных номеров для одной маски.
+    Создается один раз на маску и переиспользуется, см. get_validator().
+    """
+    __slots__ = ('mask', 'length', 'regex', '_fullmatch')
+
+    def __init__(self, mask):
+        self.mask = mask
+        self.length = len(mask)
+        self.regex = re.compile(mask_to_regex(mask))
+        self._fullmatch = self.regex.fullmatch
+
+    def __repr__(self):
+        return f"<MaskValidator {self.mask!r}>"
+
+    def is_valid(self, serial_number):
+        return len(serial_number) == self.length and self._fullmatch(serial_number) is not None
+
+    __call__ = is_valid
+
+    def validate_many(self, serial_numbers):
+        """Список bool того же порядка, что и serial_numbers."""
+        length = self.length
+        fullmatch = self._fullmatch
+        return [len(sn) == length and fullmatch(sn) is not None for sn in serial_numbers]
+
+    def partition(self, serial_numbers):
+        """Делит номера на (подходящие, неподходящие) с сохранением порядка."""
+        valid = []
+        invalid = []
+        length = self.length
+        fullmatch = self._fullmatch
+        for sn in serial_numbers:
+            if len(sn) == length and fullmatch(sn) is not None:
+                valid.append(sn)
+            else:
+                invalid.append(sn)
+        return valid, invalid
+
+
+class MaskValidatorCache:
+    """
+    Ограниченный LRU-кэш валидаторов, ключ - строка маски.
+    Маска однозначно определяет валидатор, поэтому устаревших записей в кэше
+    не бывает; invalidate() только освобождает место при смене маски у типа.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, mask):
+        with self._lock:
+            validator = self._data.get(mask)
+            if validator is not None:
+                self._data.move_to_end(mask)
+                return validator
+        validator = MaskValidator(mask)
+        with self._lock:
+            self._data[mask] = validator
+            self._data.move_to_end(mask)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return validator
+
+    def invalidate(self, mask):
+        with self._lock:
+            self._data.pop(mask, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, mask):
+        return mask in self._data
+
+
+validator_cache = MaskValidatorCache(getattr(settings, 'MASK_CACHE_SIZE', 256))
+
+
+def get_validator(mask):
+    return validator_cache.get(mask)
+
+
+def invalidate_mask(mask):
+    validator_cache.invalidate(mask)
+
+
+# Параллельная проверка больших пакетов в пуле процессов
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def get_parallel_workers():
+    workers = getattr(settings, 'VALIDATION_WORKERS', 0)
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def get_parallel_threshold():
+    return getattr(settings, 'VALIDATION_PARALLEL_THRESHOLD', 200000)
+
+
+def _get_pool(workers):
+    """Пул создается один раз на процесс: запуск процессов дороже самой проверки."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+        _pool_workers = None
+
+
+def _invalid_positions(mask, serial_numbers):
+    """Выполняется в дочернем процессе: позиции неподходящих номеров в части."""
+    validator = get_validator(mask)
+    return [i for i, ok in enumerate(validator.validate_many(serial_numbers)) if not ok]
+
+
+def partition_serial_numbers(validator, serial_numbers, workers=None, threshold=None):
+    """
+    То же, что validator.partition(), но пакеты не меньше threshold проверяются
+    частями в пуле процессов (workers штук). Меньшие пакеты и workers=1
+    проверяются в текущем процессе: на них пересылка данных дороже выигрыша.
+    Результат и порядок совпадают с validator.partition().
+    """
+    workers = workers or get_parallel_workers()
+    threshold = get_parallel_threshold() if threshold is None else threshold
+    serial_numbers = list(serial_numbers)
+    if workers <= 1 or threshold <= 0 or len(serial_numbers) < threshold:
+        return validator.partition(serial_numbers)
+
+    shard_size = -(-len(serial_numbers) // workers)
+    shards = [serial_numbers[start:start + shard_size] for start in range(0, len(serial_numbers), shard_size)]
+    pool = _get_pool(workers)
+    results = pool.map(_invalid_positions, [validator.mask] * len(shards), shards)
+
+    invalid_positions = set()
+    for shard_index, positions in enumerate(results):
+        offset = shard_index * shard_size
+        invalid_positions.update(offset + position for position in positions)
+    valid = []
+    invalid = []
+    for position, sn in enumerate(serial_numbers):
+        (invalid if position in invalid_positions else valid).append(sn)
+    return valid, invalid
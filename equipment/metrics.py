@@ -0,0 +1,219 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+def get_sample_rate():
+    return getattr(settings, 'METRICS_SAMPLE_RATE', 0.0)
+
+
+def get_slow_query_seconds():
+    return getattr(settings, 'METRICS_SLOW_QUERY_MS', 0) / 1000
+
+
+class RequestStats:
+    """Замеры одного запроса. Живут в contextvar и видны из потоков sync_to_async."""
+    __slots__ = ('sampled', 'request', 'started', 'queries', 'db_time', 'serialize_time', 'slow_queries')
+
+    def __init__(self, sampled, request):
+        self.sampled = sampled
+        self.request = request
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.slow_queries = 0
+
+
+_current = contextvars.ContextVar('equipment_request_stats', default=None)
+
+
+def start_request(request):
+    """
+    Начинает замеры запроса: возвращает (stats, token) или None, если запрос
+    не попал в выборку и журнал медленных запросов выключен - тогда
+    инструментирование обходится одной проверкой настроек.
+    """
+    rate = get_sample_rate()
+    sampled = rate > 0 and (rate >= 1 or random.random() < rate)
+    if not sampled and not get_slow_query_seconds():
+        return None
+    stats = RequestStats(sampled, request)
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def measure_serialization():
+    """Добавляет время блока к сериализации текущего запроса (если он замеряется)."""
+    stats = _current.get()
+    if stats is None or not stats.sampled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialize_time += time.perf_counter() - started
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """
+    Обертка запросов к БД (connection.execute_wrappers), ставится на каждое
+    соединение при создании. Вне замеряемого запроса - один вызов contextvar.
+    """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_time += duration
+        slow = get_slow_query_seconds()
+        if slow and duration >= slow:
+            stats.slow_queries += 1
+            logger.warning(
+                "Медленный запрос %.1f мс (%s): %s; параметры: %r",
+                duration * 1000, view_name(stats.request), sql, params
+            )
+
+
+def view_name(request):
+    """Имя представления и действия: EquipmentViewSet.list, EquipmentAsyncView.retrieve."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unknown'
+    view_func = match.func
+    cls = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if cls is None:
+        return getattr(view_func, '__name__', 'unknown')
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        action = actions.get(request.method.lower())
+    else:
+        action = getattr(view_func, 'view_initkwargs', {}).get('action')
+    return f"{cls.__name__}.{action}" if action else cls.__name__
+
+
+def server_timing(stats, total):
+    return ", ".join([
+        f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"',
+        f'serialize;dur={stats.serialize_time * 1000:.2f}',
+        f'total;dur={total * 1000:.2f}',
+    ])
+
+
+class Histogram:
+    """Гистограмма Prometheus с метками, без внешних зависимостей."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            base = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels))
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """
+    Агрегаты по замеренным запросам в памяти процесса. При нескольких
+    процессах (воркерах) каждый отдает свои значения.
+    """
+    label_names = ('view', 'method', 'status')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.duration = Histogram(
+            'equipment_request_duration_seconds', "Время обработки запроса.", DURATION_BUCKETS)
+        self.db_duration = Histogram(
+            'equipment_request_db_duration_seconds', "Суммарное время запросов к БД за запрос.", DURATION_BUCKETS)
+        self.serialize_duration = Histogram(
+            'equipment_request_serialize_duration_seconds', "Время сериализации ответа.", DURATION_BUCKETS)
+        self.queries = Histogram(
+            'equipment_request_db_queries', "Число запросов к БД за запрос.", QUERY_COUNT_BUCKETS)
+        self.slow_queries = {}
+
+    def record(self, view, method, status, total, stats):
+        labels = (view, method, str(status))
+        with self._lock:
+            self.duration.observe(labels, total)
+            self.db_duration.observe(labels, stats.db_time)
+            self.serialize_duration.observe(labels, stats.serialize_time)
+            self.queries.observe(labels, stats.queries)
+
+    def record_slow_queries(self, view, count):
+        with self._lock:
+            self.slow_queries[view] = self.slow_queries.get(view, 0) + count
+
+    def render(self):
+        """Текстовый формат Prometheus (text/plain; version=0.0.4)."""
+        with self._lock:
+            lines = []
+            for histogram in (self.duration, self.db_duration, self.serialize_duration, self.queries):
+                lines.extend(histogram.render(self.label_names))
+            lines.append("# HELP equipment_slow_queries_total Запросы к БД дольше [Metrics] slow_query_ms.")
+            lines.append("# TYPE equipment_slow_queries_total counter")
+            for view, count in sorted(self.slow_queries.items()):
+                lines.append(f'equipment_slow_queries_total{{view="{_escape(view)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self.__init__()
+
+
+registry = MetricsRegistry()
+
+
+def finish_request(stats, request, response):
+    """Записывает замеры в метрики и добавляет Server-Timing к ответу."""
+    total = time.perf_counter() - stats.started
+    view = view_name(request)
+    if stats.slow_queries:
+        registry.record_slow_queries(view, stats.slow_queries)
+    if stats.sampled:
+        registry.record(view, request.method, response.status_code, total, stats)
+        if getattr(settings, 'METRICS_SERVER_TIMING', True):
+            response['Server-Timing'] = server_timing(stats, total)
+    return response
@@ -0,0 +1,74 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .compression import compress_response
+from .metrics import end_request, finish_request, start_request
+
+
+class InstrumentationMiddleware:
+    """
+    Замеры запроса: число и время запросов к БД, время сериализации, имя
+    представления и действия. Для запросов из выборки ([Metrics] sample_rate)
+    добавляет заголовок Server-Timing и пополняет гистограммы /metrics.
+    Запросы к БД медленнее [Metrics] slow_query_ms пишутся в журнал вместе с SQL.
+
+    Работает и в синхронном, и в асинхронном режиме, чтобы под ASGI не
+    добавлять лишний переход в поток; по той же причине нет process_view -
+    представление берется из request.resolver_match.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = start_request(request)
+        if started is None:
+            return self.get_response(request)
+        stats, token = started
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return finish_request(stats, request, response)
+
+    async def __acall__(self, request):
+        started = start_request(request)
+        if started is None:
+            return await self.get_response(request)
+        stats, token = started
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return finish_request(stats, request, response)
+
+
+class CompressionMiddleware:
+    """
+    Сжатие gzip/brotli больших ответов API и потоковой выгрузки по
+    Accept-Encoding клиента (equipment/compression.py, [Compression] в settings.ini).
+    Как и InstrumentationMiddleware, работает в обоих режимах: под ASGI
+    асинхронная выгрузка сжимается без перехода в поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return compress_response(request, await self.get_response(request))
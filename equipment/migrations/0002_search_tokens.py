@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_search_index(apps, schema_editor):
+    """Заполняет триграммный индекс для уже существующего оборудования."""
+    from equipment.search import build_tokens
+
+    Equipment = apps.get_model('equipment', 'Equipment')
+    EquipmentSearchToken = apps.get_model('equipment', 'EquipmentSearchToken')
+    batch_size = 1000
+    last_id = 0
+    while True:
+        rows = list(
+            Equipment.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('id', 'serial_number', 'note')[:batch_size]
+        )
+        if not rows:
+            break
+        EquipmentSearchToken.objects.bulk_create([
+            EquipmentSearchToken(equipment_id=equipment_id, field=field, token=token)
+            for row in rows
+            for equipment_id, field, token in build_tokens(*row)
+        ], batch_size=batch_size)
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.PositiveSmallIntegerField(choices=[(1, 'serial_number'), (2, 'note')], verbose_name='Поле')),
+                ('token', models.CharField(max_length=3, verbose_name='Триграмма')),
+                ('equipment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='equipment.equipment', verbose_name='Оборудование')),
+            ],
+            options={
+                'verbose_name': 'Поисковая триграмма',
+                'verbose_name_plural': 'Поисковые триграммы',
+                'indexes': [models.Index(fields=['token', 'field', 'equipment'], name='equipment_search_token_idx')],
+                'constraints': [models.UniqueConstraint(fields=('equipment', 'field', 'token'), name='unique_equipment_search_token')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0002_search_tokens'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершено'), ('failed', 'Завершено с ошибкой')], default='pending', max_length=16, verbose_name='Статус')),
+                ('total_rows', models.PositiveIntegerField(default=0, verbose_name='Всего строк')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='Обработано строк')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='Создано')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Ошибок')),
+                ('chunk_count', models.PositiveIntegerField(default=0, verbose_name='Частей')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано в')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начато в')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено в')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Задание импорта',
+                'verbose_name_plural': 'Задания импорта',
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportJobChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='Номер части')),
+                ('rows', models.JSONField(verbose_name='Строки')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершено'), ('failed', 'Завершено с ошибкой')], default='pending', max_length=16, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('locked_by', models.CharField(blank=True, default='', max_length=255, verbose_name='Воркер')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Аренда до')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Последняя ошибка')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='equipment.importjob', verbose_name='Задание')),
+            ],
+            options={
+                'verbose_name': 'Часть задания импорта',
+                'verbose_name_plural': 'Части заданий импорта',
+                'indexes': [models.Index(fields=['status', 'locked_until'], name='import_chunk_queue_idx')],
+                'constraints': [models.UniqueConstraint(fields=('job', 'number'), name='unique_import_job_chunk_number')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportJobError',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('line', models.PositiveIntegerField(verbose_name='Номер строки')),
+                ('serial_number', models.CharField(blank=True, max_length=255, null=True, verbose_name='Серийный номер')),
+                ('error', models.TextField(verbose_name='Ошибка')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='errors', to='equipment.importjob', verbose_name='Задание')),
+            ],
+            options={
+                'verbose_name': 'Ошибка импорта',
+                'verbose_name_plural': 'Ошибки импорта',
+                'indexes': [models.Index(fields=['job', 'line'], name='import_error_job_line_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:15
+
+from django.db import migrations, models
+
+
+def seed_changes(apps, schema_editor):
+    """
+    Начальный журнал: по записи на каждое существующее оборудование, чтобы
+    синхронизация с since=0 получала полное состояние.
+    """
+    Equipment = apps.get_model('equipment', 'Equipment')
+    EquipmentChange = apps.get_model('equipment', 'EquipmentChange')
+    batch_size = 1000
+    last_id = 0
+    while True:
+        rows = list(
+            Equipment.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('id', 'is_deleted')[:batch_size]
+        )
+        if not rows:
+            break
+        EquipmentChange.objects.bulk_create([
+            EquipmentChange(equipment_id=equipment_id, action='delete' if is_deleted else 'create')
+            for equipment_id, is_deleted in rows
+        ])
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0003_import_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipment_id', models.BigIntegerField(verbose_name='ID оборудования')),
+                ('action', models.CharField(choices=[('create', 'Создание'), ('update', 'Изменение'), ('delete', 'Удаление'), ('undelete', 'Восстановление')], max_length=16, verbose_name='Действие')),
+                ('changed_at', models.DateTimeField(auto_now_add=True, verbose_name='Время изменения')),
+            ],
+            options={
+                'verbose_name': 'Изменение оборудования',
+                'verbose_name_plural': 'Изменения оборудования',
+            },
+        ),
+        migrations.RunPython(seed_changes, migrations.RunPython.noop),
+    ]
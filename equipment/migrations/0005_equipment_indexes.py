@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:22
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def resolve_active_duplicates(apps, schema_editor):
+    """
+    На MySQL частичное ограничение уникальности не создавалось, и проверка
+    exists() могла пропустить дубликаты при параллельных запросах. Перед
+    созданием уникального индекса у каждой пары тип + номер остается активной
+    самая ранняя запись, остальные помечаются удаленными (их можно восстановить
+    после смены номера). Удаление попадает в журнал изменений, как удаление
+    через API, а id записей выводятся в консоль. Время удаления этим записям
+    ставит миграция 0006 (set_deleted_at), где появляется поле deleted_at.
+    """
+    Equipment = apps.get_model('equipment', 'Equipment')
+    EquipmentChange = apps.get_model('equipment', 'EquipmentChange')
+    duplicates = (
+        Equipment.objects.filter(is_deleted=False)
+        .values('equipment_type_id', 'serial_number')
+        .annotate(rows=Count('id'), first_id=Min('id'))
+        .filter(rows__gt=1)
+    )
+    resolved = []
+    for duplicate in duplicates:
+        ids = list(
+            Equipment.objects.filter(
+                is_deleted=False,
+                equipment_type_id=duplicate['equipment_type_id'],
+                serial_number=duplicate['serial_number'],
+            ).exclude(pk=duplicate['first_id']).values_list('pk', flat=True)
+        )
+        Equipment.objects.filter(pk__in=ids).update(is_deleted=True)
+        resolved.extend(ids)
+    if not resolved:
+        return
+    EquipmentChange.objects.bulk_create(
+        [EquipmentChange(equipment_id=equipment_id, action='delete') for equipment_id in resolved],
+        batch_size=1000
+    )
+    print(f"\n  Дубликаты активных номеров помечены удаленными ({len(resolved)}), id: "
+          f"{', '.join(map(str, sorted(resolved)))}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0004_equipment_changes'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='equipment',
+            name='unique_equipment_type_serial_number_if_not_deleted',
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='active_serial_number',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(is_deleted=False, then=models.F('serial_number')), default=None), output_field=models.CharField(max_length=255, null=True), verbose_name='Серийный номер активной записи'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['is_deleted', 'id'], name='equipment_deleted_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['equipment_type', 'serial_number', 'is_deleted'], name='equipment_type_sn_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipment',
+            index=models.Index(fields=['serial_number', 'is_deleted'], name='equipment_sn_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmenttype',
+            index=models.Index(fields=['name'], name='equipment_type_name_idx'),
+        ),
+        migrations.RunPython(resolve_active_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='equipment',
+            constraint=models.UniqueConstraint(fields=('equipment_type', 'active_serial_number'), name='unique_equipment_type_active_serial_number'),
+        ),
+    ]
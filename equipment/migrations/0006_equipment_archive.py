@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def set_deleted_at(apps, schema_editor):
+    """Время удаления ранее удаленных записей неизвестно, отсчет идет от миграции."""
+    Equipment = apps.get_model('equipment', 'Equipment')
+    Equipment.objects.filter(is_deleted=True, deleted_at__isnull=True).update(deleted_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0005_equipment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipment',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время удаления'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedEquipment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('serial_number', models.CharField(max_length=255, verbose_name='Серийный номер')),
+                ('note', models.TextField(blank=True, null=True, verbose_name='Примечание')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Время удаления')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Время архивации')),
+                ('equipment_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_equipments', to='equipment.equipmenttype', verbose_name='Тип оборудования')),
+            ],
+            options={
+                'verbose_name': 'Архивное оборудование',
+                'verbose_name_plural': 'Архивное оборудование',
+            },
+        ),
+        migrations.RunPython(set_deleted_at, migrations.RunPython.noop),
+        # Само представление создается миграцией 0010
+        migrations.CreateModel(
+            name='EquipmentRecord',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('serial_number', models.CharField(max_length=255, verbose_name='Серийный номер')),
+                ('note', models.TextField(blank=True, null=True, verbose_name='Примечание')),
+                ('is_deleted', models.BooleanField(verbose_name='Удалено (мягкое удаление)')),
+                ('deleted_at', models.DateTimeField(blank=True, null=True, verbose_name='Время удаления')),
+                ('is_archived', models.BooleanField(verbose_name='В архиве')),
+            ],
+            options={
+                'verbose_name': 'Оборудование (включая архив)',
+                'verbose_name_plural': 'Оборудование (включая архив)',
+                'db_table': 'equipment_equipment_all',
+                'managed': False,
+            },
+        ),
+    ]
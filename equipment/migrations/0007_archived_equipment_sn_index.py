@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0006_equipment_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedequipment',
+            index=models.Index(fields=['equipment_type', 'serial_number'], name='archived_type_sn_idx'),
+        ),
+    ]
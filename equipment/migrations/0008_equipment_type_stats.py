@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_type_stats(apps, schema_editor):
+    """Начальные значения статистики по существующим данным (как manage.py reconcile_type_stats)."""
+    EquipmentType = apps.get_model('equipment', 'EquipmentType')
+    Equipment = apps.get_model('equipment', 'Equipment')
+    ArchivedEquipment = apps.get_model('equipment', 'ArchivedEquipment')
+    EquipmentTypeStats = apps.get_model('equipment', 'EquipmentTypeStats')
+    counts = {type_id: [0, 0] for type_id in EquipmentType.objects.values_list('pk', flat=True)}
+    rows = Equipment.objects.values_list('equipment_type_id', 'is_deleted').annotate(total=Count('id')).order_by()
+    for type_id, is_deleted, total in rows:
+        counts[type_id][1 if is_deleted else 0] += total
+    rows = ArchivedEquipment.objects.values_list('equipment_type_id').annotate(total=Count('id')).order_by()
+    for type_id, total in rows:
+        counts[type_id][1] += total
+    EquipmentTypeStats.objects.bulk_create([
+        EquipmentTypeStats(equipment_type_id=type_id, active_count=active, deleted_count=deleted)
+        for type_id, (active, deleted) in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0007_archived_equipment_sn_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipmentTypeStats',
+            fields=[
+                ('equipment_type', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='equipment.equipmenttype', verbose_name='Тип оборудования')),
+                ('active_count', models.BigIntegerField(default=0, verbose_name='Действующее оборудование')),
+                ('deleted_count', models.BigIntegerField(default=0, verbose_name='Удаленное оборудование')),
+            ],
+            options={
+                'verbose_name': 'Статистика типа оборудования',
+                'verbose_name_plural': 'Статистика типов оборудования',
+            },
+        ),
+        migrations.RunPython(fill_type_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:27
+
+from django.db import migrations
+
+
+# Раньше представление создавалось после migrate (сигнал post_migrate), поэтому
+# оно может уже существовать. Миграции, которые дальше меняют столбцы основной
+# или архивной таблицы, удаляют представление перед изменением и создают заново:
+# SQLite пересоздает таблицу и не дает это сделать, пока на нее ссылается
+# представление, PostgreSQL так же запрещает менять тип столбца.
+DROP_VIEW_SQL = "DROP VIEW IF EXISTS equipment_equipment_all"
+
+CREATE_VIEW_SQL = """
+CREATE VIEW equipment_equipment_all AS
+SELECT id, equipment_type_id, serial_number, note, is_deleted, deleted_at, FALSE AS is_archived
+FROM equipment_equipment
+UNION ALL
+SELECT id, equipment_type_id, serial_number, note, TRUE, deleted_at, TRUE
+FROM equipment_archivedequipment
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0009_token_revocation'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[DROP_VIEW_SQL, CREATE_VIEW_SQL],
+            reverse_sql=[DROP_VIEW_SQL],
+        ),
+    ]
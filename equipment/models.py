@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.db import models
 from django.core.exceptions import ValidationError
-import re
+from django.utils import timezone
+
+from .masks import ALLOWED_MASK_CHARS, get_validator
 
 class EquipmentType(models.Model):
     """
@@ -15,15 +18,22 @@ class EquipmentType(models.Model):
     def clean(self):
         super().clean()
         # Валидация маски серийного номера
-        allowed_mask_chars = set('NAaXZ')
-        if not all(char in allowed_mask_chars for char in self.serial_number_mask):
+        if not all(char in ALLOWED_MASK_CHARS for char in self.serial_number_mask):
             raise ValidationError({
                 'serial_number_mask': "Маска серийного номера может содержать только символы 'N', 'A', 'a', 'X', 'Z'."
             })
 
+    def get_mask_validator(self):
+        """Скомпилированный валидатор для маски этого типа (из общего кэша)."""
+        return get_validator(self.serial_number_mask)
+
     class Meta:
         verbose_name = "Тип оборудования"
         verbose_name_plural = "Типы оборудования"
+        indexes = [
+            # Фильтр equipment_type__name и сортировка списка оборудования по имени типа
+            models.Index(fields=['name'], name='equipment_type_name_idx'),
+        ]
 
 class Equipment(models.Model):
     """
@@ -33,19 +43,47 @@ class Equipment(models.Model):
     serial_number = models.CharField(max_length=255, verbose_name="Серийный номер")
     note = models.TextField(blank=True, null=True, verbose_name="Примечание")
     is_deleted = models.BooleanField(default=False, verbose_name="Удалено (мягкое удаление)")
+    deleted_at = models.DateTimeField(null=True, blank=True, verbose_name="Время удаления")
+    # Серийный номер активной записи, у удаленной - NULL. Вычисляется СУБД;
+    # уникальный индекс по (тип, номер) на этом столбце реализует правило
+    # "уникален среди не удаленных" и там, где нет частичных индексов (MySQL):
+    # NULL в уникальном индексе не конфликтуют.
+    active_serial_number = models.GeneratedField(
+        expression=models.Case(
+            models.When(is_deleted=False, then=models.F('serial_number')),
+            default=None,
+        ),
+        output_field=models.CharField(max_length=255, null=True),
+        db_persist=True,
+        verbose_name="Серийный номер активной записи",
+    )
 
     def __str__(self):
         return f"{self.equipment_type.name} - {self.serial_number}"
 
     def soft_delete(self):
-        """Мягкое удаление объекта."""
-        self.is_deleted = True
-        self.save()
+        """Мягкое удаление объекта. False - запись уже была удалена."""
+        return self._set_deleted(True)
 
     def undelete(self):
-        """Восстановление объекта после мягкого удаления."""
-        self.is_deleted = False
-        self.save()
+        """Восстановление объекта после мягкого удаления. False - запись не была удалена."""
+        return self._set_deleted(False)
+
+    def _set_deleted(self, is_deleted):
+        # UPDATE одного поля вместо save(), чтобы в журнал изменений попало
+        # delete/undelete, а не update
+        from .signals import ACTION_DELETE, ACTION_UNDELETE, notify_equipment_changed
+
+        self.is_deleted = is_deleted
+        self.deleted_at = timezone.now() if is_deleted else None
+        # Условие на прежнее состояние: из двух параллельных запросов строку
+        # меняет и попадает в журнал и статистику типа только один
+        changed = Equipment.objects.filter(pk=self.pk, is_deleted=not is_deleted).update(
+            is_deleted=is_deleted, deleted_at=self.deleted_at
+        )
+        if changed:
+            notify_equipment_changed([self.pk], ACTION_DELETE if is_deleted else ACTION_UNDELETE)
+        return bool(changed)
 
     @staticmethod
     def validate_serial_number_by_mask(serial_number, mask):
@@ -56,25 +94,9 @@ class Equipment(models.Model):
         a – строчная буква латинского алфавита;
         X – прописная буква латинского алфавита либо цифра от 0 до 9;
         Z – символ из списка: “-”, “_”, “@”.
+        Скомпилированный валидатор берется из кэша по маске, см. equipment/masks.py
         """
-        if len(serial_number) != len(mask):
-            return False
-
-        pattern_map = {
-            'N': r'\d',
-            'A': r'[A-Z]',
-            'a': r'[a-z]',
-            'X': r'[A-Z0-9]',
-            'Z': r'[-_@]'
-        }
-
-        regex_pattern = ""
-        for char_mask in mask:
-            regex_pattern += pattern_map[char_mask] 
-
-        regex_pattern = f"^{regex_pattern}$" # Исправил логику, теперь строгое соответствие всей строки
-
-        return bool(re.match(regex_pattern, serial_number))
+        return get_validator(mask).is_valid(serial_number)
 
     def clean(self):
         """
@@ -93,9 +115,248 @@ class Equipment(models.Model):
         verbose_name = "Оборудование"
         verbose_name_plural = "Оборудование"
         # Уникальность серийного номера в связке с типом оборудования
-        # Учитываем только не удаленные записи для уникальности
+        # Учитываем только не удаленные записи для уникальности (см. active_serial_number)
+        constraints = [
+            models.UniqueConstraint(fields=['equipment_type', 'active_serial_number'],
+                                    name='unique_equipment_type_active_serial_number')
+        ]
+        indexes = [
+            # Список удаленных (is_deleted=true) в порядке id
+            models.Index(fields=['is_deleted', 'id'], name='equipment_deleted_id_idx'),
+            # Фильтр по типу, точный серийный номер, сортировка по номеру внутри типа.
+            # is_deleted последним: SQLite сравнивает булево поле без "=" и не
+            # может использовать его как ведущий столбец индекса
+            models.Index(fields=['equipment_type', 'serial_number', 'is_deleted'], name='equipment_type_sn_idx'),
+            # Точный номер и сортировка ordering=serial_number по всем типам
+            models.Index(fields=['serial_number', 'is_deleted'], name='equipment_sn_idx'),
+        ]
+
+
+class ArchivedEquipment(models.Model):
+    """
+    Архив оборудования, мягко удаленного давно (manage.py archive_equipment).
+    Запись переносится с тем же id, поэтому ссылки на нее (журнал изменений,
+    внешние системы) остаются верными, а восстановление возвращает ее под
+    прежним id. Основная таблица хранит только действующее и недавно удаленное оборудование.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID")
+    equipment_type = models.ForeignKey(EquipmentType, on_delete=models.PROTECT, related_name="archived_equipments", verbose_name="Тип оборудования")
+    serial_number = models.CharField(max_length=255, verbose_name="Серийный номер")
+    note = models.TextField(blank=True, null=True, verbose_name="Примечание")
+    deleted_at = models.DateTimeField(null=True, blank=True, verbose_name="Время удаления")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Время архивации")
+
+    # Архивная запись всегда удалена; атрибут для общих сериализаторов
+    is_deleted = True
+
+    def __str__(self):
+        return f"{self.equipment_type.name} - {self.serial_number} (архив)"
+
+    def undelete(self):
+        """Возвращает запись в основную таблицу (если номер не занят)."""
+        from .bulk import undelete_equipment
+
+        return undelete_equipment([self.pk])[0]
+
+    class Meta:
+        verbose_name = "Архивное оборудование"
+        verbose_name_plural = "Архивное оборудование"
+        indexes = [
+            # Проверка наличия номеров (equipment/availability.py) по типу и номеру
+            models.Index(fields=['equipment_type', 'serial_number'], name='archived_type_sn_idx'),
+        ]
+
+
+class EquipmentRecord(models.Model):
+    """
+    Оборудование вместе с архивом, только для чтения: представление БД
+    equipment_equipment_all (UNION ALL основной и архивной таблиц, см.
+    миграцию 0010). Используется для списков с is_deleted=true|all.
+    Запросы через objects читают само представление (годится для выборок
+    по id); списки и выгрузка читают обе таблицы по отдельности через
+    RecordQuerySet (equipment/records.py), чтобы каждая шла по своим индексам.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID")
+    equipment_type = models.ForeignKey(EquipmentType, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+", verbose_name="Тип оборудования")
+    serial_number = models.CharField(max_length=255, verbose_name="Серийный номер")
+    note = models.TextField(blank=True, null=True, verbose_name="Примечание")
+    is_deleted = models.BooleanField(verbose_name="Удалено (мягкое удаление)")
+    deleted_at = models.DateTimeField(null=True, blank=True, verbose_name="Время удаления")
+    is_archived = models.BooleanField(verbose_name="В архиве")
+
+    # Архивные записи не попадают в поисковый индекс, для них поиск идет без индекса
+    search_unindexed_q = models.Q(is_archived=True)
+
+    def __str__(self):
+        return f"{self.equipment_type.name} - {self.serial_number}"
+
+    class Meta:
+        managed = False
+        db_table = 'equipment_equipment_all'
+        verbose_name = "Оборудование (включая архив)"
+        verbose_name_plural = "Оборудование (включая архив)"
+
+
+class EquipmentTypeStats(models.Model):
+    """
+    Число действующего и удаленного (включая архив) оборудования по типу.
+    Поддерживается приращениями при каждой записи (equipment/stats.py), поэтому
+    список типов и проверка перед удалением типа не считают COUNT(*) по оборудованию.
+    Сверка с фактическими данными - manage.py reconcile_type_stats.
+    """
+    equipment_type = models.OneToOneField(EquipmentType, on_delete=models.CASCADE, primary_key=True, related_name="stats", verbose_name="Тип оборудования")
+    active_count = models.BigIntegerField(default=0, verbose_name="Действующее оборудование")
+    deleted_count = models.BigIntegerField(default=0, verbose_name="Удаленное оборудование")
+
+    class Meta:
+        verbose_name = "Статистика типа оборудования"
+        verbose_name_plural = "Статистика типов оборудования"
+
+
+class EquipmentSearchToken(models.Model):
+    """
+    Триграммный поисковый индекс по текстовым полям оборудования.
+    Для каждой записи хранятся все тройки символов (в нижнем регистре) серийного
+    номера и примечания; поиск подстроки сводится к поиску записей, у которых
+    есть все тройки искомой строки. Заполняется в equipment/search.py.
+    """
+    FIELD_SERIAL_NUMBER = 1
+    FIELD_NOTE = 2
+    FIELD_CHOICES = [
+        (FIELD_SERIAL_NUMBER, 'serial_number'),
+        (FIELD_NOTE, 'note'),
+    ]
+
+    equipment = models.ForeignKey(Equipment, on_delete=models.CASCADE, related_name="search_tokens", verbose_name="Оборудование")
+    field = models.PositiveSmallIntegerField(choices=FIELD_CHOICES, verbose_name="Поле")
+    token = models.CharField(max_length=3, verbose_name="Триграмма")
+
+    class Meta:
+        verbose_name = "Поисковая триграмма"
+        verbose_name_plural = "Поисковые триграммы"
+        constraints = [
+            models.UniqueConstraint(fields=['equipment', 'field', 'token'],
+                                    name='unique_equipment_search_token')
+        ]
+        indexes = [
+            models.Index(fields=['token', 'field', 'equipment'], name='equipment_search_token_idx'),
+        ]
+
+class EquipmentChange(models.Model):
+    """
+    Журнал изменений оборудования для инкрементальной синхронизации
+    (GET /api/equipment/changes/). id - монотонно растущий номер изменения,
+    equipment_id хранится без внешнего ключа, чтобы запись пережила и
+    физическое удаление оборудования. Заполняется в equipment/changes.py.
+    """
+    ACTION_CHOICES = [
+        ('create', 'Создание'),
+        ('update', 'Изменение'),
+        ('delete', 'Удаление'),
+        ('undelete', 'Восстановление'),
+    ]
+
+    equipment_id = models.BigIntegerField(verbose_name="ID оборудования")
+    action = models.CharField(max_length=16, choices=ACTION_CHOICES, verbose_name="Действие")
+    changed_at = models.DateTimeField(auto_now_add=True, verbose_name="Время изменения")
+
+    class Meta:
+        verbose_name = "Изменение оборудования"
+        verbose_name_plural = "Изменения оборудования"
+
+class ImportJob(models.Model):
+    """
+    Фоновое задание на импорт оборудования. Строки задания разбиты на части
+    (ImportJobChunk), которые обрабатывают воркеры (manage.py run_import_worker).
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Завершено'),
+        (STATUS_FAILED, 'Завершено с ошибкой'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="import_jobs", verbose_name="Пользователь")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Статус")
+    total_rows = models.PositiveIntegerField(default=0, verbose_name="Всего строк")
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name="Обработано строк")
+    created_count = models.PositiveIntegerField(default=0, verbose_name="Создано")
+    error_count = models.PositiveIntegerField(default=0, verbose_name="Ошибок")
+    chunk_count = models.PositiveIntegerField(default=0, verbose_name="Частей")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано в")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Начато в")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершено в")
+
+    def __str__(self):
+        return f"Импорт #{self.pk} ({self.status})"
+
+    class Meta:
+        verbose_name = "Задание импорта"
+        verbose_name_plural = "Задания импорта"
+
+
+class ImportJobChunk(models.Model):
+    """
+    Часть задания импорта - единица работы воркера. Воркер захватывает часть
+    на время аренды (locked_until); если он упал, по истечении аренды часть
+    снова доступна другим воркерам.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = ImportJob.STATUS_CHOICES
+
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name="chunks", verbose_name="Задание")
+    number = models.PositiveIntegerField(verbose_name="Номер части")
+    # Строки части: [[номер строки, equipment_type_id, serial_number, note], ...]
+    rows = models.JSONField(verbose_name="Строки")
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Статус")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Попыток")
+    locked_by = models.CharField(max_length=255, blank=True, default='', verbose_name="Воркер")
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name="Аренда до")
+    last_error = models.TextField(blank=True, default='', verbose_name="Последняя ошибка")
+
+    class Meta:
+        verbose_name = "Часть задания импорта"
+        verbose_name_plural = "Части заданий импорта"
         constraints = [
-            models.UniqueConstraint(fields=['equipment_type', 'serial_number'],
-                                    condition=models.Q(is_deleted=False),
-                                    name='unique_equipment_type_serial_number_if_not_deleted')
-        ]
\ No newline at end of file
+            models.UniqueConstraint(fields=['job', 'number'], name='unique_import_job_chunk_number')
+        ]
+        indexes = [
+            models.Index(fields=['status', 'locked_until'], name='import_chunk_queue_idx'),
+        ]
+
+
+class ImportJobError(models.Model):
+    """Ошибка по строке задания импорта."""
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, related_name="errors", verbose_name="Задание")
+    line = models.PositiveIntegerField(verbose_name="Номер строки")
+    serial_number = models.CharField(max_length=255, null=True, blank=True, verbose_name="Серийный номер")
+    error = models.TextField(verbose_name="Ошибка")
+
+    class Meta:
+        verbose_name = "Ошибка импорта"
+        verbose_name_plural = "Ошибки импорта"
+        indexes = [
+            models.Index(fields=['job', 'line'], name='import_error_job_line_idx'),
+        ]
+
+
+class TokenRevocation(models.Model):
+    """
+    Отзыв JWT-токенов пользователя: токены, выданные не позже revoked_at,
+    недействительны (equipment/authentication.py). user_id без внешнего ключа:
+    отметка удаленного пользователя должна пережить его запись.
+    """
+    user_id = models.BigIntegerField(primary_key=True, verbose_name="ID пользователя")
+    # Время отзыва в секундах Unix, как утверждения auth_time и iat токена
+    revoked_at = models.FloatField(verbose_name="Время отзыва")
+
+    class Meta:
+        verbose_name = "Отзыв токенов"
+        verbose_name_plural = "Отзывы токенов"
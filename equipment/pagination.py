@@ -0,0 +1,289 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.paginator import InvalidPage, Paginator as DjangoPaginator
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .counting import COUNT_EXACT, COUNT_MODES, acount_queryset, count_queryset
+from .records import RecordQuerySet
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация без COUNT(*) и без OFFSET.
+
+    Курсор хранит значения ключей сортировки последней (или первой) строки
+    страницы, следующая страница выбирается условием
+    (a, id) > (значение_a, значение_id), поэтому глубина страницы не влияет на
+    стоимость запроса. К любой сортировке из ordering_fields представления
+    добавляется id, чтобы порядок был строгим и при одинаковых значениях поля.
+    """
+    cursor_query_param = 'cursor'
+    ordering_param = api_settings.ORDERING_PARAM
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    default_ordering = ('id',)
+    invalid_cursor_message = "Некорректный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """То же для async-представлений (equipment/async_views.py)."""
+        queryset = self.page_queryset(queryset, request, view)
+        return self.set_page([obj async for obj in queryset])
+
+    def page_queryset(self, queryset, request, view):
+        """Запрос страницы: сортировка, условие курсора и LIMIT page_size + 1."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, view)
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor is not None and self.cursor['d'] == 'p'
+
+        queryset = queryset.order_by(*self.order_by_terms(self.reverse))
+        if self.cursor is not None:
+            queryset = queryset.filter(self.keyset_filter(self.cursor['k'], self.reverse))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.reverse:
+            rows.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        page_size = int(api_settings.PAGE_SIZE)
+        if self.page_size_query_param in request.query_params:
+            try:
+                requested = int(request.query_params[self.page_size_query_param])
+            except (TypeError, ValueError):
+                return page_size
+            if requested > 0:
+                page_size = min(requested, self.max_page_size)
+        return page_size
+
+    def get_ordering(self, request, view):
+        """
+        Список (поле, по_убыванию) из параметра ordering. Разрешены только поля
+        из ordering_fields представления; id всегда добавляется последним.
+        """
+        valid_fields = set(getattr(view, 'ordering_fields', None) or ())
+        terms = []
+        params = request.query_params.get(self.ordering_param)
+        if params:
+            for term in params.split(','):
+                term = term.strip()
+                field = term.lstrip('-')
+                if field in valid_fields and field != 'id':
+                    terms.append((field, term.startswith('-')))
+        id_descending = False
+        if params:
+            id_descending = any(term.strip() == '-id' for term in params.split(','))
+        terms.append(('id', id_descending))
+        return terms
+
+    def order_by_terms(self, reverse=False):
+        terms = []
+        for field, descending in self.ordering:
+            if reverse:
+                descending = not descending
+            terms.append(f"-{field}" if descending else field)
+        return terms
+
+    def keyset_filter(self, values, reverse=False):
+        """
+        Условие "строго после курсора" для составного ключа:
+        (a > va) OR (a = va AND b > vb) OR ...
+        """
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        equal = Q()
+        for (field, descending), value in zip(self.ordering, values):
+            if reverse:
+                descending = not descending
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f"{field}__{lookup}": value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def get_key(self, obj):
+        if isinstance(obj, dict):
+            # Строки values() (быстрый путь списка, equipment/lean.py)
+            return [obj[field] for field, _ in self.ordering]
+        key = []
+        for field, _ in self.ordering:
+            value = obj
+            for attr in field.split('__'):
+                value = getattr(value, attr)
+            key.append(value)
+        return key
+
+    def encode_cursor(self, key, direction):
+        payload = json.dumps({'k': key, 'd': direction}, separators=(',', ':'), default=str)
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if cursor['d'] not in ('n', 'p') or not isinstance(cursor['k'], list):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_key(self.page[-1]), 'n')
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_key(self.page[0]), 'p')
+
+
+class CountingPaginator(DjangoPaginator):
+    """Paginator, который считает строки через стратегию из equipment/counting.py."""
+
+    def __init__(self, object_list, per_page, count_mode=None, count_scopes=(), **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.requested_count_mode = count_mode
+        self.count_scopes = count_scopes
+        self.count_mode = None
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, (QuerySet, RecordQuerySet)):
+            # Список в памяти (например, из реестра типов)
+            self.count_mode = COUNT_EXACT
+            return len(self.object_list)
+        count, self.count_mode = count_queryset(self.object_list, self.requested_count_mode, self.count_scopes)
+        return count
+
+    async def acount(self):
+        """Считает count асинхронно; дальше count берется без запроса."""
+        if 'count' not in self.__dict__:
+            if isinstance(self.object_list, (QuerySet, RecordQuerySet)):
+                self.__dict__['count'], self.count_mode = await acount_queryset(
+                    self.object_list, self.requested_count_mode, self.count_scopes
+                )
+            else:
+                self.count
+        return self.count
+
+
+class CountStrategyPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с выбором способа подсчета count.
+    Стратегия по умолчанию задается в settings.ini ([Count] mode), клиент может
+    запросить другую параметром count_mode=exact|cached|estimate. В ответе поле
+    count_mode показывает, как получен count: при estimate это приблизительное значение.
+    Области версий для кэша берутся из атрибута version_scopes представления.
+    """
+    count_mode_query_param = 'count_mode'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.requested_count_mode = request.query_params.get(self.count_mode_query_param)
+        self.count_scopes = getattr(view, 'version_scopes', ())
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page, **kwargs):
+        return CountingPaginator(
+            object_list, per_page,
+            count_mode=self.requested_count_mode,
+            count_scopes=self.count_scopes,
+            **kwargs
+        )
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        То же для async-представлений: count считается acount_queryset(),
+        страница читается асинхронно. Ошибки номера страницы - как в paginate_queryset().
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.requested_count_mode = request.query_params.get(self.count_mode_query_param)
+        self.count_scopes = getattr(view, 'version_scopes', ())
+        paginator = self.django_paginator_class(queryset, page_size)
+        await paginator.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+        if isinstance(self.page.object_list, (QuerySet, RecordQuerySet)):
+            self.page.object_list = [obj async for obj in self.page.object_list]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_mode', self.page.paginator.count_mode),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_mode'] = {
+            'type': 'string',
+            'enum': list(COUNT_MODES),
+        }
+        return response_schema
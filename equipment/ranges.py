@@ -0,0 +1,146 @@
+from django.db import transaction
+
+from .bulk import chunked, create_equipment_items, get_bulk_chunk_size
+from .masks import SerialSpace
+from .models import Equipment
+
+# Максимум номеров за один запрос генерации
+MAX_GENERATE_COUNT = 100000
+
+
+class RangeExhausted(Exception):
+    """В диапазоне меньше свободных номеров, чем запрошено."""
+
+    def __init__(self, available):
+        self.available = available
+        super().__init__(f"В диапазоне осталось только {available} свободных номеров.")
+
+
+def get_space(equipment_type, pattern=None):
+    return SerialSpace(equipment_type.serial_number_mask, pattern)
+
+
+def find_free_indexes(equipment_type, space, start_index, count, batch_size=None):
+    """
+    Порядковые номера (SerialSpace) первых count свободных номеров начиная
+    с start_index. Занятые номера читаются не по одному, а проходом по индексу
+    (тип, серийный номер) от текущей позиции частями по batch_size строк:
+    плотно занятый участок пропускается одним запросом, а если строк меньше
+    batch_size, дальше все свободно. Номера после последнего номера множества
+    не читаются. Порядок SerialSpace побайтовый; при другой сортировке СУБД
+    пропущенный занятый номер отсеет проверка при вставке (или
+    taken_serial_numbers() в generate_serial_numbers()).
+    """
+    batch_size = batch_size or get_bulk_chunk_size()
+    free = []
+    index = start_index
+    if start_index >= space.capacity:
+        return free
+    taken_queryset = Equipment.objects.filter(
+        equipment_type=equipment_type, is_deleted=False,
+        serial_number__lte=space.serial_number(space.capacity - 1)
+    )
+    cursor = space.serial_number(start_index)
+    lookup = 'serial_number__gte'
+    while cursor is not None and len(free) < count and index < space.capacity:
+        rows = list(
+            taken_queryset.filter(**{lookup: cursor})
+            .order_by('serial_number').values_list('serial_number', flat=True)[:batch_size]
+        )
+        taken = {position for position in map(space.index, rows) if position is not None}
+        if len(rows) < batch_size:
+            # Дальше занятых номеров нет
+            bound = space.capacity
+            cursor = None
+        else:
+            # Проверены все номера не больше последней прочитанной строки
+            bound = max(taken) + 1 if taken else index
+            cursor = rows[-1]
+            lookup = 'serial_number__gt'
+        while index < bound and len(free) < count:
+            if index not in taken:
+                free.append(index)
+            index += 1
+    return free
+
+
+def taken_serial_numbers(equipment_type, serial_numbers):
+    """
+    Номера из serial_numbers, занятые действующим оборудованием типа, в
+    casefold(). Сравнивает СУБД (serial_number IN (...)) по своим правилам
+    сортировки: в MySQL без учета регистра, как и проверка при вставке.
+    """
+    queryset = Equipment.objects.filter(equipment_type=equipment_type, is_deleted=False)
+    taken = set()
+    for chunk in chunked(serial_numbers, get_bulk_chunk_size()):
+        taken.update(
+            serial_number.casefold()
+            for serial_number in queryset.filter(serial_number__in=chunk).values_list('serial_number', flat=True)
+        )
+    return taken
+
+
+def generate_serial_numbers(equipment_type, count, start=None, pattern=None):
+    """
+    Следующие count свободных номеров типа от start (включительно) без записи в БД.
+    Найденные номера перепроверяются taken_serial_numbers(): номер, который
+    СУБД считает занятым (например, отличающийся от занятого только регистром),
+    заменяется следующим свободным.
+    """
+    space = get_space(equipment_type, pattern)
+    index = _start_index(space, start)
+    serial_numbers = []
+    last_index = None
+    while len(serial_numbers) < count:
+        needed = count - len(serial_numbers)
+        indexes = find_free_indexes(equipment_type, space, index, needed)
+        candidates = [space.serial_number(position) for position in indexes]
+        taken = taken_serial_numbers(equipment_type, candidates)
+        serial_numbers.extend(sn for sn in candidates if sn.casefold() not in taken)
+        if len(indexes) < needed:
+            raise RangeExhausted(len(serial_numbers))
+        last_index = indexes[-1]
+        index = last_index + 1
+    return serial_numbers, _next_start(space, last_index)
+
+
+def create_serial_range(equipment_type, count, start=None, pattern=None, note=None):
+    """
+    Создает оборудование с count следующими свободными номерами от start.
+    Номера строятся по маске, поэтому в запросе не передаются; вставка -
+    пакетная (create_equipment_items) в одной транзакции: создаются либо все
+    count записей, либо ни одной. Номер, занятый параллельным запросом между
+    поиском и вставкой, заменяется следующим свободным.
+    Возвращает (созданные записи, номер для продолжения или None).
+    """
+    space = get_space(equipment_type, pattern)
+    index = _start_index(space, start)
+    created = []
+    last_index = None
+    with transaction.atomic():
+        while len(created) < count:
+            indexes = find_free_indexes(equipment_type, space, index, count - len(created))
+            if len(indexes) < count - len(created):
+                raise RangeExhausted(len(created) + len(indexes))
+            instances, _ = create_equipment_items(
+                equipment_type, [(space.serial_number(position), note) for position in indexes]
+            )
+            created.extend(instances)
+            last_index = indexes[-1]
+            index = last_index + 1
+    return created, _next_start(space, last_index)
+
+
+def _start_index(space, start):
+    if start is None:
+        return 0
+    index = space.index(start)
+    if index is None:
+        raise ValueError(f"Начальный номер '{start}' не подходит под маску и шаблон.")
+    return index
+
+
+def _next_start(space, last_index):
+    if last_index is None or last_index + 1 >= space.capacity:
+        return None
+    return space.serial_number(last_index + 1)
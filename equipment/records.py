@@ -0,0 +1,233 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db import connections
+from django.db.models import F, Value, prefetch_related_objects
+
+from .models import ArchivedEquipment, Equipment, EquipmentRecord
+
+
+def record_branches():
+    """Выборки основной таблицы и архива с полями EquipmentRecord."""
+    return (
+        Equipment.objects.annotate(is_archived=Value(False)),
+        ArchivedEquipment.objects.annotate(is_deleted=Value(True), is_archived=Value(True)),
+    )
+
+
+def record_field(path):
+    """Поле EquipmentRecord по пути values()/order_by(); None - путь через JOIN."""
+    if path == 'pk':
+        return EquipmentRecord._meta.pk
+    try:
+        return EquipmentRecord._meta.get_field(path)
+    except FieldDoesNotExist:
+        return None
+
+
+def record_column(path):
+    """Имя столбца результата: столбец поля модели или сам путь (equipment_type__name)."""
+    field = record_field(path)
+    return path if field is None else field.column
+
+
+class RecordQuerySet:
+    """
+    Оборудование вместе с архивом (EquipmentRecord) без чтения представления
+    equipment_equipment_all: MySQL материализует представление с UNION целиком,
+    и выгрузка архива частями (id > последнего) перечитывала бы обе таблицы на
+    каждую часть. Фильтры применяются обычным ORM к выборкам Equipment и
+    ArchivedEquipment (branches), поэтому каждая таблица читается по своим
+    индексам, а условие, которое нельзя применить к ветви, дает ошибку ORM.
+    Строки ветвей объединяются одним запросом через raw():
+    SELECT ... FROM (ветвь) UNION ALL SELECT ... FROM (ветвь) ORDER BY ... LIMIT,
+    при LIMIT в каждую ветвь переносятся сортировка и LIMIT offset + limit.
+
+    Поддерживается то, что нужно спискам, выгрузке и массовым операциям:
+    filter, exclude, order_by, values, values_list, срезы, count, get, first
+    и асинхронное чтение. Результат - экземпляры EquipmentRecord или строки values().
+    """
+    model = EquipmentRecord
+
+    def __init__(self, branches=None):
+        self.branches = record_branches() if branches is None else tuple(branches)
+        self.ordering = ()
+        # Пути полей values()/values_list(); None - экземпляры модели
+        self.fields = None
+        self.row_type = None
+        self.related = ()
+        self.low_mark, self.high_mark = 0, None
+        self._result_cache = None
+
+    def _clone(self, **changes):
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__, _result_cache=None, **changes)
+        return clone
+
+    def _branch_clone(self, method, *args, **kwargs):
+        if self.is_sliced:
+            raise TypeError("Cannot filter a query once a slice has been taken.")
+        return self._clone(branches=tuple(getattr(branch, method)(*args, **kwargs) for branch in self.branches))
+
+    @property
+    def db(self):
+        return self.branches[0].db
+
+    @property
+    def ordered(self):
+        return bool(self.ordering)
+
+    @property
+    def is_sliced(self):
+        return bool(self.low_mark) or self.high_mark is not None
+
+    def all(self):
+        return self._clone()
+
+    def none(self):
+        return self._branch_clone('none')
+
+    def filter(self, *args, **kwargs):
+        return self._branch_clone('filter', *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self._branch_clone('exclude', *args, **kwargs)
+
+    def select_related(self, *fields):
+        return self._clone(related=self.related + fields)
+
+    def order_by(self, *fields):
+        return self._clone(ordering=fields)
+
+    def values(self, *fields):
+        return self._clone(fields=fields or self.model_fields(), row_type=dict)
+
+    def values_list(self, *fields, flat=False):
+        if flat and len(fields) != 1:
+            raise TypeError("'flat' is only valid when values_list is called with 1 field.")
+        return self._clone(fields=fields or self.model_fields(), row_type='flat' if flat else tuple)
+
+    def model_fields(self):
+        return tuple(field.attname for field in self.model._meta.concrete_fields)
+
+    def __getitem__(self, k):
+        if self._result_cache is not None:
+            return self._result_cache[k]
+        if isinstance(k, int):
+            if k < 0:
+                raise ValueError("Negative indexing is not supported.")
+            return self[k:k + 1]._fetch()[0]
+        if (k.start is not None and k.start < 0) or (k.stop is not None and k.stop < 0):
+            raise ValueError("Negative indexing is not supported.")
+        if k.step is not None:
+            raise ValueError("Slicing with a step is not supported.")
+        low = self.low_mark + (k.start or 0)
+        high = self.high_mark if k.stop is None else self.low_mark + k.stop
+        if self.high_mark is not None:
+            low, high = min(low, self.high_mark), min(high, self.high_mark)
+        return self._clone(low_mark=low, high_mark=high)
+
+    def columns(self):
+        """{столбец результата: путь поля}: поля values() или модели, id и поля сортировки."""
+        paths = list(self.model_fields()) if self.row_type is None else ['pk', *self.fields]
+        paths.extend(term.lstrip('-') for term in self.ordering)
+        columns = {}
+        for path in paths:
+            columns.setdefault(record_column(path), path)
+        return columns
+
+    def sql_with_params(self):
+        """SQL объединения ветвей; EmptyResultSet, если все ветви заведомо пусты."""
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        columns = self.columns()
+        aliases = {column: f"c{number}" for number, column in enumerate(columns)}
+        parts = []
+        params = []
+        for number, branch in enumerate(self.branches):
+            branch = branch.values(**{aliases[column]: F(path) for column, path in columns.items()})
+            if self.high_mark is not None:
+                # Строки страницы с любым смещением - среди первых high_mark каждой ветви
+                branch = branch.order_by(*self.ordering)[:self.high_mark]
+            try:
+                sql, branch_params = branch.query.sql_with_params()
+            except EmptyResultSet:
+                continue
+            parts.append(f"SELECT * FROM ({sql}) {quote_name(f'record_{number}')}")
+            params.extend(branch_params)
+        if not parts:
+            raise EmptyResultSet
+        select = ", ".join(f"{quote_name(aliases[column])} AS {quote_name(column)}" for column in columns)
+        sql = f"SELECT {select} FROM ({' UNION ALL '.join(parts)}) {quote_name('records')}"
+        if self.ordering:
+            sql += " ORDER BY " + ", ".join(
+                f"{quote_name(record_column(term.lstrip('-')))} {'DESC' if term.startswith('-') else 'ASC'}"
+                for term in self.ordering
+            )
+        if self.is_sliced:
+            sql += " " + connection.ops.limit_offset_sql(self.low_mark, self.high_mark)
+        return sql, tuple(params)
+
+    def _fetch(self):
+        if self._result_cache is None:
+            try:
+                sql, params = self.sql_with_params()
+            except EmptyResultSet:
+                records = []
+            else:
+                # raw() приводит значения столбцов модели к типам Python, как обычный запрос
+                records = list(self.model.objects.db_manager(self.db).raw(sql, params))
+            self._result_cache = self._rows(records)
+        return self._result_cache
+
+    def _rows(self, records):
+        if self.row_type is None:
+            if self.related:
+                prefetch_related_objects(records, *self.related)
+            return records
+        attnames = [
+            path if field is None else field.attname
+            for path, field in ((path, record_field(path)) for path in self.fields)
+        ]
+        if self.row_type is dict:
+            return [dict(zip(self.fields, (getattr(record, name) for name in attnames))) for record in records]
+        if self.row_type == 'flat':
+            return [getattr(record, attnames[0]) for record in records]
+        return [tuple(getattr(record, name) for name in attnames) for record in records]
+
+    def __iter__(self):
+        return iter(self._fetch())
+
+    def __len__(self):
+        return len(self._fetch())
+
+    def __bool__(self):
+        return bool(self._fetch())
+
+    def __aiter__(self):
+        async def rows():
+            for row in await sync_to_async(self._fetch)():
+                yield row
+        return rows()
+
+    def count(self):
+        if self._result_cache is not None or self.is_sliced:
+            return len(self._fetch())
+        return sum(branch.count() for branch in self.branches)
+
+    async def acount(self):
+        return await sync_to_async(self.count)()
+
+    def get(self, *args, **kwargs):
+        rows = self.filter(*args, **kwargs)[:2]._fetch()
+        if not rows:
+            raise self.model.DoesNotExist(f"{self.model._meta.object_name} matching query does not exist.")
+        if len(rows) > 1:
+            raise self.model.MultipleObjectsReturned(f"get() returned more than one {self.model._meta.object_name}.")
+        return rows[0]
+
+    def first(self):
+        rows = (self if self.ordered else self.order_by('pk'))[:1]._fetch()
+        return rows[0] if rows else None
+
+    async def afirst(self):
+        return await sync_to_async(self.first)()
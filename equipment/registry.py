@@ -0,0 +1,106 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .models import EquipmentType
+from . import versions
+
+
+class TypeRegistry:
+    """
+    Копия таблицы типов оборудования в памяти процесса: id -> тип, имя -> тип
+    и скомпилированная маска. Таблица маленькая и меняется редко.
+
+    Перед обращением сверяется общий счетчик версий (versions.EQUIPMENT_TYPE),
+    который увеличивается при сохранении и удалении типа; при расхождении
+    снимок перечитывается одним запросом. Счетчик живет в кэше Django, поэтому
+    для согласованности нескольких процессов кэш должен быть общим. Если кэш
+    локальный, снимок все равно перечитывается не реже раза в max_age секунд.
+    """
+
+    def __init__(self, max_age=None):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded_at = 0.0
+        self._by_id = {}
+        self._by_name = {}
+        self._ordered = ()
+
+    def _get_max_age(self):
+        if self.max_age is not None:
+            return self.max_age
+        return getattr(settings, 'TYPE_REGISTRY_MAX_AGE', 60)
+
+    def _is_stale(self, version):
+        return version != self._version or time.monotonic() - self._loaded_at > self._get_max_age()
+
+    def _snapshot(self):
+        version = versions.get_version(versions.EQUIPMENT_TYPE)
+        if self._is_stale(version):
+            with self._lock:
+                if self._is_stale(version):
+                    self._load(version)
+        return self._by_id, self._by_name, self._ordered
+
+    async def arefresh(self):
+        """
+        Перечитывает устаревший снимок асинхронным запросом. Вызывается в
+        async-представлениях перед синхронными get()/all(), чтобы те не
+        обращались к БД из цикла событий.
+        """
+        version = versions.get_version(versions.EQUIPMENT_TYPE)
+        if self._is_stale(version):
+            types = [equipment_type async for equipment_type in EquipmentType.objects.order_by('id')]
+            with self._lock:
+                self._set(types, version)
+
+    def _load(self, version):
+        self._set(list(EquipmentType.objects.order_by('id')), version)
+
+    def _set(self, types, version):
+        by_name = {}
+        for equipment_type in types:
+            by_name.setdefault(equipment_type.name, equipment_type)
+        self._by_id = {equipment_type.pk: equipment_type for equipment_type in types}
+        self._by_name = by_name
+        self._ordered = tuple(types)
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+    def get(self, type_id):
+        """
+        Тип по id или None. Экземпляры общие для потоков - их нельзя изменять.
+        Промах проверяется запросом к БД: тип мог быть создан в другом процессе,
+        а при локальном кэше счетчик версий об этом не знает.
+        """
+        equipment_type = self._snapshot()[0].get(type_id)
+        if equipment_type is None:
+            equipment_type = EquipmentType.objects.filter(pk=type_id).first()
+            if equipment_type is not None:
+                self.invalidate()
+        return equipment_type
+
+    def get_by_name(self, name):
+        """Тип по точному имени (при совпадении имен - с меньшим id) или None."""
+        return self._snapshot()[1].get(name)
+
+    def in_bulk(self, type_ids):
+        by_id = self._snapshot()[0]
+        return {type_id: by_id[type_id] for type_id in type_ids if type_id in by_id}
+
+    def all(self):
+        """Все типы в порядке id."""
+        return self._snapshot()[2]
+
+    def get_validator(self, type_id):
+        equipment_type = self.get(type_id)
+        return None if equipment_type is None else equipment_type.get_mask_validator()
+
+
+type_registry = TypeRegistry()
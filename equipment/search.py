@@ -0,0 +1,225 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Equipment, EquipmentSearchToken
+
+logger = logging.getLogger(__name__)
+
+# Индексируемые текстовые поля оборудования и их коды в EquipmentSearchToken
+INDEXED_FIELDS = {
+    'serial_number': EquipmentSearchToken.FIELD_SERIAL_NUMBER,
+    'note': EquipmentSearchToken.FIELD_NOTE,
+}
+
+TOKEN_SIZE = 3
+
+
+def trigrams(value):
+    """Множество триграмм строки в нижнем регистре; короче трех символов - пусто."""
+    if not value:
+        return set()
+    value = value.lower()
+    return {value[i:i + TOKEN_SIZE] for i in range(len(value) - TOKEN_SIZE + 1)}
+
+
+def build_tokens(equipment_id, serial_number, note):
+    """Строки индекса для одной записи: список (equipment_id, field, token)."""
+    rows = []
+    for field, value in ((EquipmentSearchToken.FIELD_SERIAL_NUMBER, serial_number),
+                         (EquipmentSearchToken.FIELD_NOTE, note)):
+        rows.extend((equipment_id, field, token) for token in trigrams(value))
+    return rows
+
+
+class BaseSearchBackend:
+    """
+    Поисковый бэкенд отвечает за сужение выборки по подстроке до кандидатов
+    через индекс. Точная проверка (icontains/istartswith) всегда добавляется
+    поверх кандидатов в contains_q()/startswith_q(), поэтому бэкенду достаточно
+    вернуть надмножество подходящих записей.
+    """
+    name = None
+    # Более короткие строки не сужаются индексом и проверяются только LIKE
+    min_term_length = TOKEN_SIZE
+
+    def candidates_q(self, fields, term):
+        return Q()
+
+    def index(self, ids):
+        """Обновляет индекс для записей ids (после создания или изменения)."""
+
+    def rebuild(self, batch_size=None, log=None):
+        """Полностью перестраивает индекс."""
+
+
+class NoIndexSearchBackend(BaseSearchBackend):
+    """Без индекса: обычный LIKE '%...%' по таблице."""
+    name = 'none'
+
+
+class TrigramSearchBackend(BaseSearchBackend):
+    """
+    Индекс в таблице EquipmentSearchToken, работает на любой СУБД (включая SQLite).
+    Кандидаты - записи, у которых в одном из полей есть все триграммы строки:
+    SELECT equipment_id ... WHERE token IN (...) GROUP BY equipment_id, field
+    HAVING COUNT(DISTINCT token) = <число триграмм>.
+    """
+    name = 'trigram'
+
+    def candidates_q(self, fields, term):
+        tokens = trigrams(term)
+        field_codes = [INDEXED_FIELDS[field] for field in fields if field in INDEXED_FIELDS]
+        if not tokens or not field_codes:
+            return Q()
+        candidate_ids = (
+            EquipmentSearchToken.objects
+            .filter(token__in=tokens, field__in=field_codes)
+            .values('equipment_id', 'field')
+            .annotate(matched=Count('token', distinct=True))
+            .filter(matched=len(tokens))
+            .values('equipment_id')
+        )
+        return Q(pk__in=candidate_ids)
+
+    def _write(self, ids, batch_size):
+        EquipmentSearchToken.objects.filter(equipment_id__in=ids).delete()
+        rows = Equipment.objects.filter(pk__in=ids).values_list('id', 'serial_number', 'note')
+        tokens = [
+            EquipmentSearchToken(equipment_id=equipment_id, field=field, token=token)
+            for row in rows
+            for equipment_id, field, token in build_tokens(*row)
+        ]
+        EquipmentSearchToken.objects.bulk_create(tokens, batch_size=batch_size)
+        return len(tokens)
+
+    def index(self, ids):
+        batch_size = getattr(settings, 'BULK_CHUNK_SIZE', 1000)
+        ids = list(ids)
+        with transaction.atomic():
+            for start in range(0, len(ids), batch_size):
+                self._write(ids[start:start + batch_size], batch_size)
+
+    def rebuild(self, batch_size=None, log=None):
+        batch_size = batch_size or getattr(settings, 'BULK_CHUNK_SIZE', 1000)
+        EquipmentSearchToken.objects.all().delete()
+        last_id = 0
+        total = 0
+        while True:
+            ids = list(
+                Equipment.objects.filter(pk__gt=last_id)
+                .order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                self._write(ids, batch_size)
+            last_id = ids[-1]
+            total += len(ids)
+            if log:
+                log(f"Проиндексировано записей: {total}")
+        return total
+
+
+class MySQLFulltextSearchBackend(BaseSearchBackend):
+    """
+    Полнотекстовые индексы MySQL с парсером ngram (по индексу на поле).
+    Индексы поддерживает сама СУБД, index() ничего не делает; rebuild()
+    создает (или пересоздает) индексы. Фраза в BOOLEAN MODE ищет
+    последовательность n-грамм, т.е. подстроку.
+    """
+    name = 'fulltext'
+    table = Equipment._meta.db_table
+
+    @staticmethod
+    def index_name(field):
+        return f"equipment_ft_{field}"
+
+    def candidates_q(self, fields, term):
+        if connection.vendor != 'mysql':
+            return Q()
+        phrase = '"{}"'.format(term.replace('"', ' '))
+        condition = Q()
+        for field in fields:
+            if field not in INDEXED_FIELDS:
+                continue
+            column = Equipment._meta.get_field(field).column
+            condition |= Q(pk__in=RawSQL(
+                f"SELECT id FROM {self.table} WHERE MATCH({column}) AGAINST (%s IN BOOLEAN MODE)",
+                [phrase]
+            ))
+        return condition
+
+    def rebuild(self, batch_size=None, log=None):
+        if connection.vendor != 'mysql':
+            raise ImproperlyConfigured("Бэкенд поиска 'fulltext' работает только с MySQL.")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT DISTINCT index_name FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = %s",
+                [self.table]
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+            for field in INDEXED_FIELDS:
+                name = self.index_name(field)
+                column = Equipment._meta.get_field(field).column
+                if name in existing:
+                    cursor.execute(f"DROP INDEX {name} ON {self.table}")
+                cursor.execute(f"CREATE FULLTEXT INDEX {name} ON {self.table} ({column}) WITH PARSER ngram")
+                if log:
+                    log(f"Создан индекс {name}")
+
+
+SEARCH_BACKENDS = {
+    backend.name: backend
+    for backend in (NoIndexSearchBackend, TrigramSearchBackend, MySQLFulltextSearchBackend)
+}
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        name = getattr(settings, 'SEARCH_BACKEND', TrigramSearchBackend.name)
+        if name not in SEARCH_BACKENDS:
+            raise ImproperlyConfigured(
+                f"Неизвестный бэкенд поиска '{name}', допустимые: {', '.join(SEARCH_BACKENDS)}."
+            )
+        _backend = SEARCH_BACKENDS[name]()
+    return _backend
+
+
+def _candidates_q(backend, fields, term, unindexed_q):
+    candidates = backend.candidates_q(fields, term)
+    if candidates and unindexed_q is not None:
+        # Записи вне индекса (архив) проверяются только точным условием
+        candidates |= unindexed_q
+    return candidates
+
+
+def contains_q(fields, term, backend=None, unindexed_q=None):
+    """
+    Условие "term входит в одно из полей fields" без учета регистра.
+    unindexed_q выделяет записи, которых нет в индексе (см. EquipmentRecord).
+    """
+    backend = backend or get_search_backend()
+    verify = Q()
+    for field in fields:
+        verify |= Q(**{f"{field}__icontains": term})
+    if len(term) < backend.min_term_length:
+        return verify
+    return _candidates_q(backend, fields, term, unindexed_q) & verify
+
+
+def startswith_q(field, term, backend=None, unindexed_q=None):
+    """Условие "поле начинается с term" без учета регистра."""
+    backend = backend or get_search_backend()
+    verify = Q(**{f"{field}__istartswith": term})
+    if len(term) < backend.min_term_length:
+        return verify
+    return _candidates_q(backend, [field], term, unindexed_q) & verify
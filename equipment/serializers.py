@@ -1,16 +1,93 @@
+from django.db import IntegrityError, models, transaction
 from rest_framework import serializers
-from .models import EquipmentType, Equipment
+from .models import EquipmentType, Equipment, ImportJob, ImportJobError
+from .availability import MAX_CHECK_ITEMS, group_by_type
+from .bulk import create_equipment_batch
+from .jobs import submit_import_job
+from .metrics import measure_serialization
+from .ranges import MAX_GENERATE_COUNT, get_space
+from .registry import type_registry
+from .stats import get_type_stats
 
-class EquipmentTypeSerializer(serializers.ModelSerializer):
+class MeasuredDataMixin:
+    """
+    Время serializer.data попадает в фазу serialize замеров запроса
+    (equipment/metrics.py, заголовок Server-Timing).
+    """
+    @property
+    def data(self):
+        with measure_serialization():
+            return super().data
+
+
+class MeasuredListSerializer(MeasuredDataMixin, serializers.ListSerializer):
+    pass
+
+
+class EquipmentTypeSerializer(MeasuredDataMixin, serializers.ModelSerializer):
     """
     Сериализатор для модели Тип оборудования.
     """
     class Meta:
         model = EquipmentType
         fields = ['id', 'name', 'serial_number_mask']
+        list_serializer_class = MeasuredListSerializer
+
+
+class TypeStatsListSerializer(MeasuredListSerializer):
+    """Статистика всех типов страницы читается одним запросом (или берется из context['type_stats'])."""
+
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        if 'type_stats' not in self.context:
+            self.context['type_stats'] = get_type_stats([item.pk for item in items])
+        return super().to_representation(items)
+
+
+class EquipmentTypeStatsSerializer(EquipmentTypeSerializer):
+    """
+    Тип оборудования с числом действующего и удаленного (включая архив)
+    оборудования. Числа берутся из EquipmentTypeStats, без COUNT(*).
+    """
+    active_count = serializers.SerializerMethodField()
+    deleted_count = serializers.SerializerMethodField()
+
+    class Meta(EquipmentTypeSerializer.Meta):
+        fields = EquipmentTypeSerializer.Meta.fields + ['active_count', 'deleted_count']
+        list_serializer_class = TypeStatsListSerializer
+
+    def get_stats(self, instance):
+        type_stats = self.context.get('type_stats')
+        if type_stats is None or instance.pk not in type_stats:
+            type_stats = self.context['type_stats'] = get_type_stats([instance.pk])
+        return type_stats.get(instance.pk, (0, 0))
+
+    def get_active_count(self, instance):
+        return self.get_stats(instance)[0]
+
+    def get_deleted_count(self, instance):
+        return self.get_stats(instance)[1]
 
 
-class EquipmentListSerializer(serializers.ModelSerializer):
+class EquipmentTypeRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле id типа оборудования, которое ищет тип в реестре в памяти процесса
+    (equipment/registry.py), а не запросом к БД.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        equipment_type = type_registry.get(pk)
+        if equipment_type is None:
+            self.fail('does_not_exist', pk_value=data)
+        return equipment_type
+
+
+class EquipmentListSerializer(MeasuredDataMixin, serializers.ModelSerializer):
     """
     Сериализатор для списка оборудования (с представлением типа оборудования).
     """
@@ -23,6 +100,7 @@ class EquipmentListSerializer(serializers.ModelSerializer):
         model = Equipment
         fields = ['id', 'equipment_type', 'equipment_type_id', 'serial_number', 'note', 'is_deleted']
         read_only_fields = ['is_deleted']
+        list_serializer_class = MeasuredListSerializer
 
 
 class EquipmentCreateSerializer(serializers.Serializer):
@@ -39,7 +117,7 @@ class EquipmentCreateSerializer(serializers.Serializer):
 
     def validate_equipment_type_id(self, value):
         """Проверяет существование типа оборудования."""
-        if not EquipmentType.objects.filter(id=value).exists():
+        if type_registry.get(value) is None:
             raise serializers.ValidationError("Указанный тип оборудования не существует.")
         return value
 
@@ -48,46 +126,14 @@ class EquipmentCreateSerializer(serializers.Serializer):
         serial_numbers = validated_data['serial_numbers']
         note = validated_data.get('note')
 
-        equipment_type = EquipmentType.objects.get(id=equipment_type_id)
-        
-        created_instances = []
-        error_list = []
-
-        for sn in serial_numbers: # Убрал transaction.atomic()
-            # 1. Валидация по маске
-            if not Equipment.validate_serial_number_by_mask(sn, equipment_type.serial_number_mask):
-                error_list.append({
-                    "serial_number": sn,
-                    "error": f"Серийный номер '{sn}' не соответствует маске '{equipment_type.serial_number_mask}'."
-                })
-                continue
+        equipment_type = type_registry.get(equipment_type_id)
+
+        # Проверка по маске, поиск занятых номеров и вставка выполняются пакетно,
+        # см. equipment/bulk.py
+        created_instances, error_list = create_equipment_batch(equipment_type, serial_numbers, note)
 
-            # 2. Проверка на уникальность (тип + серийный номер) для активных записей
-            if Equipment.objects.filter(equipment_type=equipment_type, serial_number=sn, is_deleted=False).exists():
-                error_list.append({
-                    "serial_number": sn,
-                    "error": f"Оборудование с типом '{equipment_type.name}' и серийным номером '{sn}' уже существует."
-                })
-                continue
-
-            try:
-                # Каждое создание Equipment.objects.create() теперь выполняется в своей собственной транзакции
-                # (если AUTOCOMMIT=True в настройках БД, что является поведением по умолчанию Django).
-                equipment_instance = Equipment.objects.create(
-                    equipment_type=equipment_type,
-                    serial_number=sn,
-                    note=note
-                )
-                created_instances.append(equipment_instance)
-            except Exception as e: # Ловим другие возможные ошибки при создании (например, проблемы с БД)
-                error_list.append({
-                    "serial_number": sn,
-                    "error": f"Не удалось создать оборудование '{sn}': {str(e)}"
-                })
-        
-        
         return {
-            "created_instances": EquipmentListSerializer(created_instances, many=True).data,
+            "created_equipment": EquipmentListSerializer(created_instances, many=True).data,
             "errors": error_list
         }
 
@@ -97,7 +143,7 @@ class EquipmentUpdateSerializer(serializers.ModelSerializer):
     Сериализатор для обновления оборудования.
     """
     # Запрещаем изменение типа оборудования и серийного номера через этот сериализатор.
-    equipment_type_id = serializers.PrimaryKeyRelatedField(
+    equipment_type_id = EquipmentTypeRelatedField(
         queryset=EquipmentType.objects.all(),
         source='equipment_type',
         required=False 
@@ -130,4 +176,186 @@ class EquipmentUpdateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError({
                     'serial_number': f"Оборудование с типом '{equipment_type_obj.name}' и серийным номером '{serial_number}' уже существует."
                 })
-        return data
\ No newline at end of file
+        return data
+
+    def update(self, instance, validated_data):
+        # Проверка в validate() - для понятной ошибки; окончательно уникальность
+        # обеспечивает индекс unique_equipment_type_active_serial_number, на нем
+        # может упасть параллельный запрос, занявший номер после проверки
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            equipment_type = validated_data.get('equipment_type', instance.equipment_type)
+            serial_number = validated_data.get('serial_number', instance.serial_number)
+            raise serializers.ValidationError({
+                'serial_number': f"Оборудование с типом '{equipment_type.name}' и серийным номером '{serial_number}' уже существует."
+            })
+
+class EquipmentGenerateSerializer(serializers.Serializer):
+    """
+    Генерация диапазона номеров: count следующих свободных номеров типа,
+    начиная со start (включительно) или с первого номера маски. pattern -
+    шаблон длины маски, где '*' - любой символ, остальные позиции фиксированы.
+    dry_run - только вернуть номера, ничего не создавая.
+    """
+    equipment_type_id = serializers.IntegerField()
+    count = serializers.IntegerField(min_value=1, max_value=MAX_GENERATE_COUNT)
+    start = serializers.CharField(max_length=255, required=False)
+    pattern = serializers.CharField(max_length=255, required=False)
+    note = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate_equipment_type_id(self, value):
+        if type_registry.get(value) is None:
+            raise serializers.ValidationError("Указанный тип оборудования не существует.")
+        return value
+
+    def validate(self, data):
+        data['equipment_type'] = type_registry.get(data['equipment_type_id'])
+        try:
+            space = get_space(data['equipment_type'], data.get('pattern'))
+        except ValueError as e:
+            raise serializers.ValidationError({'pattern': str(e)})
+        if 'start' in data and space.index(data['start']) is None:
+            raise serializers.ValidationError(
+                {'start': f"Начальный номер '{data['start']}' не подходит под маску и шаблон."}
+            )
+        return data
+
+
+class SerialNumberListField(serializers.Field):
+    """
+    Список серийных номеров. Разбирается одним циклом, а не CharField на
+    каждый элемент, как в ListField: номеров бывают сотни тысяч.
+    """
+    max_length = 255
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            raise serializers.ValidationError("Ожидается непустой список серийных номеров.")
+        if len(data) > MAX_CHECK_ITEMS:
+            raise serializers.ValidationError(f"Не больше {MAX_CHECK_ITEMS} номеров за запрос.")
+        for position, serial_number in enumerate(data):
+            if not self.is_serial_number(serial_number):
+                raise serializers.ValidationError(f"Элемент {position}: ожидается серийный номер (строка до {self.max_length} символов).")
+        return data
+
+    def is_serial_number(self, value):
+        return isinstance(value, str) and 0 < len(value) <= self.max_length
+
+    def to_representation(self, value):
+        return value
+
+
+class SerialNumberPairsField(SerialNumberListField):
+    """Список пар [equipment_type_id, serial_number] (или объектов с этими ключами)."""
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            raise serializers.ValidationError("Ожидается непустой список пар [equipment_type_id, serial_number].")
+        if len(data) > MAX_CHECK_ITEMS:
+            raise serializers.ValidationError(f"Не больше {MAX_CHECK_ITEMS} номеров за запрос.")
+        pairs = []
+        for position, item in enumerate(data):
+            if isinstance(item, dict):
+                item = (item.get('equipment_type_id'), item.get('serial_number'))
+            if (not isinstance(item, (list, tuple)) or len(item) != 2
+                    or type(item[0]) is not int or not self.is_serial_number(item[1])):
+                raise serializers.ValidationError(f"Элемент {position}: ожидается [equipment_type_id, serial_number].")
+            pairs.append((item[0], item[1]))
+        return pairs
+
+
+class EquipmentCheckSerializer(serializers.Serializer):
+    """
+    Проверка наличия номеров: либо items - пары [equipment_type_id, serial_number]
+    разных типов, либо equipment_type_id и serial_numbers одного типа.
+    """
+    items = SerialNumberPairsField(required=False)
+    equipment_type_id = serializers.IntegerField(required=False)
+    serial_numbers = SerialNumberListField(required=False)
+
+    def validate(self, data):
+        if 'items' in data:
+            if 'serial_numbers' in data or 'equipment_type_id' in data:
+                raise serializers.ValidationError("Укажите либо items, либо equipment_type_id и serial_numbers.")
+            data['groups'] = group_by_type(data['items'])
+        elif 'serial_numbers' in data and 'equipment_type_id' in data:
+            data['groups'] = group_by_type((data['equipment_type_id'], sn) for sn in data['serial_numbers'])
+        else:
+            raise serializers.ValidationError("Укажите items или equipment_type_id и serial_numbers.")
+        return data
+
+
+class EquipmentBulkIdsSerializer(serializers.Serializer):
+    """
+    Тело массового удаления и восстановления: список id. Если ids не передан,
+    набор записей задается фильтрами списка в строке запроса.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+
+
+class EquipmentBulkUpdateItemSerializer(serializers.Serializer):
+    """Изменение одной записи в массовом обновлении."""
+    id = serializers.IntegerField(min_value=1)
+    serial_number = serializers.CharField(max_length=255, required=False)
+    note = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
+class EquipmentBulkUpdateSerializer(serializers.Serializer):
+    """
+    Тело массового обновления, один из вариантов:
+    - {"items": [{"id": 1, "serial_number": "...", "note": "..."}, ...]} - свои изменения для каждой записи;
+    - {"ids": [1, 2, 3], "note": "..."} - одно примечание для набора записей;
+    - {"note": "..."} - одно примечание для записей по фильтрам в строке запроса.
+    """
+    items = EquipmentBulkUpdateItemSerializer(many=True, required=False, allow_empty=False)
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    note = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+    def validate(self, data):
+        if 'items' in data:
+            if 'ids' in data or 'note' in data:
+                raise serializers.ValidationError("Передайте либо items, либо note (с ids или фильтром).")
+        elif 'note' not in data:
+            raise serializers.ValidationError("Не указаны изменения: items или note.")
+        return data
+
+
+class ImportJobCreateSerializer(EquipmentCreateSerializer):
+    """
+    Сериализатор для постановки задания импорта в очередь.
+    Тело такое же, как при создании оборудования.
+    """
+
+    def create(self, validated_data):
+        records = (
+            (line_num, {
+                'equipment_type_id': validated_data['equipment_type_id'],
+                'serial_number': sn,
+                'note': validated_data.get('note'),
+            })
+            for line_num, sn in enumerate(validated_data['serial_numbers'], start=1)
+        )
+        return submit_import_job(records, user=self.context['request'].user)
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор состояния задания импорта.
+    """
+    class Meta:
+        model = ImportJob
+        fields = ['id', 'status', 'total_rows', 'processed_rows', 'created_count', 'error_count',
+                  'chunk_count', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+
+class ImportJobErrorSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор ошибки задания импорта.
+    """
+    class Meta:
+        model = ImportJobError
+        fields = ['line', 'serial_number', 'error']
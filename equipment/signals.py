@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from .authentication import forget_user, revoke_user_tokens
+
+from .changes import record_changes
+from .masks import invalidate_mask
+from .metrics import execute_wrapper
+from .models import ArchivedEquipment, Equipment, EquipmentType, EquipmentTypeStats
+from .search import get_search_backend
+from . import stats, versions
+
+
+ACTION_CREATE = 'create'
+ACTION_UPDATE = 'update'
+ACTION_DELETE = 'delete'
+ACTION_UNDELETE = 'undelete'
+
+# Изменение набора записей оборудования. Отправляется и для save() (через
+# post_save), и явно из массовых путей, которые обходят save():
+# bulk_create, QuerySet.update. Аргументы: ids - первичные ключи, action - ACTION_*.
+equipment_changed = Signal()
+
+
+def notify_equipment_changed(ids, action):
+    ids = list(ids)
+    if ids:
+        equipment_changed.send(sender=Equipment, ids=ids, action=action)
+
+
+@receiver(pre_save, sender=EquipmentType)
+def drop_old_mask_validator(sender, instance, **kwargs):
+    """При смене маски у типа убираем из кэша валидатор старой маски."""
+    if instance.pk is None:
+        return
+    old_mask = sender.objects.filter(pk=instance.pk).values_list('serial_number_mask', flat=True).first()
+    if old_mask is not None and old_mask != instance.serial_number_mask:
+        invalidate_mask(old_mask)
+
+
+@receiver(post_delete, sender=EquipmentType)
+def drop_deleted_type_mask_validator(sender, instance, **kwargs):
+    invalidate_mask(instance.serial_number_mask)
+
+
+@receiver(post_save, sender=EquipmentType)
+@receiver(post_delete, sender=EquipmentType)
+def equipment_type_changed(sender, **kwargs):
+    versions.bump_version_on_commit(versions.EQUIPMENT_TYPE)
+
+
+@receiver(post_save, sender=EquipmentType)
+def create_type_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        EquipmentTypeStats.objects.get_or_create(equipment_type=instance)
+
+
+@receiver(pre_save, sender=Equipment)
+def remember_counted_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Тип и флаг удаления до save(): по ним post_save поправит статистику типов."""
+    if instance.pk is None or instance._state.adding or raw:
+        return
+    if update_fields is not None and not {'equipment_type', 'is_deleted'} & set(update_fields):
+        return
+    instance._counted_state = (
+        sender.objects.filter(pk=instance.pk).values_list('equipment_type_id', 'is_deleted').first()
+    )
+
+
+@receiver(post_save, sender=Equipment)
+def equipment_saved(sender, instance, created, **kwargs):
+    before = getattr(instance, '_counted_state', None)
+    after = (instance.equipment_type_id, instance.is_deleted)
+    if before is not None and before != after:
+        stats.record_moved(before, after)
+    instance._counted_state = None
+    notify_equipment_changed([instance.pk], ACTION_CREATE if created else ACTION_UPDATE)
+
+
+@receiver(post_delete, sender=Equipment)
+def equipment_hard_deleted(sender, instance, **kwargs):
+    record_changes([instance.pk], ACTION_DELETE)
+    stats.record_removed(instance.equipment_type_id, instance.is_deleted)
+    versions.bump_version_on_commit(versions.EQUIPMENT)
+
+
+@receiver(post_delete, sender=ArchivedEquipment)
+def archived_equipment_deleted(sender, instance, **kwargs):
+    stats.record_removed(instance.equipment_type_id, True)
+
+
+@receiver(equipment_changed)
+def log_equipment_changes(sender, ids, action, **kwargs):
+    record_changes(ids, action)
+
+
+@receiver(equipment_changed)
+def bump_equipment_version(sender, ids, action, **kwargs):
+    versions.bump_version_on_commit(versions.EQUIPMENT)
+
+
+@receiver(equipment_changed)
+def update_type_stats(sender, ids, action, **kwargs):
+    # Изменение номера или примечания на счетчики не влияет; смену типа
+    # или флага через save() учитывает equipment_saved
+    if action == ACTION_CREATE:
+        stats.record_created(ids)
+    elif action in (ACTION_DELETE, ACTION_UNDELETE):
+        stats.record_deleted(ids, is_deleted=action == ACTION_DELETE)
+
+
+@receiver(equipment_changed)
+def update_search_index(sender, ids, action, **kwargs):
+    # Мягкое удаление и восстановление текст не меняют
+    if action in (ACTION_CREATE, ACTION_UPDATE):
+        get_search_backend().index(ids)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """Счетчик запросов к БД для замеров запроса (equipment/metrics.py)."""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def revoke_tokens_on_credentials_change(sender, instance, update_fields=None, **kwargs):
+    """Смена пароля или деактивация пользователя отзывает его выданные токены."""
+    if instance.pk is None:
+        return
+    # Запись last_login при входе и другие частичные сохранения без пароля
+    if update_fields is not None and not {'password', 'is_active'} & set(update_fields):
+        return
+    old = sender.objects.filter(pk=instance.pk).values_list('password', 'is_active').first()
+    if old is not None and (old[0] != instance.password or (old[1] and not instance.is_active)):
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_saved_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotAllowed, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from .compression import BROTLI, GZIP, brotli, choose_encoding, compress
+
+INDEX = 'index.html'
+ASSETS_PREFIX = 'assets/'
+MANIFEST = 'manifest.json'
+
+# Расширения заранее сжатых файлов рядом с исходными (как у gzip_static/brotli_static nginx)
+ENCODING_SUFFIXES = {BROTLI: '.br', GZIP: '.gz'}
+
+# Страница перепроверяется на каждом заходе (ответ 304 без тела), ресурсы с хешем
+# в имени не меняются, и браузер берет их из кэша без запроса
+INDEX_CACHE_CONTROL = 'no-cache'
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+INLINE_BLOCK_RE = re.compile(r'<(style|script)>(.*?)</\1>', re.DOTALL)
+
+
+def get_source_dir():
+    return getattr(settings, 'SPA_SOURCE_DIR', os.path.join(settings.BASE_DIR, 'public'))
+
+
+def get_build_dir():
+    return getattr(settings, 'SPA_BUILD_DIR', os.path.join(settings.BASE_DIR, 'public', 'dist'))
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def build_files(source_dir=None):
+    """
+    Сборка SPA из public/index.html: встроенные <style> и <script> без src
+    выносятся в assets/app.<хеш>.css и assets/app.<хеш>.js, страница ссылается
+    на них. Возвращает {имя: байты}.
+    """
+    with open(os.path.join(source_dir or get_source_dir(), INDEX), encoding='utf-8') as f:
+        html = f.read()
+    files = {}
+
+    def extract(match):
+        tag, content = match.groups()
+        data = content.encode('utf-8')
+        extension = 'css' if tag == 'style' else 'js'
+        name = f"{ASSETS_PREFIX}app.{fingerprint(data)}.{extension}"
+        files[name] = data
+        if tag == 'style':
+            return f'<link rel="stylesheet" href="/{name}">'
+        return f'<script src="/{name}"></script>'
+
+    files[INDEX] = INLINE_BLOCK_RE.sub(extract, html).encode('utf-8')
+    return files
+
+
+def content_type(name):
+    guessed, _ = mimetypes.guess_type(name)
+    guessed = guessed or 'application/octet-stream'
+    if guessed.startswith('text/') or guessed == 'application/javascript':
+        guessed += '; charset=utf-8'
+    return guessed
+
+
+class SpaFile:
+    """Файл сборки в памяти: исходные байты и заранее сжатые варианты."""
+
+    def __init__(self, name, data, variants):
+        self.name = name
+        self.content_type = content_type(name)
+        self.etag = fingerprint(data)
+        self.cache_control = INDEX_CACHE_CONTROL if name == INDEX else ASSET_CACHE_CONTROL
+        self.variants = {None: data, **variants}
+        # Все варианты - одно содержимое: If-None-Match с любым из них дает 304
+        self.etags = {self.variant_etag(encoding) for encoding in self.variants}
+
+    def variant_etag(self, encoding):
+        return f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+
+
+def compress_variants(data):
+    """Сжатые варианты с максимальным уровнем; вариант не хранится, если не меньше исходного."""
+    variants = {}
+    for encoding in ENCODING_SUFFIXES:
+        if encoding == BROTLI and brotli is None:
+            continue
+        compressed = compress(data, encoding, quality=11 if encoding == BROTLI else 9)
+        if len(compressed) < len(data):
+            variants[encoding] = compressed
+    return variants
+
+
+def write_build(build_dir=None, source_dir=None):
+    """
+    Записывает сборку в build_dir: файлы, их .gz/.br и manifest.json.
+    Ресурсы прежних сборок не удаляются: открытые у пользователей страницы
+    ссылаются на них до перезагрузки. Возвращает манифест.
+    """
+    build_dir = build_dir or get_build_dir()
+    manifest = {}
+    for name, data in build_files(source_dir).items():
+        path = os.path.join(build_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        variants = compress_variants(data)
+        for encoding, payload in ((None, data), *variants.items()):
+            with open(path + ENCODING_SUFFIXES.get(encoding, ''), 'wb') as f:
+                f.write(payload)
+        manifest[name] = {'etag': fingerprint(data), 'size': len(data), 'encodings': list(variants)}
+    # Манифест пишется последним и атомарно: процессы читают уже готовую сборку
+    temporary = os.path.join(build_dir, MANIFEST + '.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(temporary, os.path.join(build_dir, MANIFEST))
+    return manifest
+
+
+def read_build(build_dir):
+    with open(os.path.join(build_dir, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    files = {}
+    for name, entry in manifest.items():
+        path = os.path.join(build_dir, name)
+        variants = {}
+        for encoding in [None, *entry['encodings']]:
+            with open(path + ENCODING_SUFFIXES.get(encoding, ''), 'rb') as f:
+                variants[encoding] = f.read()
+        files[name] = SpaFile(name, variants.pop(None), variants)
+    return files
+
+
+class SpaBuild:
+    """
+    Сборка SPA в памяти процесса. Если есть manage.py build_spa (manifest.json
+    в SPA_BUILD_DIR), файлы читаются с диска; иначе сборка выполняется при
+    первом запросе из public/index.html. На запрос - только stat() манифеста
+    или исходника: изменившаяся сборка перечитывается без перезапуска.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._files = {}
+
+    def _current_key(self):
+        for path in (os.path.join(get_build_dir(), MANIFEST), os.path.join(get_source_dir(), INDEX)):
+            try:
+                return path, os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+        return None
+
+    def files(self):
+        key = self._current_key()
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    self._files = self._load(key)
+                    self._key = key
+        return self._files
+
+    def _load(self, key):
+        if key is None:
+            return {}
+        path, _ = key
+        if path.endswith(MANIFEST):
+            return read_build(os.path.dirname(path))
+        return {
+            name: SpaFile(name, data, compress_variants(data))
+            for name, data in build_files().items()
+        }
+
+    def get(self, name):
+        return self.files().get(name)
+
+
+spa_build = SpaBuild()
+
+
+def serve(request, name):
+    """
+    Файл сборки SPA: заранее сжатый вариант по Accept-Encoding, ETag и
+    Cache-Control; совпавший If-None-Match - 304 без тела.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    spa_file = spa_build.get(name)
+    if spa_file is None:
+        return HttpResponse(status=404)
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'), [
+        encoding for encoding in ENCODING_SUFFIXES if encoding in spa_file.variants
+    ])
+    etag = spa_file.variant_etag(encoding)
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        etags = {value.removeprefix('W/') for value in parse_etags(if_none_match)}
+        if '*' in etags or etags & spa_file.etags:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            response['Cache-Control'] = spa_file.cache_control
+            patch_vary_headers(response, ('Accept-Encoding',))
+            return response
+
+    body = spa_file.variants[encoding]
+    response = HttpResponse(b'' if request.method == 'HEAD' else body, content_type=spa_file.content_type)
+    response['Content-Length'] = str(len(body))
+    response['ETag'] = etag
+    response['Cache-Control'] = spa_file.cache_control
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
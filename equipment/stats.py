@@ -0,0 +1,133 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import ArchivedEquipment, Equipment, EquipmentType, EquipmentTypeStats
+
+
+def apply_deltas(deltas):
+    """
+    Прибавляет {тип: (действующих, удаленных)} к статистике типов, одно UPDATE
+    на тип. Внутри транзакции записи приращение откатывается вместе с ней;
+    пакетная вставка оповещает уже после своей транзакции, и расхождение
+    после сбоя между ними исправляет manage.py reconcile_type_stats.
+    """
+    for type_id, (active, deleted) in deltas.items():
+        if not active and not deleted:
+            continue
+        updated = EquipmentTypeStats.objects.filter(pk=type_id).update(
+            active_count=F('active_count') + active,
+            deleted_count=F('deleted_count') + deleted,
+        )
+        if not updated:
+            # Строки статистики нет (тип создан до ее появления): считаем по данным
+            recount_types([type_id])
+
+
+def _chunks(ids, chunk_size=None):
+    # equipment/bulk.py импортирует сигналы, а они - этот модуль, поэтому не bulk.chunked
+    ids = list(ids)
+    chunk_size = chunk_size or getattr(settings, 'BULK_CHUNK_SIZE', 1000)
+    for start in range(0, len(ids), chunk_size):
+        yield ids[start:start + chunk_size]
+
+
+def _add(deltas, type_id, active, deleted):
+    current_active, current_deleted = deltas.get(type_id, (0, 0))
+    deltas[type_id] = (current_active + active, current_deleted + deleted)
+
+
+def record_created(ids, chunk_size=None):
+    """Созданы записи ids: +1 к действующим или удаленным по их состоянию."""
+    deltas = {}
+    for chunk in _chunks(ids, chunk_size):
+        rows = (Equipment.objects.filter(pk__in=chunk)
+                .values_list('equipment_type_id', 'is_deleted').annotate(total=Count('id')).order_by())
+        for type_id, is_deleted, total in rows:
+            _add(deltas, type_id, 0 if is_deleted else total, total if is_deleted else 0)
+    apply_deltas(deltas)
+
+
+def record_deleted(ids, is_deleted=True, chunk_size=None):
+    """Записи ids мягко удалены (is_deleted=True) или восстановлены (False)."""
+    sign = 1 if is_deleted else -1
+    deltas = {}
+    for chunk in _chunks(ids, chunk_size):
+        rows = (Equipment.objects.filter(pk__in=chunk)
+                .values_list('equipment_type_id').annotate(total=Count('id')).order_by())
+        for type_id, total in rows:
+            _add(deltas, type_id, -sign * total, sign * total)
+    apply_deltas(deltas)
+
+
+def record_moved(before, after):
+    """Запись сменила (тип, удалена) с before на after (save() с другим типом или флагом)."""
+    deltas = {}
+    for (type_id, is_deleted), sign in ((before, -1), (after, 1)):
+        _add(deltas, type_id, 0 if is_deleted else sign, sign if is_deleted else 0)
+    apply_deltas(deltas)
+
+
+def record_removed(type_id, is_deleted):
+    """Запись удалена из таблицы совсем (не мягко)."""
+    apply_deltas({type_id: (0, -1) if is_deleted else (-1, 0)})
+
+
+def count_type(type_id):
+    """Фактические (действующих, удаленных) у типа по основной таблице и архиву."""
+    active = deleted = 0
+    rows = (Equipment.objects.filter(equipment_type_id=type_id)
+            .values_list('is_deleted').annotate(total=Count('id')).order_by())
+    for is_deleted, total in rows:
+        if is_deleted:
+            deleted += total
+        else:
+            active += total
+    deleted += ArchivedEquipment.objects.filter(equipment_type_id=type_id).count()
+    return active, deleted
+
+
+def recount_types(type_ids=None, dry_run=False):
+    """
+    Сверка статистики типов (всех или type_ids) с данными. Каждый тип
+    пересчитывается в своей транзакции под блокировкой строки статистики:
+    параллельная запись ждет ее и прибавит свое приращение уже к новому значению.
+    Возвращает {тип: (было, стало)} по расхождениям; было - None, если строки
+    не было. dry_run - только найти расхождения.
+    """
+    types = EquipmentType.objects.order_by('pk')
+    if type_ids is not None:
+        types = types.filter(pk__in=type_ids)
+    differences = {}
+    for type_id in types.values_list('pk', flat=True):
+        with transaction.atomic():
+            stored = (EquipmentTypeStats.objects.select_for_update().filter(pk=type_id)
+                      .values_list('active_count', 'deleted_count').first())
+            actual = count_type(type_id)
+            if stored == actual:
+                continue
+            differences[type_id] = (stored, actual)
+            if not dry_run:
+                EquipmentTypeStats.objects.update_or_create(
+                    equipment_type_id=type_id,
+                    defaults={'active_count': actual[0], 'deleted_count': actual[1]},
+                )
+    return differences
+
+
+def get_type_stats(type_ids):
+    """{тип: (действующих, удаленных)} одним запросом; типов без статистики нет в ответе."""
+    return {
+        type_id: (active, deleted)
+        for type_id, active, deleted in EquipmentTypeStats.objects.filter(pk__in=type_ids)
+        .values_list('pk', 'active_count', 'deleted_count')
+    }
+
+
+async def aget_type_stats(type_ids):
+    """get_type_stats() для async-представлений."""
+    return {
+        type_id: (active, deleted)
+        async for type_id, active, deleted in EquipmentTypeStats.objects.filter(pk__in=type_ids)
+        .values_list('pk', 'active_count', 'deleted_count')
+    }
@@ -1,3 +1,1467 @@
-from django.test import TestCase
+import configparser
+import csv
+import gzip
+import json
+import os
+import re
+import runpy
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, OperationalError, connection
+from django.db.models import Q, QuerySet
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.db.pool import ConnectionPool
+
+from .archive import archive_deleted_equipment
+from .authentication import AUTH_MODE_STATELESS, AUTH_MODES, EquipmentTokenObtainPairSerializer
+from .bulk import RESULT_INVALID, create_equipment_items, undelete_equipment, update_equipment_items
+from .changes import prune_changes, record_changes
+from .checks import check_shared_versions
+from .compression import GZIP, choose_encoding
+from .datagen import scrambled_serial_numbers
+from .management.commands.bench_api import compare_reports
+from .importing import EquipmentImporter
+from .jobs import claim_chunk, process_chunk, run_worker
+from .masks import (
+    MaskValidatorCache, get_validator, mask_to_regex, partition_serial_numbers, shutdown_pool, validator_cache,
+)
+from .metrics import registry as metrics_registry
+from .models import ArchivedEquipment, Equipment, EquipmentChange, EquipmentRecord, EquipmentType, ImportJob, ImportJobChunk
+from .ranges import find_free_indexes, get_space
+from .records import RecordQuerySet
+from .registry import type_registry
+from .serializers import EquipmentListSerializer, EquipmentTypeSerializer
+from .spa import INDEX, write_build
+from .stats import recount_types
+from .views import EquipmentTypeViewSet, EquipmentViewSet
+
+
+def query_sql(queryset):
+    if isinstance(queryset, RecordQuerySet):
+        return queryset.sql_with_params()
+    return queryset.query.sql_with_params()
+
+
+def ordered_by_pk(queryset):
+    order_by = queryset.ordering if isinstance(queryset, RecordQuerySet) else queryset.query.order_by
+    return bool(order_by) and order_by[0].lstrip('-') in ('id', 'pk')
+
+
+def full_table_scans(queryset, table):
+    """
+    Полные просмотры таблицы table в плане запроса: строки плана, в которых
+    таблица читается целиком без индекса. Поддерживаются SQLite, MySQL и PostgreSQL.
+    """
+    sql, params = query_sql(queryset)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            rows = [(parent, detail) for _, parent, _, detail in cursor.fetchall()]
+            # "SCAN t" - чтение по rowid; при сортировке по id с LIMIT это обход
+            # первичного ключа в нужном порядке (в MySQL - type=index по PRIMARY),
+            # если на том же уровне плана нет сортировки TEMP B-TREE. Уровни - это
+            # и ветви UNION ALL у EquipmentRecord (equipment/records.py)
+            sorted_levels = {parent for parent, detail in rows if 'TEMP B-TREE' in detail}
+            pk_walk = ordered_by_pk(queryset)
+            return [
+                detail for parent, detail in rows
+                if re.match(rf"SCAN {table}$", detail) and not (pk_walk and parent not in sorted_levels)
+            ]
+        if connection.vendor == 'mysql':
+            cursor.execute("EXPLAIN " + sql, params)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return [row for row in rows if row['table'] == table and row['type'] == 'ALL']
+        if connection.vendor == 'postgresql':
+            # На маленькой тестовой таблице планировщик выбрал бы Seq Scan и при
+            # наличии индекса; с запретом Seq Scan остается только там, где индекса нет
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN " + sql, params)
+            return [row[0] for row in cursor.fetchall() if f"Seq Scan on {table}" in row[0]]
+    return []
+
+
+class ListQueryPlanTest(TestCase):
+    """
+    Все сочетания фильтров и сортировок списков должны читать таблицу
+    оборудования через индекс, а не полным просмотром.
+    """
+    page_size = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.types = [
+            EquipmentType.objects.create(name=f"TP-Link {i}", serial_number_mask='XXAAAAAXAA')
+            for i in range(5)
+        ]
+        Equipment.objects.bulk_create([
+            Equipment(
+                equipment_type=cls.types[i % len(cls.types)],
+                serial_number=f"{i:03d}ABCDEFG",
+                note=f"Стеллаж {i}",
+                is_deleted=i % 7 == 0,
+            )
+            for i in range(500)
+        ])
+        # Статистика таблиц, как на рабочей базе: типов мало, оборудования много
+        statement = "ANALYZE TABLE {}" if connection.vendor == 'mysql' else "ANALYZE {}"
+        with connection.cursor() as cursor:
+            for model in (Equipment, EquipmentType):
+                cursor.execute(statement.format(connection.ops.quote_name(model._meta.db_table)))
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+
+    def list_queryset(self, viewset, params):
+        request = Request(self.factory.get('/', params))
+        view = viewset(request=request, action='list', format_kwarg=None, kwargs={}, args=())
+        queryset = view.filter_queryset(view.get_queryset())
+        if not isinstance(queryset, (QuerySet, RecordQuerySet)):
+            # Список типов без фильтров отдается из реестра в памяти, без запроса
+            return None
+        return queryset[:self.page_size]
+
+    def assert_uses_indexes(self, viewset, table, filters, orderings):
+        for params in filters:
+            for ordering in orderings:
+                query_params = dict(params)
+                if ordering:
+                    query_params['ordering'] = ordering
+                with self.subTest(params=query_params):
+                    queryset = self.list_queryset(viewset, query_params)
+                    if queryset is not None:
+                        self.assertEqual(full_table_scans(queryset, table), [], query_sql(queryset)[0])
+
+    def test_equipment_list(self):
+        equipment_type = self.types[0]
+        filters = [
+            {},
+            {'equipment_type__id': equipment_type.pk},
+            {'equipment_type__name': equipment_type.name},
+            {'equipment_type__name__icontains': 'link'},
+            {'serial_number': '012ABCDEFG'},
+            {'serial_number__istartswith': '012AB'},
+            {'serial_number__icontains': 'ABCDE'},
+            {'note__icontains': 'Стеллаж 1'},
+            {'search': 'ABCDE'},
+            {'is_deleted': 'true'},
+            {'equipment_type__id': equipment_type.pk, 'serial_number': '010ABCDEFG'},
+        ]
+        orderings = [None, 'id', '-id', 'serial_number', '-serial_number', 'equipment_type__name']
+        self.assert_uses_indexes(EquipmentViewSet, Equipment._meta.db_table, filters, orderings)
+
+    def test_equipment_type_list(self):
+        filters = [
+            {'id': self.types[0].pk},
+            {'name': self.types[0].name},
+        ]
+        orderings = [None, 'id', 'name', '-name']
+        self.assert_uses_indexes(EquipmentTypeViewSet, EquipmentType._meta.db_table, filters, orderings)
+        self.assert_uses_indexes(EquipmentTypeViewSet, EquipmentType._meta.db_table, [{}], orderings[1:])
+
+
+class APITestCase(TestCase):
+    """Запросы к API от имени пользователя без выпуска токена."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('operator', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Откат транзакции теста не меняет счетчик версий: снимок прошлого теста устарел
+        type_registry.invalidate()
+
+
+class MaskValidatorTest(TestCase):
+    """Скомпилированные валидаторы масок и их кэш."""
+
+    def test_regex(self):
+        self.assertEqual(mask_to_regex('NNNNaZ'), r'\d{4}[a-z][-_@]')
+        self.assertEqual(mask_to_regex('XXAAAAAXAA'), r'[A-Z0-9]{2}[A-Z]{5}[A-Z0-9][A-Z]{2}')
+        with self.assertRaises(ValueError):
+            mask_to_regex('NB')
+
+    def test_validate(self):
+        validator = get_validator('NNNNaZ')
+        cases = {'0123a-': True, '0123z@': True, '0123A-': False, '0123a-x': False, '012a-': False, '': False}
+        for serial_number, valid in cases.items():
+            with self.subTest(serial_number=serial_number):
+                self.assertEqual(validator.is_valid(serial_number), valid)
+                self.assertEqual(Equipment.validate_serial_number_by_mask(serial_number, 'NNNNaZ'), valid)
+        serial_numbers = list(cases)
+        self.assertEqual(validator.validate_many(serial_numbers), list(cases.values()))
+        self.assertEqual(
+            validator.partition(serial_numbers),
+            ([sn for sn, valid in cases.items() if valid], [sn for sn, valid in cases.items() if not valid])
+        )
+
+    def test_cache(self):
+        self.assertIs(get_validator('NNNN'), get_validator('NNNN'))
+        bounded = MaskValidatorCache(maxsize=2)
+        first = bounded.get('N')
+        bounded.get('NN')
+        bounded.get('N')
+        bounded.get('NNN')
+        # Вытесняется давно не использованная маска
+        self.assertEqual(len(bounded), 2)
+        self.assertIs(bounded.get('N'), first)
+        self.assertEqual(len(bounded), 2)
+
+    def test_mask_change_drops_validator(self):
+        equipment_type = EquipmentType.objects.create(name='TP-Link', serial_number_mask='NNNNNa')
+        old = equipment_type.get_mask_validator()
+        equipment_type.serial_number_mask = 'NNNNNA'
+        equipment_type.save()
+        self.assertNotIn('NNNNNa', validator_cache)
+        self.assertTrue(equipment_type.get_mask_validator().is_valid('12345A'))
+        self.assertIsNot(get_validator('NNNNNa'), old)
+
+        equipment_type.delete()
+        self.assertNotIn('NNNNNA', validator_cache)
+
+
+class ParallelValidationTest(TestCase):
+    """Проверка больших пакетов в пуле процессов дает тот же результат, что в процессе."""
+
+    def setUp(self):
+        self.validator = get_validator('NNNNaZ')
+        self.serial_numbers = [f"{i:04d}{'a' if i % 3 else 'A'}-" for i in range(50)] + ['bad', '0000a-']
+
+    def test_below_threshold_in_process(self):
+        with mock.patch('equipment.masks._get_pool') as get_pool:
+            result = partition_serial_numbers(self.validator, self.serial_numbers, workers=4, threshold=1000)
+            self.assertEqual(result, self.validator.partition(self.serial_numbers))
+            partition_serial_numbers(self.validator, self.serial_numbers, workers=1, threshold=1)
+        get_pool.assert_not_called()
+
+    def test_pool_keeps_order(self):
+        self.addCleanup(shutdown_pool)
+        for workers in (2, 3):
+            with self.subTest(workers=workers):
+                self.assertEqual(
+                    partition_serial_numbers(self.validator, self.serial_numbers, workers=workers, threshold=1),
+                    self.validator.partition(self.serial_numbers)
+                )
+
+    @override_settings(VALIDATION_PARALLEL_THRESHOLD=1, VALIDATION_WORKERS=2)
+    def test_create_errors_in_input_order(self):
+        self.addCleanup(shutdown_pool)
+        equipment_type = EquipmentType.objects.create(name='D-Link', serial_number_mask='NNNNaZ')
+        created, errors = create_equipment_items(equipment_type, [(sn, None) for sn in self.serial_numbers])
+        expected_invalid = self.validator.partition(self.serial_numbers)[1]
+        self.assertEqual([error['serial_number'] for _, error in errors[:len(expected_invalid)]], expected_invalid)
+        self.assertEqual([position for position, _ in errors], sorted(position for position, _ in errors))
+        self.assertEqual(len(created), len(self.serial_numbers) - len(errors))
+
+
+class TypeRegistryTest(APITestCase):
+    """Тип, которого нет в реестре процесса, ищется в БД."""
+
+    def create_type_elsewhere(self):
+        # bulk_create без сигналов: как тип, созданный другим процессом при
+        # локальном кэше, - счетчик версий в этом процессе не меняется
+        type_registry.all()
+        EquipmentType.objects.bulk_create([EquipmentType(name='D-Link', serial_number_mask='NNNNaZ')])
+        return EquipmentType.objects.get(name='D-Link')
+
+    def test_create_with_type_from_other_process(self):
+        equipment_type = self.create_type_elsewhere()
+        response = self.client.post('/api/equipment/', {
+            'equipment_type_id': equipment_type.pk, 'serial_numbers': ['1234a-'],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertTrue(Equipment.objects.filter(equipment_type=equipment_type, serial_number='1234a-').exists())
+
+    def test_import_with_type_from_other_process(self):
+        equipment_type = self.create_type_elsewhere()
+        created, errors = EquipmentImporter().process_chunk([
+            (1, {'equipment_type_id': equipment_type.pk, 'serial_number': '1234a-'}),
+        ])
+        self.assertEqual((created, errors), (1, []))
+
+    def test_missing_type_is_row_error(self):
+        equipment_type = EquipmentType.objects.create(name='D-Link', serial_number_mask='NNNNaZ')
+        active = Equipment.objects.create(equipment_type=equipment_type, serial_number='1234a-')
+        deleted = Equipment.objects.create(equipment_type=equipment_type, serial_number='1235a-', is_deleted=True)
+        # Тип удален из реестра и из БД между чтением записей и проверкой
+        with mock.patch.object(type_registry, 'get', return_value=None):
+            updated = update_equipment_items([(active.pk, {'serial_number': '9999a-'})])
+            undeleted = undelete_equipment([deleted.pk])
+        self.assertEqual(updated[0]['status'], RESULT_INVALID)
+        self.assertEqual(undeleted[0]['status'], RESULT_INVALID)
+
+
+class TypeStatsTest(APITestCase):
+    """Счетчики действующих и удаленных записей типа (EquipmentTypeStats)."""
+
+    def setUp(self):
+        super().setUp()
+        self.equipment_type = EquipmentType.objects.create(name='D-Link', serial_number_mask='NNNNaZ')
+
+    def get_counts(self):
+        response = self.client.get(f'/api/equipment-type/{self.equipment_type.pk}/')
+        return response.data['active_count'], response.data['deleted_count']
+
+    def test_counts_follow_changes(self):
+        self.client.post('/api/equipment/', {
+            'equipment_type_id': self.equipment_type.pk, 'serial_numbers': ['1234a-', '1235a-', '1236a-'],
+        }, format='json')
+        self.assertEqual(self.get_counts(), (3, 0))
+        first, second, _ = Equipment.objects.filter(equipment_type=self.equipment_type).order_by('pk')
+        self.client.delete(f'/api/equipment/{first.pk}/')
+        self.client.post('/api/equipment/bulk-delete/', {'ids': [second.pk]}, format='json')
+        self.assertEqual(self.get_counts(), (1, 2))
+        self.client.post('/api/equipment/bulk-undelete/', {'ids': [first.pk, second.pk]}, format='json')
+        self.assertEqual(self.get_counts(), (3, 0))
+        self.assertEqual(recount_types([self.equipment_type.pk], dry_run=True), {})
+
+    def test_concurrent_soft_delete_counts_once(self):
+        equipment = Equipment.objects.create(equipment_type=self.equipment_type, serial_number='1234a-')
+        Equipment.objects.create(equipment_type=self.equipment_type, serial_number='1235a-')
+        # Два запроса прочитали запись до удаления
+        first, second = Equipment.objects.get(pk=equipment.pk), Equipment.objects.get(pk=equipment.pk)
+        self.assertTrue(first.soft_delete())
+        self.assertFalse(second.soft_delete())
+        self.assertEqual(self.get_counts(), (1, 1))
+
+    def test_destroy_type_with_deleted_equipment(self):
+        equipment = Equipment.objects.create(equipment_type=self.equipment_type, serial_number='1234a-')
+        equipment.soft_delete()
+        response = self.client.delete(f'/api/equipment-type/{self.equipment_type.pk}/')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(EquipmentType.objects.filter(pk=self.equipment_type.pk).exists())
+
+
+class BulkCreateTest(APITestCase):
+    """Пакетная вставка и ее журнал изменений фиксируются одной транзакцией."""
+
+    def setUp(self):
+        super().setUp()
+        self.equipment_type = EquipmentType.objects.create(name='TP-Link', serial_number_mask='XXAAAAAXAA')
+        self.items = [(f"{i}AABCDE1FG", None) for i in range(5)]
+
+    def test_changes_recorded(self):
+        created, errors = create_equipment_items(self.equipment_type, self.items, chunk_size=2)
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            sorted(EquipmentChange.objects.filter(action='create').values_list('equipment_id', flat=True)),
+            sorted(obj.pk for obj in created)
+        )
+
+    def test_failed_notification_rolls_back_chunk(self):
+        with mock.patch('equipment.bulk.notify_equipment_changed', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                create_equipment_items(self.equipment_type, self.items)
+        self.assertFalse(Equipment.objects.exists())
+
+    def post(self, serial_numbers):
+        return self.client.post('/api/equipment/', {
+            'equipment_type_id': self.equipment_type.pk, 'serial_numbers': serial_numbers, 'note': 'Склад 1',
+        }, format='json')
+
+    def test_create_statuses(self):
+        """201 - все созданы, 207 - часть с ошибками, 400 - ни одной созданной."""
+        response = self.post(['0AABCDE1FG', '1AABCDE1FG'])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(
+            [(item['serial_number'], item['note'], item['equipment_type']['id']) for item in response.data['created_equipment']],
+            [('0AABCDE1FG', 'Склад 1', self.equipment_type.pk), ('1AABCDE1FG', 'Склад 1', self.equipment_type.pk)]
+        )
+
+        response = self.post(['2AABCDE1FG', '0AABCDE1FG', 'bad'])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([item['serial_number'] for item in response.data['created_equipment']], ['2AABCDE1FG'])
+        self.assertEqual([error['serial_number'] for error in response.data['errors']], ['0AABCDE1FG', 'bad'])
+
+        response = self.post(['1AABCDE1FG', 'bad'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created_equipment'], [])
+        self.assertEqual(len(response.data['errors']), 2)
+        self.assertEqual(Equipment.objects.count(), 3)
+
+    def test_insert_one_by_one_after_race(self):
+        """Номер, занятый между проверкой и вставкой: часть вставляется поштучно, остальные создаются."""
+        Equipment.objects.create(equipment_type=self.equipment_type, serial_number='2AABCDE1FG')
+        with mock.patch('equipment.bulk.find_existing_serial_numbers', return_value=set()):
+            with self.captureOnCommitCallbacks(execute=True):
+                created, errors = create_equipment_items(self.equipment_type, self.items)
+        self.assertEqual(sorted(obj.serial_number for obj in created), ['0AABCDE1FG', '1AABCDE1FG', '3AABCDE1FG', '4AABCDE1FG'])
+        self.assertEqual([(position, error['serial_number']) for position, error in errors], [(2, '2AABCDE1FG')])
+        self.assertEqual(Equipment.objects.filter(serial_number='2AABCDE1FG').count(), 1)
+        self.assertEqual(
+            set(EquipmentChange.objects.filter(action='create').values_list('equipment_id', flat=True)),
+            {obj.pk for obj in created} | set(Equipment.objects.filter(serial_number='2AABCDE1FG').values_list('pk', flat=True))
+        )
+
+
+class ExportTest(APITestCase):
+    """Выгрузка частями: все строки по одному разу, в порядке id, с заголовком CSV."""
+
+    def setUp(self):
+        super().setUp()
+        self.equipment_type = EquipmentType.objects.create(name='TP-Link', serial_number_mask='XXAAAAAXAA')
+        other_type = EquipmentType.objects.create(name='D-Link', serial_number_mask='XXAAAAAXAA')
+        Equipment.objects.bulk_create([
+            Equipment(equipment_type=other_type if i == 3 else self.equipment_type,
+                      serial_number=f"{i}AABCDE1FG", note=f"Склад {i}")
+            for i in range(8)
+        ])
+        self.ids = list(
+            Equipment.objects.filter(equipment_type=self.equipment_type).order_by('pk').values_list('pk', flat=True)
+        )
+
+    @override_settings(BULK_CHUNK_SIZE=3)
+    def test_csv_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/equipment/export/', {'equipment_type__id': self.equipment_type.pk})
+            rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(
+            rows[0], ['id', 'equipment_type_id', 'equipment_type_name', 'serial_number', 'note', 'is_deleted']
+        )
+        self.assertEqual(len(self.ids), 7)
+        self.assertEqual([int(row[0]) for row in rows[1:]], self.ids)
+        self.assertEqual(
+            rows[1][1:],
+            [str(self.equipment_type.pk), 'TP-Link', '0AABCDE1FG', 'Склад 0', 'false']
+        )
+        # 7 строк частями по 3: три запроса за строками
+        self.assertEqual(sum('equipment_equipment' in query['sql'] for query in queries.captured_queries), 3)
+
+
+class LeanListTest(APITestCase):
+    """Быстрый путь списка (equipment/lean.py) отдает то же, что сериализатор."""
+
+    def setUp(self):
+        super().setUp()
+        self.types = [
+            EquipmentType.objects.create(name=name, serial_number_mask='XXAAAAAXAA') for name in ('TP-Link', 'D-Link')
+        ]
+        Equipment.objects.bulk_create([
+            Equipment(equipment_type=self.types[i % 2], serial_number=f"{i}AABCDE1FG", note=None if i == 1 else f"Склад {i}")
+            for i in range(5)
+        ])
+        self.queryset = Equipment.objects.select_related('equipment_type').order_by('pk')
+
+    def test_matches_serializer(self):
+        response = self.client.get('/api/equipment/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content)['results'],
+            json.loads(json.dumps(EquipmentListSerializer(self.queryset, many=True).data))
+        )
+
+    def test_fields(self):
+        response = self.client.get('/api/equipment/', {'fields': 'serial_number, id'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data['results'],
+            [{'id': item.pk, 'serial_number': item.serial_number} for item in self.queryset]
+        )
+
+        for fields in ('bogus', 'id,bogus', ',', 'equipment_type_id'):
+            with self.subTest(fields=fields):
+                response = self.client.get('/api/equipment/', {'fields': fields})
+                self.assertEqual(response.status_code, 400)
+
+    def test_normalized_shape(self):
+        response = self.client.get('/api/equipment/', {'shape': 'normalized'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row['equipment_type'] for row in response.data['results']],
+            [item.equipment_type_id for item in self.queryset]
+        )
+        self.assertEqual(
+            response.data['equipment_types'],
+            EquipmentTypeSerializer(sorted(self.types, key=lambda item: item.pk), many=True).data
+        )
+        self.assertEqual(self.client.get('/api/equipment/', {'shape': 'flat'}).status_code, 400)
+
+
+class DatabaseSettingsTest(TestCase):
+    """DATABASES из settings.ini: SQLite, MySQL без пула и с пулом соединений."""
+
+    def load_settings(self, **sections):
+        config = configparser.ConfigParser()
+        config.read(settings.BASE_DIR / 'settings.ini')
+        for section, values in sections.items():
+            config[section].update(values)
+        ini = StringIO()
+        config.write(ini)
+
+        def read(parser, filenames, encoding=None):
+            parser.read_string(ini.getvalue())
+            return [filenames]
+
+        with mock.patch('configparser.ConfigParser.read', read):
+            return runpy.run_path(str(settings.BASE_DIR / 'core' / 'settings.py'))['DATABASES']['default']
+
+    def test_sqlite(self):
+        database = self.load_settings(Database={'engine': 'sqlite', 'sqlite_path': 'bench.sqlite3'})
+        self.assertEqual(database['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(database['NAME'], settings.BASE_DIR / 'bench.sqlite3')
+
+    def test_mysql_persistent(self):
+        database = self.load_settings(
+            Database={'engine': 'mysql'},
+            **{'MySQL Database': {'conn_max_age': '60', 'health_checks': 'true', 'pool_size': '0'}},
+        )
+        self.assertEqual(database['ENGINE'], 'django.db.backends.mysql')
+        self.assertEqual((database['CONN_MAX_AGE'], database['CONN_HEALTH_CHECKS']), (60, True))
+        self.assertNotIn('pool', database['OPTIONS'])
+
+    def test_mysql_pool(self):
+        database = self.load_settings(
+            Database={'engine': 'mysql'},
+            **{'MySQL Database': {'conn_max_age': '60', 'health_checks': 'true', 'pool_size': '8', 'pool_timeout': '2.5'}},
+        )
+        self.assertEqual(database['ENGINE'], 'core.db.mysql')
+        # Соединение возвращается в пул в конце запроса, время жизни ограничивает пул
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(
+            database['OPTIONS']['pool'], {'size': 8, 'timeout': 2.5, 'max_age': 60, 'health_checks': True}
+        )
+        self.assertEqual(database['OPTIONS']['init_command'], "SET sql_mode='STRICT_TRANS_TABLES'")
+
+
+class ConnectionPoolTest(TestCase):
+    """Пул соединений процесса (core/db/pool.py) на поддельных соединениях."""
+
+    class FakeConnection:
+        def __init__(self):
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    def test_reuse(self):
+        pool = ConnectionPool(size=2)
+        first = pool.acquire(self.FakeConnection, lambda connection: True)
+        pool.release(first)
+        self.assertIs(pool.acquire(self.FakeConnection, lambda connection: True), first)
+        self.assertEqual(pool.created, 1)
+
+    def test_size_limit(self):
+        pool = ConnectionPool(size=1, timeout=0.01)
+        connection = pool.acquire(self.FakeConnection, lambda connection: True)
+        with self.assertRaises(OperationalError):
+            pool.acquire(self.FakeConnection, lambda connection: True)
+        # Соединение после ошибки закрывается и освобождает место
+        pool.release(connection, reusable=False)
+        self.assertTrue(connection.closed)
+        self.assertIsNot(pool.acquire(self.FakeConnection, lambda connection: True), connection)
+
+    def test_health_checks(self):
+        pool = ConnectionPool(size=1, health_checks=True)
+        broken = pool.acquire(self.FakeConnection, lambda connection: True)
+        pool.release(broken)
+        fresh = pool.acquire(self.FakeConnection, lambda connection: connection is not broken)
+        self.assertIsNot(fresh, broken)
+        self.assertTrue(broken.closed)
+
+    def test_max_age(self):
+        pool = ConnectionPool(size=1, max_age=0)
+        old = pool.acquire(self.FakeConnection, lambda connection: True)
+        pool.release(old)
+        self.assertTrue(old.closed)
+        self.assertIsNot(pool.acquire(self.FakeConnection, lambda connection: True), old)
+
+
+class BenchmarkToolsTest(TestCase):
+    """Генератор синтетических данных и бенчмарк API (manage.py generate_equipment, bench_api)."""
+
+    def generate(self, count):
+        call_command('generate_equipment', '--count', str(count), '--types', '3', '--batch-size', '40',
+                     '--seed', '7', stdout=StringIO())
+
+    def test_generate_appends_valid_serials(self):
+        self.generate(200)
+        self.generate(100)
+        types = list(EquipmentType.objects.filter(name__startswith='bench-').order_by('name'))
+        self.assertEqual([equipment_type.name for equipment_type in types], ['bench-001', 'bench-002', 'bench-003'])
+        self.assertEqual(Equipment.objects.count(), 300)
+        for equipment_type in types:
+            serial_numbers = list(Equipment.objects.filter(equipment_type=equipment_type).values_list('serial_number', flat=True))
+            validator = equipment_type.get_mask_validator()
+            self.assertTrue(all(validator.validate_many(serial_numbers)), equipment_type.serial_number_mask)
+            self.assertEqual(len(set(serial_numbers)), len(serial_numbers))
+        # Статистика типов пересчитана после bulk_create
+        self.assertEqual(recount_types(dry_run=True), {})
+
+    def test_scrambled_sequence_continues(self):
+        first = scrambled_serial_numbers('NNNaZ', 0, 50)
+        self.assertEqual(first[30:], scrambled_serial_numbers('NNNaZ', 30, 20))
+        self.assertEqual(len(set(scrambled_serial_numbers('NNNaZ', 0, 1000 * 26 * 3))), 1000 * 26 * 3)
+
+    def test_bench_api(self):
+        user = get_user_model().objects.create_user('bench', password='secret')
+        self.generate(60)
+        before = list(Equipment.objects.order_by('pk').values_list('pk', 'note', 'is_deleted'))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.json')
+            stdout = StringIO()
+            call_command('bench_api', '--username', user.username, '--repeat', '2', '--warmup', '0',
+                         '--create-batch', '5', '--bulk-size', '5', '--cases', 'list,search,update,bulk_delete',
+                         '--output', path, '--json', stdout=stdout)
+            with open(path, encoding='utf-8') as f:
+                saved = json.load(f)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(saved['results'], report['results'])
+        self.assertEqual([result['case'] for result in report['results']], ['list', 'search', 'update', 'bulk_delete'])
+        self.assertTrue(all(result['status'] < 400 and result['queries'] > 0 for result in report['results']))
+        self.assertEqual(report['environment']['equipment'], 60)
+        # Изменяющие сценарии откатываются
+        self.assertEqual(list(Equipment.objects.order_by('pk').values_list('pk', 'note', 'is_deleted')), before)
+
+    def test_compare_reports(self):
+        baseline = {'results': [
+            {'case': 'list', 'p50_ms': 10.0, 'queries': 3},
+            {'case': 'search', 'p50_ms': 10.0, 'queries': 3},
+            {'case': 'retrieve', 'p50_ms': 10.0, 'queries': 2},
+        ]}
+        current = {'results': [
+            {'case': 'list', 'p50_ms': 11.0, 'queries': 3},
+            {'case': 'search', 'p50_ms': 13.0, 'queries': 3},
+            {'case': 'retrieve', 'p50_ms': 9.0, 'queries': 3},
+            {'case': 'update', 'p50_ms': 5.0, 'queries': 4},
+        ]}
+        rows = {row['case']: row for row in compare_reports(baseline, current, threshold=20)}
+        self.assertEqual(
+            {case: row['regression'] for case, row in rows.items()},
+            {'list': False, 'search': True, 'retrieve': True}
+        )
+        self.assertEqual(rows['search']['p50_change_pct'], 30.0)
+
+
+class AuthenticationTest(TestCase):
+    """JWT-аутентификация в режимах [Auth] mode и отзыв токенов."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('operator', password='secret')
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/api/user/login/', {'username': 'operator', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def get_types(self, access):
+        return self.client.get('/api/equipment-type/', HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_modes(self):
+        tokens = self.login()
+        for mode in AUTH_MODES:
+            with self.subTest(mode=mode), override_settings(AUTH_MODE=mode):
+                self.assertEqual(self.get_types(tokens['access']).status_code, 200)
+
+    def test_stateless_does_not_read_user(self):
+        tokens = self.login()
+        self.get_types(tokens['access'])
+        with override_settings(AUTH_MODE=AUTH_MODE_STATELESS), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_types(tokens['access']).status_code, 200)
+        table = get_user_model()._meta.db_table
+        self.assertFalse([query for query in queries if table in query['sql']])
+
+    def test_revoke_command_applies_to_other_processes(self):
+        tokens = self.login()
+        call_command('revoke_tokens', 'operator', stdout=StringIO())
+        # У другого процесса с локальным кэшем отметки в кэше нет
+        cache.clear()
+        self.assertEqual(self.get_types(tokens['access']).status_code, 401)
+        response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.get_types(self.login()['access']).status_code, 200)
+
+    def test_password_change_revokes_tokens(self):
+        tokens = self.login()
+        self.user.set_password('changed')
+        self.user.save()
+        cache.clear()
+        self.assertEqual(self.get_types(tokens['access']).status_code, 401)
+
+
+class ArchiveRecordTest(APITestCase):
+    """Списки и выгрузка с is_deleted=true|all читают основную таблицу и архив."""
+
+    def setUp(self):
+        super().setUp()
+        equipment_type = EquipmentType.objects.create(name='TP-Link', serial_number_mask='XXAAAAAXAA')
+        now = timezone.now()
+        # Нечетные - действующие, i % 4 == 2 - удалены недавно, i % 4 == 0 - уходят в архив
+        Equipment.objects.bulk_create([
+            Equipment(
+                equipment_type=equipment_type, serial_number=f"{i:03d}ABCDEFG", is_deleted=i % 2 == 0,
+                deleted_at=None if i % 2 else now - timedelta(days=10 if i % 4 == 0 else 0),
+            )
+            for i in range(12)
+        ])
+        self.assertEqual(archive_deleted_equipment(now - timedelta(days=1)), 3)
+        self.serials = {item.pk: item.serial_number for item in EquipmentRecord.objects.all()}
+        self.deleted_ids = set(EquipmentRecord.objects.filter(is_deleted=True).values_list('pk', flat=True))
+
+    def export_ids(self, is_deleted):
+        response = self.client.get('/api/equipment/export/', {'output': 'ndjson', 'is_deleted': is_deleted})
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content).decode('utf-8')
+        return [json.loads(line)['id'] for line in body.splitlines()]
+
+    @override_settings(BULK_CHUNK_SIZE=2)
+    def test_export_in_chunks(self):
+        self.assertEqual(len(self.serials), 12)
+        self.assertEqual(self.export_ids('all'), sorted(self.serials))
+        self.assertEqual(self.export_ids('true'), sorted(self.deleted_ids))
+
+    def test_cursor_pages(self):
+        ids = []
+        url = '/api/equipment/'
+        params = {'pagination': 'cursor', 'page_size': 2, 'is_deleted': 'true', 'ordering': '-serial_number'}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [row['id'] for row in response.data['results']]
+            url, params = response.data['next'], None
+        self.assertEqual(ids, sorted(self.deleted_ids, key=self.serials.get, reverse=True))
+
+    def test_count(self):
+        response = self.client.get('/api/equipment/', {'is_deleted': 'all', 'count_mode': 'exact'})
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(RecordQuerySet().filter(pk__in=[]).count(), 0)
+        self.assertEqual(list(RecordQuerySet().filter(pk__in=[])), [])
+
+    def test_matches_view(self):
+        """Запрос по ветвям возвращает то же, что представление из миграции."""
+        queryset = RecordQuerySet().filter(is_deleted=True).order_by('serial_number')[1:4]
+        expected = EquipmentRecord.objects.filter(is_deleted=True).order_by('serial_number')[1:4]
+        self.assertEqual(
+            [(item.pk, item.serial_number, item.is_archived, item.deleted_at) for item in queryset],
+            [(item.pk, item.serial_number, item.is_archived, item.deleted_at) for item in expected],
+        )
+        sql, _ = queryset.sql_with_params()
+        self.assertIn('UNION ALL', sql)
+        self.assertNotIn(connection.ops.quote_name('equipment_equipment_all'), sql)
+
+    def test_filter_by_type_name(self):
+        """Фильтр и сортировка по полю типа (JOIN) применяются и к архивным записям."""
+        other_type = EquipmentType.objects.create(name='D-Link', serial_number_mask='XXAAAAAXAA')
+        archived_ids = set(EquipmentRecord.objects.filter(is_archived=True).values_list('pk', flat=True))
+        self.assertEqual(len(archived_ids), 3)
+        moved = sorted(archived_ids)[0]
+        ArchivedEquipment.objects.filter(pk=moved).update(equipment_type=other_type)
+
+        response = self.client.get('/api/equipment/', {'is_deleted': 'true', 'equipment_type__name': 'D-Link'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [moved])
+        self.assertEqual(response.data['results'][0]['equipment_type']['name'], 'D-Link')
+
+        response = self.client.get('/api/equipment/', {
+            'is_deleted': 'true', 'equipment_type__name': 'TP-Link', 'ordering': 'equipment_type__name',
+        })
+        self.assertEqual({row['id'] for row in response.data['results']}, self.deleted_ids - {moved})
+
+        response = self.client.get('/api/equipment/', {'is_deleted': 'all', 'ordering': 'equipment_type__name'})
+        self.assertEqual(response.data['results'][0]['id'], moved)
+        response = self.client.get('/api/equipment/', {
+            'is_deleted': 'all', 'ordering': 'equipment_type__name', 'pagination': 'cursor', 'page_size': 1,
+        })
+        self.assertEqual([row['id'] for row in response.data['results']], [moved])
+
+
+class ChangesFeedTest(APITestCase):
+    """Номер изменения, зафиксированного позже следующих, не теряется."""
+
+    def get_changes(self, since):
+        response = self.client.get('/api/equipment/changes/', {'since': since})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [change['seq'] for change in response.data['changes']], response.data['cursor']
+
+    def record_with_pending(self):
+        """Три изменения, среднее - как транзакция, которая еще не зафиксирована."""
+        record_changes([1, 2, 3], 'update')
+        first, pending, last = EquipmentChange.objects.order_by('pk').values_list('pk', flat=True)
+        EquipmentChange.objects.filter(pk=pending).delete()
+        return first, pending, last
+
+    def test_late_commit_read_after_cursor(self):
+        first, pending, last = self.record_with_pending()
+        seqs, cursor = self.get_changes(first - 1)
+        self.assertEqual(seqs, [first, last])
+
+        # Пока номер не зафиксирован, курсор продолжает его перечитывать
+        self.assertEqual(self.get_changes(cursor), ([], cursor))
+        EquipmentChange.objects.create(pk=pending, equipment_id=2, action='update')
+        seqs, cursor = self.get_changes(cursor)
+        self.assertEqual(seqs, [pending])
+        self.assertEqual(cursor, str(last))
+
+    @override_settings(CHANGES_GAP_TIMEOUT_SECONDS=0)
+    def test_old_gap_forgotten(self):
+        first, _, last = self.record_with_pending()
+        self.assertEqual(self.get_changes(first - 1), ([first, last], str(last)))
+
+    def test_pending_gap_timeout(self):
+        """Пропуск из курсора, не дождавшийся фиксации, требует полной синхронизации."""
+        first, _, last = self.record_with_pending()
+        _, cursor = self.get_changes(first - 1)
+        self.assertNotEqual(cursor, str(last))
+        with override_settings(CHANGES_GAP_TIMEOUT_SECONDS=0), self.assertLogs('equipment.changes', 'WARNING'):
+            response = self.client.get('/api/equipment/changes/', {'since': cursor})
+        self.assertEqual(response.status_code, 410)
+        self.assertIn('since=0', response.data['detail'])
+
+    def test_too_many_gaps(self):
+        first, _, _ = self.record_with_pending()
+        with mock.patch('equipment.changes.MAX_GAPS', 0), self.assertLogs('equipment.changes', 'WARNING'):
+            response = self.client.get('/api/equipment/changes/', {'since': first - 1})
+        self.assertEqual(response.status_code, 410)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/equipment/changes/', {'since': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_latest_change_per_equipment(self):
+        equipment_type = EquipmentType.objects.create(name='TP-Link', serial_number_mask='NNNN')
+        kept, removed = (
+            Equipment.objects.create(equipment_type=equipment_type, serial_number=serial_number)
+            for serial_number in ('0001', '0002')
+        )
+        since = EquipmentChange.objects.order_by('pk').first().pk - 1
+        self.client.patch(f'/api/equipment/{kept.pk}/', {'note': 'Склад 3'}, format='json')
+        self.client.delete(f'/api/equipment/{kept.pk}/')
+        removed_id = removed.pk
+        removed.delete()
+
+        response = self.client.get('/api/equipment/changes/', {'since': since})
+        changes = {change['id']: change for change in response.data['changes']}
+        self.assertEqual(len(response.data['changes']), 2)
+        self.assertEqual(
+            (changes[kept.pk]['action'], changes[kept.pk]['deleted'], changes[kept.pk]['equipment']['note']),
+            ('delete', True, 'Склад 3')
+        )
+        # После физического удаления состояния записи нет
+        self.assertEqual((changes[removed_id]['deleted'], changes[removed_id]['equipment']), (True, None))
+        self.assertFalse(response.data['has_more'])
+
+    def test_pruned_cursor_expired(self):
+        record_changes([1, 2, 3], 'update')
+        first = EquipmentChange.objects.order_by('pk').first().pk
+        EquipmentChange.objects.update(changed_at=timezone.now() - timedelta(days=40))
+        prune_changes(timezone.now() - timedelta(days=30))
+        response = self.client.get('/api/equipment/changes/', {'since': first})
+        self.assertEqual(response.status_code, 410)
+
+
+class GenerateTest(APITestCase):
+    """Генерация диапазона номеров по маске с пропуском занятых."""
+
+    def setUp(self):
+        super().setUp()
+        self.equipment_type = EquipmentType.objects.create(name='D-Link', serial_number_mask='NNNN')
+        Equipment.objects.bulk_create([
+            Equipment(equipment_type=self.equipment_type, serial_number=serial_number)
+            for serial_number in ('1231', '1232', '1235')
+        ])
+
+    def generate(self, **data):
+        return self.client.post('/api/equipment/generate/', {
+            'equipment_type_id': self.equipment_type.pk, 'pattern': '123*', **data,
+        }, format='json')
+
+    def test_dry_run(self):
+        response = self.generate(count=3, start='1231', dry_run=True)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data, {'serial_numbers': ['1233', '1234', '1236'], 'next_start': '1237'})
+        self.assertEqual(Equipment.objects.count(), 3)
+
+    def test_create(self):
+        response = self.generate(count=4, note='Партия 7')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 4)
+        self.assertEqual(response.data['serial_numbers'], ['1230', '1233', '1234', '1236'])
+        self.assertEqual(response.data['next_start'], '1237')
+        created = Equipment.objects.filter(pk__range=(response.data['first_id'], response.data['last_id']))
+        self.assertEqual(sorted(created.values_list('serial_number', flat=True)), response.data['serial_numbers'])
+
+    def test_exhausted(self):
+        response = self.generate(count=8)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['available'], 7)
+        self.assertEqual(Equipment.objects.count(), 3)
+
+    def test_rows_after_space_not_read(self):
+        Equipment.objects.bulk_create([
+            Equipment(equipment_type=self.equipment_type, serial_number=f"124{i}") for i in range(10)
+        ])
+        space = get_space(self.equipment_type, '123*')
+        with CaptureQueriesContext(connection) as queries:
+            free = find_free_indexes(self.equipment_type, space, 6, 10, batch_size=2)
+        self.assertEqual([space.serial_number(index) for index in free], ['1236', '1237', '1238', '1239'])
+        self.assertEqual(len(queries), 1)
+
+
+class KeysetPaginationTest(APITestCase):
+    """Курсорная пагинация: страницы без пропусков и повторов при любой сортировке."""
+
+    def setUp(self):
+        super().setUp()
+        types = [
+            EquipmentType.objects.create(name=name, serial_number_mask='NNNN')
+            for name in ('TP-Link', 'D-Link')
+        ]
+        Equipment.objects.bulk_create([
+            Equipment(equipment_type=types[i % 2], serial_number=f"{(i * 7) % 10:04d}") for i in range(10)
+        ])
+        self.items = list(Equipment.objects.select_related('equipment_type'))
+
+    def walk(self, ordering, page_size=3):
+        pages = []
+        url = '/api/equipment/'
+        params = {'pagination': 'cursor', 'page_size': page_size, 'ordering': ordering}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200, response.data)
+            self.assertNotIn('count', response.data)
+            pages.append(response.data)
+            url, params = response.data['next'], None
+        return pages
+
+    def test_orderings(self):
+        orderings = {
+            'id': lambda item: item.pk,
+            '-id': lambda item: -item.pk,
+            'serial_number': lambda item: (item.serial_number, item.pk),
+            # Одинаковые имена типа: порядок внутри - по id
+            'equipment_type__name': lambda item: (item.equipment_type.name, item.pk),
+        }
+        for ordering, key in orderings.items():
+            with self.subTest(ordering=ordering):
+                pages = self.walk(ordering)
+                ids = [row['id'] for page in pages for row in page['results']]
+                self.assertEqual(ids, [item.pk for item in sorted(self.items, key=key)])
+                self.assertEqual(len(pages), 4)
+                self.assertIsNone(pages[0]['previous'])
+
+    def test_previous(self):
+        pages = self.walk('serial_number')
+        response = self.client.get(pages[-1]['previous'])
+        self.assertEqual(response.data['results'], pages[-2]['results'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/equipment/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class CountStrategyTest(APITestCase):
+    """Способы подсчета count в постраничном списке."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.equipment_type = EquipmentType.objects.create(name='TP-Link', serial_number_mask='NNNN')
+        Equipment.objects.bulk_create([
+            Equipment(equipment_type=self.equipment_type, serial_number=f"{i:04d}") for i in range(5)
+        ])
+
+    def get_count(self, count_mode):
+        response = self.client.get('/api/equipment/', {'count_mode': count_mode})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['count'], response.data['count_mode']
+
+    def test_exact(self):
+        self.assertEqual(self.get_count('exact'), (5, 'exact'))
+
+    def test_cached_until_write(self):
+        self.assertEqual(self.get_count('cached'), (5, 'exact'))
+        self.assertEqual(self.get_count('cached'), (5, 'cached'))
+        # Запись меняет версию оборудования, и старое значение больше не читается
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/equipment/', {
+                'equipment_type_id': self.equipment_type.pk, 'serial_numbers': ['0100'],
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.get_count('cached'), (6, 'exact'))
+
+    def test_estimate_falls_back(self):
+        # SQLite не дает оценку, маленькая таблица на PostgreSQL и MySQL - ниже порога
+        self.assertEqual(self.get_count('estimate'), (5, 'exact'))
+        self.assertEqual(self.get_count('estimate'), (5, 'cached'))
+
+    @override_settings(CACHE_SINGLE_PROCESS=False)
+    def test_cached_needs_shared_versions(self):
+        # Локальный кэш: запись в другом процессе не сбросила бы значение
+        self.assertEqual(self.get_count('cached'), (5, 'exact'))
+        self.assertEqual(self.get_count('cached'), (5, 'exact'))
+
+
+@override_settings(BULK_CHUNK_SIZE=2)
+class ImportJobTest(APITestCase):
+    """Фоновый импорт: очередь частей в БД и воркер."""
+
+    def setUp(self):
+        super().setUp()
+        self.equipment_type = EquipmentType.objects.create(name='TP-Link', serial_number_mask='NNNN')
+
+    def submit(self, serial_numbers):
+        response = self.client.post('/api/import-jobs/', {
+            'equipment_type_id': self.equipment_type.pk, 'serial_numbers': serial_numbers,
+        }, format='json')
+        self.assertEqual(response.status_code, 202, response.data)
+        self.assertEqual(response.data['status'], ImportJob.STATUS_PENDING)
+        return response.data['id']
+
+    def test_worker_processes_job(self):
+        job_id = self.submit(['0001', '0002', 'bad!', '0001', '0003'])
+        self.assertEqual(ImportJobChunk.objects.filter(job_id=job_id).count(), 3)
+        self.assertEqual(run_worker(worker_id='w1', once=True), 3)
+
+        job = self.client.get(f'/api/import-jobs/{job_id}/').data
+        self.assertEqual(job['status'], ImportJob.STATUS_DONE)
+        self.assertEqual(
+            (job['total_rows'], job['processed_rows'], job['created_count'], job['error_count']), (5, 5, 3, 2)
+        )
+        errors = self.client.get(f'/api/import-jobs/{job_id}/errors/').data['results']
+        self.assertEqual([(error['line'], error['serial_number']) for error in errors], [(3, 'bad!'), (4, '0001')])
+        self.assertEqual(sorted(Equipment.objects.values_list('serial_number', flat=True)), ['0001', '0002', '0003'])
+
+    def test_expired_lease_taken_over(self):
+        job_id = self.submit(['0001'])
+        chunk = claim_chunk('w1')
+        self.assertIsNone(claim_chunk('w2'))
+        # Воркер w1 "завис": аренда истекла, часть забирает w2
+        ImportJobChunk.objects.filter(pk=chunk.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        taken_over = claim_chunk('w2')
+        self.assertEqual(taken_over.pk, chunk.pk)
+        self.assertFalse(process_chunk(chunk, 'w1'))
+        self.assertTrue(process_chunk(taken_over, 'w2'))
+        self.assertEqual(ImportJob.objects.get(pk=job_id).created_count, 1)
+
+    @override_settings(IMPORT_JOB_MAX_ATTEMPTS=2)
+    def test_failing_chunk_retried_then_failed(self):
+        job_id = self.submit(['0001'])
+        with mock.patch.object(EquipmentImporter, 'process_chunk', side_effect=RuntimeError("сбой")) as process, \
+                self.assertLogs('equipment.jobs', level='ERROR') as logs:
+            self.assertEqual(run_worker(worker_id='w1', once=True), 0)
+        self.assertEqual(process.call_count, 2)
+        self.assertEqual(len(logs.records), 2)
+        chunk = ImportJobChunk.objects.get(job_id=job_id)
+        self.assertEqual((chunk.status, chunk.attempts, chunk.last_error), (ImportJobChunk.STATUS_FAILED, 2, "сбой"))
+        self.assertEqual(ImportJob.objects.get(pk=job_id).status, ImportJob.STATUS_FAILED)
+        self.assertFalse(Equipment.objects.exists())
+
+    def test_stream_not_utf8(self):
+        body = f"equipment_type_id,serial_number\r\n{self.equipment_type.pk},0001\r\n".encode() + b'1,\xff\r\n'
+        response = self.client.post('/api/import-jobs/', data=body, content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['line'], 3)
+        self.assertFalse(ImportJob.objects.exists())
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class ConditionalGetTest(APITestCase):
+    """ETag и 304 для списка и записи без обращения к БД."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.equipment_type = EquipmentType.objects.create(name='TP-Link', serial_number_mask='NNNN')
+        self.equipment = Equipment.objects.create(equipment_type=self.equipment_type, serial_number='0001')
+
+    def test_not_modified(self):
+        for url in ('/api/equipment/', f'/api/equipment/{self.equipment.pk}/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                # Сжатый ответ отдается со слабым ETag, он тоже совпадает
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f"W/{etag}").status_code, 304)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get('/api/equipment/')['ETag']
+        self.assertNotEqual(self.client.get('/api/equipment/', {'ordering': '-id'})['ETag'], etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/equipment/{self.equipment.pk}/', {'note': 'Склад 3'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        response = self.client.get('/api/equipment/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['note'], 'Склад 3')
+
+    @override_settings(RESPONSE_CACHE_ENABLED=True)
+    def test_response_cache(self):
+        first = self.client.get('/api/equipment/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/equipment/')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+
+    @override_settings(CACHE_SINGLE_PROCESS=False, RESPONSE_CACHE_ENABLED=True)
+    def test_disabled_without_shared_versions(self):
+        # Версии в локальном кэше не видят записей других процессов: ни ETag, ни кэша страниц
+        response = self.client.get('/api/equipment/')
+        self.assertNotIn('ETag', response)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/equipment/')
+        self.assertTrue(queries.captured_queries)
+        self.assertEqual(
+            [warning.id for warning in check_shared_versions(None)], ['equipment.W001']
+        )
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache'}}):
+            self.assertEqual(check_shared_versions(None), [])
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True, COMPRESSION_MIN_SIZE=0)
+class CompressionTest(APITestCase):
+    """Сжатие ответов API по Accept-Encoding и заранее сжатая страница SPA."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        equipment_type = EquipmentType.objects.create(name='TP-Link', serial_number_mask='NNNN')
+        Equipment.objects.bulk_create([
+            Equipment(equipment_type=equipment_type, serial_number=f"{i:04d}", note='Склад') for i in range(20)
+        ])
+
+    def test_choose_encoding(self):
+        available = ('br', GZIP)
+        cases = [
+            (None, None),
+            ('gzip', GZIP),
+            ('gzip;q=0', None),
+            ('GZIP; q=0.5, br;q=0.8', 'br'),
+            ('br;q=0.5, gzip', GZIP),
+            ('br, gzip', 'br'),
+            ('*', 'br'),
+            ('*;q=0.3, br;q=0', GZIP),
+            ('*;q=0', None),
+            ('identity, deflate', None),
+        ]
+        for accept_encoding, expected in cases:
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertEqual(choose_encoding(accept_encoding, available), expected)
+
+    def test_gzip_list(self):
+        plain = self.client.get('/api/equipment/')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get('/api/equipment/', HTTP_ACCEPT_ENCODING='gzip;q=0.5, br;q=0')
+        self.assertEqual(response['Content-Encoding'], GZIP)
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        # Сжатый ответ получает слабый ETag, по которому тоже отвечают 304
+        self.assertEqual(response['ETag'], f"W/{plain['ETag']}")
+        response = self.client.get('/api/equipment/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/api/equipment/', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, plain.content)
+
+    def test_gzip_stream(self):
+        plain = b''.join(self.client.get('/api/equipment/export/').streaming_content)
+        response = self.client.get('/api/equipment/export/', HTTP_ACCEPT_ENCODING='*')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], GZIP)
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+        self.assertEqual(plain.count(b'\n'), 21)
+
+    def test_spa_precompressed(self):
+        with tempfile.TemporaryDirectory() as source_dir, tempfile.TemporaryDirectory() as build_dir:
+            with open(os.path.join(source_dir, INDEX), 'w', encoding='utf-8') as f:
+                f.write("<html><style>body { margin: 0; }</style>" + "<p>Оборудование</p>" * 50 + "</html>")
+            with override_settings(SPA_SOURCE_DIR=source_dir, SPA_BUILD_DIR=build_dir):
+                write_build()
+                with open(os.path.join(build_dir, INDEX + '.gz'), 'rb') as f:
+                    precompressed = f.read()
+                client = Client()
+                response = client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Encoding'], GZIP)
+                self.assertEqual(response.content, precompressed)
+                self.assertTrue(response['ETag'].endswith('-gzip"'))
+                self.assertIn('Accept-Encoding', response['Vary'])
+
+                plain = client.get('/', HTTP_ACCEPT_ENCODING='gzip;q=0')
+                self.assertFalse(plain.has_header('Content-Encoding'))
+                self.assertEqual(gzip.decompress(precompressed), plain.content)
+                self.assertIn(b'<link rel="stylesheet" href="/assets/app.', plain.content)
+                # Любой вариант ETag подтверждает закэшированную страницу
+                response = client.get('/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=plain['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class AsyncReadTest(APITestCase):
+    """Асинхронные чтения /api/async/... отвечают так же, как синхронные представления."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.equipment_type = EquipmentType.objects.create(name='TP-Link', serial_number_mask='NNNN')
+        self.equipment = [
+            Equipment.objects.create(equipment_type=self.equipment_type, serial_number=f"{i:04d}", note='Склад')
+            for i in range(3)
+        ]
+        token = EquipmentTokenObtainPairSerializer.get_token(self.user).access_token
+        self.headers = {'Authorization': f"Bearer {token}"}
+
+    async def get(self, path, **headers):
+        return await self.async_client.get(f"/api/async/{path}", headers={**self.headers, **headers})
+
+    async def test_matches_sync(self):
+        paths = [
+            'equipment/',
+            'equipment/?ordering=-serial_number&page_size=2',
+            'equipment/?pagination=cursor&page_size=2',
+            'equipment/?is_deleted=all&fields=id,serial_number',
+            f'equipment/{self.equipment[0].pk}/',
+            'equipment-type/',
+            f'equipment-type/{self.equipment_type.pk}/',
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                response = await self.get(path)
+                self.assertEqual(response.status_code, 200, response.content)
+                expected = await sync_to_async(self.client.get)(f"/api/{path}")
+                self.assertEqual(json.loads(response.content.replace(b'/api/async/', b'/api/')), expected.json())
+
+    async def test_errors_and_not_modified(self):
+        self.assertEqual((await self.get('equipment/999999/')).status_code, 404)
+        self.assertEqual((await self.get('equipment/export/?output=xml')).status_code, 400)
+        self.assertEqual((await self.async_client.get('/api/async/equipment/')).status_code, 401)
+
+        response = await self.get('equipment/')
+        self.assertEqual((await self.get('equipment/', **{'If-None-Match': response['ETag']})).status_code, 304)
+
+    async def test_export(self):
+        response = await self.get('equipment/export/?output=ndjson')
+        self.assertEqual(response.status_code, 200)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(
+            [json.loads(line)['id'] for line in body.splitlines()], [item.pk for item in self.equipment]
+        )
+
+
+class BulkOperationsTest(APITestCase):
+    """Массовое удаление, восстановление и изменение: результат по каждому id."""
+
+    def setUp(self):
+        super().setUp()
+        self.types = [
+            EquipmentType.objects.create(name=name, serial_number_mask='NNNN') for name in ('TP-Link', 'D-Link')
+        ]
+        self.items = [
+            Equipment.objects.create(equipment_type=self.types[i % 2], serial_number=f"{i:04d}") for i in range(4)
+        ]
+        self.ids = [item.pk for item in self.items]
+
+    def statuses(self, response):
+        return {result['id']: result['status'] for result in response.data['results']}
+
+    def test_delete_and_undelete(self):
+        missing = max(self.ids) + 100
+        response = self.client.post('/api/equipment/bulk-delete/', {'ids': [self.ids[0], missing]}, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(self.statuses(response), {self.ids[0]: 'deleted', missing: 'not_found'})
+        response = self.client.post('/api/equipment/bulk-delete/', {'ids': [self.ids[0]]}, format='json')
+        self.assertEqual(self.statuses(response), {self.ids[0]: 'already_deleted'})
+
+        # Номер удаленной записи занят новой: восстановление - конфликт
+        Equipment.objects.create(equipment_type=self.types[0], serial_number='0000')
+        response = self.client.post('/api/equipment/bulk-undelete/', {'ids': [self.ids[0], self.ids[1]]}, format='json')
+        self.assertEqual(self.statuses(response), {self.ids[0]: 'conflict', self.ids[1]: 'not_deleted'})
+        self.assertTrue(Equipment.objects.get(pk=self.ids[0]).is_deleted)
+
+    def test_delete_by_filter(self):
+        self.assertEqual(self.client.post('/api/equipment/bulk-delete/', {}, format='json').status_code, 400)
+        response = self.client.post(
+            f'/api/equipment/bulk-delete/?equipment_type__id={self.types[1].pk}', {}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary'], {'deleted': 2})
+        self.assertEqual(
+            sorted(Equipment.objects.filter(is_deleted=True).values_list('pk', flat=True)), self.ids[1::2]
+        )
+
+    def test_scope_without_filters(self):
+        # Опечатка в имени фильтра, параметр формата и пустой поиск не сужают выборку
+        response = self.client.post('/api/equipment/bulk-delete/?equipment_type_id=999', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('equipment_type_id', response.data['detail'])
+        response = self.client.patch('/api/equipment/bulk-update/?format=json', {'note': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/equipment/bulk-delete/?search=', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Equipment.objects.filter(Q(is_deleted=True) | Q(note='x')).exists())
+
+        response = self.client.post('/api/equipment/bulk-delete/?all=true', {}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary'], {'deleted': 4})
+
+    def test_update(self):
+        response = self.client.patch('/api/equipment/bulk-update/', {'items': [
+            {'id': self.ids[0], 'serial_number': '0100', 'note': 'Склад 3'},
+            {'id': self.ids[1], 'serial_number': 'bad!'},
+            # Номер уже занят записью того же типа
+            {'id': self.ids[2], 'serial_number': '0000'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            self.statuses(response), {self.ids[0]: 'updated', self.ids[1]: 'invalid', self.ids[2]: 'conflict'}
+        )
+        self.assertEqual(
+            list(Equipment.objects.filter(pk__in=self.ids[:3]).order_by('pk').values_list('serial_number', 'note')),
+            [('0100', 'Склад 3'), ('0001', None), ('0002', None)]
+        )
+
+        response = self.client.patch('/api/equipment/bulk-update/', {'ids': self.ids[:2], 'note': 'Склад 4'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Equipment.objects.filter(note='Склад 4').count(), 2)
+
+
+class AvailabilityCheckTest(APITestCase):
+    """Пакетная проверка номеров: действующие, удаленные (и в архиве), не найденные."""
+
+    def setUp(self):
+        super().setUp()
+        self.equipment_type = EquipmentType.objects.create(name='TP-Link', serial_number_mask='NNNN')
+        now = timezone.now()
+        self.active = Equipment.objects.create(equipment_type=self.equipment_type, serial_number='0001')
+        self.deleted = Equipment.objects.create(
+            equipment_type=self.equipment_type, serial_number='0002', is_deleted=True, deleted_at=now
+        )
+        Equipment.objects.create(
+            equipment_type=self.equipment_type, serial_number='0003', is_deleted=True,
+            deleted_at=now - timedelta(days=10)
+        )
+        self.assertEqual(archive_deleted_equipment(now - timedelta(days=1)), 1)
+        self.archived_id = EquipmentRecord.objects.get(serial_number='0003').pk
+
+    def test_check_one_type(self):
+        response = self.client.post('/api/equipment/check/', {
+            'equipment_type_id': self.equipment_type.pk,
+            'serial_numbers': ['0001', '0002', '0003', '0004', 'bad!', '0001'],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary'], {'found': 1, 'deleted': 2, 'not_found': 2, 'invalid': 1})
+        result, = response.data['results']
+        self.assertEqual(result['found'], {'0001': self.active.pk})
+        self.assertEqual(result['deleted'], {'0002': self.deleted.pk, '0003': self.archived_id})
+        self.assertEqual(result['not_found'], ['0004', 'bad!'])
+        self.assertEqual(result['invalid'], ['bad!'])
+
+    def test_check_pairs(self):
+        missing_type = self.equipment_type.pk + 100
+        response = self.client.post('/api/equipment/check/', {
+            'items': [[self.equipment_type.pk, '0001'], [missing_type, '0001']],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        found, missing = response.data['results']
+        self.assertEqual(found['found'], {'0001': self.active.pk})
+        self.assertEqual(missing['equipment_type_id'], missing_type)
+        self.assertIn('error', missing)
+        self.assertEqual(missing['not_found'], ['0001'])
+
+    def test_check_requires_one_form(self):
+        for data in ({}, {'items': [[self.equipment_type.pk, '0001']], 'serial_numbers': ['0001']}):
+            response = self.client.post('/api/equipment/check/', data, format='json')
+            self.assertEqual(response.status_code, 400)
+
+
+@override_settings(BULK_CHUNK_SIZE=2)
+class StreamImportTest(APITestCase):
+    """Потоковый импорт: отчет по частям и итог, в том числе при сбое посреди потока."""
+
+    def setUp(self):
+        super().setUp()
+        self.equipment_type = EquipmentType.objects.create(name='TP-Link', serial_number_mask='NNNN')
+
+    def post_csv(self, body):
+        response = self.client.post('/api/equipment/import/', data=body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def csv_body(self, serial_numbers):
+        lines = ['equipment_type_id,serial_number,note']
+        lines.extend(f"{self.equipment_type.pk},{sn},Склад 3" for sn in serial_numbers)
+        return ('\ufeff' + '\r\n'.join(lines) + '\r\n').encode()
+
+    def test_import(self):
+        reports = self.post_csv(self.csv_body(['0001', '0002', 'bad!']))
+        self.assertEqual([report['created'] for report in reports[:-1]], [2, 0])
+        self.assertEqual(reports[1]['errors'][0]['line'], 4)
+        self.assertEqual(reports[-1], {'done': True, 'chunks': 2, 'rows': 3, 'created': 2, 'errors': 1})
+        self.assertEqual(Equipment.objects.filter(note='Склад 3').count(), 2)
+
+    def test_bad_bytes(self):
+        body = self.csv_body(['0001', '0002', '0003']) + b'1,\xff\xfe,\r\n'
+        reports = self.post_csv(body)
+        self.assertEqual(reports[-1]['done'], False)
+        self.assertEqual((reports[-1]['line'], reports[-1]['failed_chunk']), (5, 2))
+        # Первая часть сохранена, строка 4 из незаконченной части - нет
+        self.assertEqual((reports[-1]['chunks'], reports[-1]['created']), (1, 2))
+        self.assertEqual(Equipment.objects.count(), 2)
+
+    def test_database_error(self):
+        create = create_equipment_items
+        calls = []
+
+        def fail_second_chunk(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                create(*args, **kwargs)
+                raise DatabaseError("сбой")
+            return create(*args, **kwargs)
+
+        with mock.patch('equipment.importing.create_equipment_items', side_effect=fail_second_chunk), \
+                self.assertLogs('equipment.importing', level='ERROR'):
+            reports = self.post_csv(self.csv_body(['0001', '0002', '0003', '0004', '0005']))
+        summary = reports[-1]
+        self.assertEqual((summary['done'], summary['chunks'], summary['failed_chunk']), (False, 1, 2))
+        self.assertIn('error', summary)
+        # Часть с ошибкой откатывается целиком, даже если ее записи уже вставлены
+        self.assertEqual(sorted(Equipment.objects.values_list('serial_number', flat=True)), ['0001', '0002'])
+
+
+class MetricsTest(APITestCase):
+    """Замеры запросов и доступ к /metrics."""
+
+    def setUp(self):
+        super().setUp()
+        metrics_registry.clear()
+
+    @override_settings(METRICS_SAMPLE_RATE=1, METRICS_TOKEN='secret')
+    def test_metrics(self):
+        response = self.client.get('/api/equipment/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        response = Client().get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('view="EquipmentViewSet.list"', response.content.decode())
+        response = Client().get('/metrics', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_closed_without_token(self):
+        self.assertEqual(Client().get('/metrics').status_code, 403)
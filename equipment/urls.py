@@ -1,12 +1,24 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import EquipmentTypeViewSet, EquipmentViewSet
+from .async_views import EquipmentAsyncView, EquipmentTypeAsyncView
+from .views import EquipmentTypeViewSet, EquipmentViewSet, ImportJobViewSet
 
 
 router = DefaultRouter()
 router.register(r'equipment-type', EquipmentTypeViewSet, basename='equipmenttype')
 router.register(r'equipment', EquipmentViewSet, basename='equipment')
+router.register(r'import-jobs', ImportJobViewSet, basename='importjob')
+
+# Асинхронные list/retrieve/export для развертывания под ASGI (core/asgi.py)
+async_urlpatterns = [
+    path('equipment-type/', EquipmentTypeAsyncView.as_view(action='list'), name='equipmenttype-async-list'),
+    path('equipment-type/<int:pk>/', EquipmentTypeAsyncView.as_view(action='retrieve'), name='equipmenttype-async-detail'),
+    path('equipment/', EquipmentAsyncView.as_view(action='list'), name='equipment-async-list'),
+    path('equipment/export/', EquipmentAsyncView.as_view(action='export'), name='equipment-async-export'),
+    path('equipment/<int:pk>/', EquipmentAsyncView.as_view(action='retrieve'), name='equipment-async-detail'),
+]
 
 urlpatterns = [
+    path('async/', include(async_urlpatterns)),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,69 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+# Области, для которых ведется счетчик изменений
+EQUIPMENT = 'equipment'
+EQUIPMENT_TYPE = 'equipment_type'
+
+# Бэкенды кэша, значения которых видит только свой процесс
+LOCAL_CACHE_BACKENDS = frozenset({
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+})
+
+
+def versions_shared():
+    """
+    Общие ли счетчики версий для всех процессов: кэш не локальный или сервер
+    явно работает одним процессом ([Cache] single_process). Иначе запись в одном
+    процессе не меняет версии в других, и ETag, кэш страниц и кэшированные count
+    там остались бы старыми, поэтому они отключаются.
+    """
+    if getattr(settings, 'CACHE_SINGLE_PROCESS', False):
+        return True
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def _key(scope):
+    return f"equipment:version:{scope}"
+
+
+def _initial_version():
+    # Начальное значение от времени: если ключ вытеснен из кэша, новый счетчик
+    # не совпадет ни с одной прежней версией и старые записи не оживут.
+    return int(time.time() * 1000)
+
+
+def get_version(scope):
+    """Текущая версия данных области scope (общая для всех процессов при общем кэше)."""
+    version = cache.get(_key(scope))
+    if version is None:
+        cache.add(_key(scope), _initial_version(), timeout=None)
+        version = cache.get(_key(scope), _initial_version())
+    return version
+
+
+def get_versions(scopes):
+    return tuple(get_version(scope) for scope in scopes)
+
+
+def bump_version(*scopes):
+    """Помечает данные областей как измененные."""
+    for scope in scopes:
+        try:
+            cache.incr(_key(scope))
+        except ValueError:
+            cache.add(_key(scope), _initial_version(), timeout=None)
+
+
+def bump_version_on_commit(*scopes):
+    """
+    Увеличивает версии после фиксации текущей транзакции (вне транзакции - сразу).
+    Иначе читатель из другого процесса мог бы между отметкой и фиксацией
+    закэшировать старые данные уже под новой версией.
+    """
+    transaction.on_commit(lambda: bump_version(*scopes))
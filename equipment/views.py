@@ -1,21 +1,52 @@
-from rest_framework import viewsets, status, generics
+from rest_framework import viewsets, status, generics, mixins
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import TokenAuthentication
-from rest_framework_simplejwt.authentication import JWTAuthentication 
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.settings import api_settings
+from django.conf import settings
+from django.db.models import ProtectedError
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
+from django_filters.utils import translate_validation
 
-from .models import EquipmentType, Equipment
+from .models import EquipmentType, Equipment, ImportJob
+from .export import EXPORT_FORMATS, EXPORT_STREAMS
+from .authentication import EquipmentJWTAuthentication
+from .availability import check_availability
+from .bulk import SUCCESS_RESULTS, soft_delete_equipment, undelete_equipment, update_equipment_items
+from .changes import MAX_LIMIT as CHANGES_MAX_LIMIT, ChangesExpired, ChangesGapAbandoned, parse_cursor, read_changes
+from .conditional import ConditionalResponseMixin
+from .filters import EquipmentFilterBackend, EquipmentFilterSet, IndexedSearchFilter
+from .importing import IMPORT_FORMATS, RECORD_READERS, InputDecodeError, decode_lines, stream_import
+from .lean import ListEncoder
+from .metrics import registry as metrics_registry
+from .pagination import KeysetPagination
+from .ranges import RangeExhausted, create_serial_range, generate_serial_numbers
+from .records import RecordQuerySet
+from .spa import ASSETS_PREFIX, INDEX, serve as serve_spa
+from .stats import get_type_stats
+from . import versions
 from .serializers import (
-    EquipmentTypeSerializer,
+    EquipmentTypeStatsSerializer,
     EquipmentListSerializer,
     EquipmentCreateSerializer,
-    EquipmentUpdateSerializer
+    EquipmentUpdateSerializer,
+    EquipmentBulkIdsSerializer,
+    EquipmentBulkUpdateSerializer,
+    EquipmentCheckSerializer,
+    EquipmentGenerateSerializer,
+    ImportJobCreateSerializer,
+    ImportJobSerializer,
+    ImportJobErrorSerializer
 )
+from .jobs import submit_import_job
+from .registry import type_registry
 
-class EquipmentTypeViewSet(viewsets.ModelViewSet):
+class EquipmentTypeViewSet(ConditionalResponseMixin, viewsets.ModelViewSet):
     """
     API эндпоинт для типов оборудования.
     Поддерживает:
@@ -26,28 +57,52 @@ class EquipmentTypeViewSet(viewsets.ModelViewSet):
     - DELETE (удаление по id)
     """
     queryset = EquipmentType.objects.all()
-    serializer_class = EquipmentTypeSerializer
+    serializer_class = EquipmentTypeStatsSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    # EQUIPMENT - из-за active_count/deleted_count в ответе
+    version_scopes = (versions.EQUIPMENT_TYPE, versions.EQUIPMENT)
+    authentication_classes = [EquipmentJWTAuthentication]
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['id', 'name']
     search_fields = ['name', 'serial_number_mask']
     ordering_fields = ['id', 'name']
+    # Порядок по умолчанию: без него страницы списка не детерминированы
+    ordering = ['id']
+    # Параметры, при которых список можно отдать из реестра типов в памяти
+    registry_list_params = {'page', 'count_mode'}
+
+    def filter_queryset(self, queryset):
+        """
+        Без фильтров, поиска и сортировки список отдается из реестра типов
+        в памяти процесса, без запросов к БД.
+        """
+        if self.action == 'list' and not set(self.request.query_params) - self.registry_list_params:
+            return list(type_registry.all())
+        return super().filter_queryset(queryset)
 
     def destroy(self, request, *args, **kwargs):
         """Удаление записи."""
         # Прежде чем удалять тип, можно добавить проверку, не используется ли он оборудованием
+        # (по статистике типа, без запроса к таблице оборудования)
         instance = self.get_object()
-        if instance.equipments.filter(is_deleted=False).exists():
+        active_count, _ = get_type_stats([instance.pk]).get(instance.pk, (0, 0))
+        if active_count:
             return Response(
                 {"detail": "Нельзя удалить тип оборудования, так как он используется активным оборудованием."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        return super().destroy(request, *args, **kwargs)
+        try:
+            return super().destroy(request, *args, **kwargs)
+        except ProtectedError:
+            # Статистика разошлась с данными или на тип ссылаются удаленные и архивные записи
+            return Response(
+                {"detail": "Нельзя удалить тип оборудования, так как на него ссылаются записи оборудования."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
 
-class EquipmentViewSet(viewsets.ModelViewSet):
+class EquipmentViewSet(ConditionalResponseMixin, viewsets.ModelViewSet):
     """
     API эндпоинт для оборудования.
     Поддерживает:
@@ -56,35 +111,65 @@ class EquipmentViewSet(viewsets.ModelViewSet):
     - POST (создать одно или несколько)
     - PUT (обновить по id)
     - DELETE (мягкое удаление по id)
+    - GET export (потоковая выгрузка CSV/NDJSON с теми же фильтрами)
+    - POST import (потоковая загрузка CSV/NDJSON с отчетом по частям)
+
+    Список по умолчанию отдается постранично (page=N, с count). Курсорный режим
+    без COUNT(*) включается параметром pagination=cursor или передачей cursor:
+    /api/equipment/?pagination=cursor&ordering=serial_number
     """
     serializer_class = EquipmentListSerializer
+    cursor_pagination_class = KeysetPagination
+    version_scopes = (versions.EQUIPMENT, versions.EQUIPMENT_TYPE)
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [EquipmentJWTAuthentication]
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # Поиск и подстрочные фильтры по serial_number/note идут через поисковый индекс
+    filter_backends = [EquipmentFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
     # Для фильтрации по ID типа оборудования: /api/equipment/?equipment_type__id=1
     # Или по имени типа: /api/equipment/?equipment_type__name=TP-Link
-    filterset_fields = {
-        'equipment_type__id': ['exact'],
-        'equipment_type__name': ['exact', 'icontains'],
-        'serial_number': ['exact', 'icontains'],
-        'note': ['icontains'],
-        'is_deleted': ['exact'] # Позволит фильтровать и удаленные, если нужно /api/equipment/?is_deleted=true
-    }
+    filterset_class = EquipmentFilterSet
     search_fields = ['serial_number', 'note', 'equipment_type__name']
     ordering_fields = ['id', 'serial_number', 'equipment_type__name']
+    ordering = ['id']
+
+    # Параметры строки запроса, которые не являются фильтрами
+    non_filter_params = {
+        'page', 'page_size', 'count_mode', 'pagination', 'cursor', 'ordering', 'is_deleted', 'fields', 'shape'
+    }
+    # Параметр, которым массовая операция без ids и фильтров явно применяется ко всем записям
+    bulk_all_param = 'all'
+    # Действия, которые с is_deleted=true|all читают и архив (EquipmentRecord)
+    archive_read_actions = {'list', 'retrieve', 'export'}
 
     def get_queryset(self):
         """
         Переопределяем queryset, чтобы по умолчанию показывать только не удаленное оборудование.
         """
         show_deleted = self.request.query_params.get('is_deleted')
-        if show_deleted == 'true':
-            return Equipment.objects.all().select_related('equipment_type')
-        if show_deleted == 'all':
+        if show_deleted in ('true', 'all'):
+            if self.action in self.archive_read_actions:
+                # Чтение вместе с архивом давно удаленных записей
+                return RecordQuerySet().select_related('equipment_type')
             return Equipment.objects.all().select_related('equipment_type')
         return Equipment.objects.filter(is_deleted=False).select_related('equipment_type')
 
+    @property
+    def paginator(self):
+        """
+        Постраничная пагинация остается режимом по умолчанию (на нее рассчитан SPA),
+        курсорная включается явно.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params if self.request is not None else {}
+            if 'cursor' in params or params.get('pagination') == 'cursor':
+                self._paginator = self.cursor_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def get_serializer_class(self):
         """
         Разные сериализаторы для разных действий.
@@ -93,8 +178,39 @@ class EquipmentViewSet(viewsets.ModelViewSet):
             return EquipmentCreateSerializer
         if self.action in ['update', 'partial_update']:
             return EquipmentUpdateSerializer
+        if self.action == 'generate':
+            return EquipmentGenerateSerializer
+        if self.action == 'check':
+            return EquipmentCheckSerializer
         return EquipmentListSerializer # Для list, retrieve
 
+    def list(self, request, *args, **kwargs):
+        """
+        Список идет быстрым путем equipment/lean.py: values() вместо моделей и
+        сериализатора. Поддерживает ?fields=id,serial_number и ?shape=normalized.
+        """
+        return self.conditional_response(request, lambda: self.lean_list(request), cache_data=True)
+
+    def lean_list(self, request):
+        encoder = ListEncoder.from_request(request)
+        queryset = self.get_list_queryset(encoder)
+        page = self.paginate_queryset(queryset)
+        results, types = encoder.encode(page if page is not None else queryset)
+        if page is None:
+            return Response(results if types is None else {'equipment_types': types, 'results': results})
+        response = self.get_paginated_response(results)
+        if types is not None:
+            response.data['equipment_types'] = types
+        return response
+
+    def get_list_queryset(self, encoder):
+        """Отфильтрованный queryset values() для списка; курсору нужны значения ключей сортировки."""
+        queryset = self.filter_queryset(self.get_queryset())
+        key_fields = ()
+        if isinstance(self.paginator, KeysetPagination):
+            key_fields = [field for field, _ in self.paginator.get_ordering(self.request, self)]
+        return encoder.queryset(queryset, key_fields)
+
     def create(self, request, *args, **kwargs):
         """
         Создание новой(ых) записи(ей) оборудования.
@@ -152,7 +268,343 @@ class EquipmentViewSet(viewsets.ModelViewSet):
         Мягкое удаление записи.
         """
         instance = self.get_object()
-        if instance.is_deleted:
+        if instance.is_deleted or not instance.soft_delete():
             return Response({"detail": "Оборудование уже было удалено."}, status=status.HTTP_400_BAD_REQUEST)
-        instance.soft_delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def get_bulk_ids(self, ids, queryset):
+        """
+        id для массовой операции: из тела запроса или по фильтрам строки запроса
+        (те же, что у списка). Неизвестный параметр - ошибка 400: опечатка в имени
+        фильтра иначе молча расширила бы операцию на всю таблицу. Фильтром считается
+        только значение, которое принял FilterSet, или непустой search. Без id и без
+        фильтров все записи затрагиваются только с all=true, иначе возвращается None.
+        """
+        if ids is not None:
+            return ids
+        params = self.request.query_params
+        filterset = EquipmentFilterBackend().get_filterset(self.request, queryset, self)
+        search_filter = IndexedSearchFilter()
+        known_params = self.non_filter_params | set(filterset.filters) | {
+            search_filter.search_param, api_settings.URL_FORMAT_OVERRIDE, self.bulk_all_param
+        }
+        unknown_params = sorted(set(params) - known_params)
+        if unknown_params:
+            raise serializers.ValidationError(
+                {"detail": f"Неизвестные параметры строки запроса: {', '.join(unknown_params)}."}
+            )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        # is_deleted не сужает выборку: состояние записей задает само действие
+        filtered = any(
+            value not in (None, '') for name, value in filterset.form.cleaned_data.items() if name != 'is_deleted'
+        ) or search_filter.get_search_terms(self.request)
+        if not filtered and params.get(self.bulk_all_param) != 'true':
+            return None
+        return list(self.filter_queryset(queryset).order_by().values_list('pk', flat=True))
+
+    def bulk_response(self, results):
+        """200, если все id обработаны, иначе 207 с причинами по каждому id."""
+        summary = {}
+        for result in results:
+            summary[result["status"]] = summary.get(result["status"], 0) + 1
+        failed = any(result["status"] not in SUCCESS_RESULTS for result in results)
+        return Response(
+            {"summary": summary, "results": results},
+            status=status.HTTP_207_MULTI_STATUS if failed else status.HTTP_200_OK
+        )
+
+    def bulk_ids_or_error(self, queryset):
+        serializer = EquipmentBulkIdsSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        return self.get_bulk_ids(serializer.validated_data.get('ids'), queryset)
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request, *args, **kwargs):
+        """
+        Массовое мягкое удаление.
+        POST /api/equipment/bulk-delete/ {"ids": [1, 2, 3]}
+        POST /api/equipment/bulk-delete/?equipment_type__id=1 (по фильтрам списка)
+        POST /api/equipment/bulk-delete/?all=true (все активные записи)
+        """
+        ids = self.bulk_ids_or_error(Equipment.objects.filter(is_deleted=False))
+        if ids is None:
+            return Response({"detail": "Укажите ids, хотя бы один фильтр или all=true для всех записей."}, status=status.HTTP_400_BAD_REQUEST)
+        return self.bulk_response(soft_delete_equipment(ids))
+
+    @action(detail=False, methods=['post'], url_path='bulk-undelete')
+    def bulk_undelete(self, request, *args, **kwargs):
+        """
+        Массовое восстановление после мягкого удаления.
+        POST /api/equipment/bulk-undelete/ {"ids": [1, 2, 3]}
+        Записи, номер которых уже занят активным оборудованием того же типа,
+        не восстанавливаются и возвращаются со статусом conflict. Записи из
+        архива возвращаются в основную таблицу.
+        """
+        ids = self.bulk_ids_or_error(RecordQuerySet().filter(is_deleted=True))
+        if ids is None:
+            return Response({"detail": "Укажите ids, хотя бы один фильтр или all=true для всех записей."}, status=status.HTTP_400_BAD_REQUEST)
+        return self.bulk_response(undelete_equipment(ids))
+
+    @action(detail=False, methods=['patch'], url_path='bulk-update')
+    def bulk_update(self, request, *args, **kwargs):
+        """
+        Массовое изменение серийных номеров и примечаний активного оборудования.
+        PATCH /api/equipment/bulk-update/ {"items": [{"id": 1, "serial_number": "...", "note": "..."}]}
+        PATCH /api/equipment/bulk-update/ {"ids": [1, 2], "note": "Склад 3"}
+        PATCH /api/equipment/bulk-update/?equipment_type__id=1 {"note": "Склад 3"}
+        Новые номера проверяются по маске и на уникальность, как при создании.
+        """
+        serializer = EquipmentBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if 'items' in data:
+            items = [
+                (item['id'], {key: value for key, value in item.items() if key != 'id'})
+                for item in data['items']
+            ]
+        else:
+            ids = self.get_bulk_ids(data.get('ids'), Equipment.objects.filter(is_deleted=False))
+            if ids is None:
+                return Response({"detail": "Укажите ids, хотя бы один фильтр или all=true для всех записей."}, status=status.HTTP_400_BAD_REQUEST)
+            items = [(pk, {'note': data['note']}) for pk in ids]
+        return self.bulk_response(update_equipment_items(items))
+
+    @action(detail=False, methods=['post'], url_path='generate')
+    def generate(self, request, *args, **kwargs):
+        """
+        Создание оборудования с диапазоном номеров, которые сервер строит по маске сам:
+        POST /api/equipment/generate/
+        {"equipment_type_id": 1, "count": 1000, "start": "00AAAAA0AA", "note": "Партия 7"}
+        Занятые номера пропускаются. С "dry_run": true номера только возвращаются.
+        next_start - номер, с которого продолжать следующую партию.
+        """
+        serializer = EquipmentGenerateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        equipment_type = data['equipment_type']
+        try:
+            if data['dry_run']:
+                serial_numbers, next_start = generate_serial_numbers(
+                    equipment_type, data['count'], data.get('start'), data.get('pattern')
+                )
+                return Response({'serial_numbers': serial_numbers, 'next_start': next_start})
+            created, next_start = create_serial_range(
+                equipment_type, data['count'], data.get('start'), data.get('pattern'), data.get('note')
+            )
+        except RangeExhausted as e:
+            return Response({"detail": str(e), "available": e.available}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            'created': len(created),
+            'first_id': min(obj.pk for obj in created),
+            'last_id': max(obj.pk for obj in created),
+            'serial_numbers': [obj.serial_number for obj in created],
+            'next_start': next_start,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='check')
+    def check(self, request, *args, **kwargs):
+        """
+        Проверка наличия номеров пакетом вместо запроса списка на каждый номер:
+        POST /api/equipment/check/
+        {"items": [[1, "0A1BCDE2FG"], [2, "SN-77"]]}
+        {"equipment_type_id": 1, "serial_numbers": ["0A1BCDE2FG", "0A1BCDE2FH"]}
+        """
+        serializer = EquipmentCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(check_availability(serializer.validated_data['groups']))
+
+    @action(detail=False, methods=['get'])
+    def export(self, request, *args, **kwargs):
+        """
+        Потоковая выгрузка оборудования с теми же фильтрами и поиском, что у списка.
+        GET /api/equipment/export/?output=csv|ndjson&equipment_type__id=1
+        Строки плоские (тип представлен id и именем), идут в порядке id,
+        параметр ordering не учитывается.
+        """
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_STREAMS:
+            return Response(
+                {"detail": f"Неизвестный формат выгрузки '{output}', допустимые: {', '.join(EXPORT_STREAMS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(EXPORT_STREAMS[output](queryset), content_type=EXPORT_FORMATS[output])
+        response['Content-Disposition'] = f'attachment; filename="equipment.{output}"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request, *args, **kwargs):
+        """
+        Лента изменений для инкрементальной синхронизации.
+        GET /api/equipment/changes/?since=0&limit=1000
+        Возвращает изменения после курсора since (по одному на запись, с ее
+        текущим состоянием), курсор для следующего запроса и признак has_more.
+        Курсор помнит пропущенные номера еще не зафиксированных транзакций и
+        перечитывает их (equipment/changes.py).
+        Удаленные записи приходят с "deleted": true; после физического удаления
+        "equipment": null. Фильтры списка не применяются. Ответ 410 означает,
+        что нужна полная синхронизация (since=0): журнал после since уже очищен
+        или пропущенный номер так и не был зафиксирован за gap_timeout_seconds.
+        """
+        try:
+            since, gaps = parse_cursor(request.query_params.get('since'))
+        except ValueError:
+            return Response({"detail": "Параметр since должен быть курсором из предыдущего ответа или числом."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', CHANGES_MAX_LIMIT))
+        except ValueError:
+            return Response({"detail": "Параметр limit должен быть целым числом."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if limit <= 0:
+            return Response({"detail": "Параметр limit должен быть положительным."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            changes, cursor, has_more = read_changes(since, min(limit, CHANGES_MAX_LIMIT), gaps)
+        except ChangesGapAbandoned:
+            return Response({"detail": "Пропущенные номера изменений не были зафиксированы вовремя, часть изменений "
+                                       "могла не дойти: выполните полную синхронизацию с since=0."},
+                            status=status.HTTP_410_GONE)
+        except ChangesExpired:
+            return Response({"detail": "Изменения после указанного курсора удалены, выполните полную синхронизацию с since=0."},
+                            status=status.HTTP_410_GONE)
+        serializer = EquipmentListSerializer(
+            [instance for _, _, _, instance in changes if instance is not None],
+            many=True, context=self.get_serializer_context()
+        )
+        data = iter(serializer.data)
+        results = []
+        for seq, equipment_id, change_action, instance in changes:
+            results.append({
+                "seq": seq,
+                "id": equipment_id,
+                "action": change_action,
+                "deleted": instance is None or instance.is_deleted,
+                "equipment": next(data) if instance is not None else None,
+            })
+        return Response({"changes": results, "cursor": cursor, "has_more": has_more})
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_stream(self, request, *args, **kwargs):
+        """
+        Потоковый импорт оборудования из CSV или NDJSON, типы в одном файле могут быть разными.
+        POST /api/equipment/import/
+        Content-Type: text/csv (заголовок equipment_type_id,serial_number,note)
+                      или application/x-ndjson ({"equipment_type_id": 1, "serial_number": "...", "note": "..."})
+        Формат можно задать и параметром ?input=csv|ndjson.
+
+        Тело читается построчно и обрабатывается частями по bulk_chunk_size строк с
+        теми же проверками, что и при создании. Ответ - NDJSON: отчет по каждой
+        части (созданные, ошибки с номерами строк) и итоговая строка с "done": true.
+        Каждая часть сохраняется одной транзакцией. Строка не в UTF-8 или сбой БД
+        не обрывают ответ: итог приходит с "done": false, error и failed_chunk,
+        части до failed_chunk сохранены.
+        """
+        input_format = request.query_params.get('input')
+        if input_format is None:
+            content_type = (request.content_type or '').split(';')[0].strip().lower()
+            input_format = IMPORT_FORMATS.get(content_type)
+        if input_format not in RECORD_READERS:
+            return Response(
+                {"detail": "Ожидается тело text/csv или application/x-ndjson (или параметр input=csv|ndjson)."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+        # request.stream - исходный поток запроса, DRF не разбирает тело целиком
+        stream = request.stream or []
+        response = StreamingHttpResponse(
+            stream_import(decode_lines(stream), input_format),
+            content_type='application/x-ndjson'
+        )
+        return response
+
+
+class ImportJobViewSet(mixins.CreateModelMixin,
+                       mixins.RetrieveModelMixin,
+                       mixins.ListModelMixin,
+                       viewsets.GenericViewSet):
+    """
+    API эндпоинт для фоновых заданий импорта оборудования.
+    Поддерживает:
+    - POST (поставить задание в очередь, ответ 202 с id задания)
+    - GET (список своих заданий, состояние задания по id)
+    - GET errors (ошибки задания по строкам, с пагинацией)
+    Задания выполняет воркер: python manage.py run_import_worker
+    """
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [EquipmentJWTAuthentication]
+
+    def get_queryset(self):
+        queryset = ImportJob.objects.order_by('-id')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user_id=self.request.user.pk)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return ImportJobCreateSerializer
+        if self.action == 'errors':
+            return ImportJobErrorSerializer
+        return ImportJobSerializer
+
+    def create(self, request, *args, **kwargs):
+        """
+        Тело - JSON как при POST /api/equipment/
+        ({"equipment_type_id": 1, "serial_numbers": [...], "note": "..."})
+        либо поток text/csv / application/x-ndjson как у POST /api/equipment/import/.
+        Задание создается одной транзакцией: при строке не в UTF-8 - ответ 400 без задания.
+        """
+        content_type = (request.content_type or '').split(';')[0].strip().lower()
+        input_format = IMPORT_FORMATS.get(content_type)
+        if input_format is not None:
+            records = RECORD_READERS[input_format](decode_lines(request.stream or []))
+            try:
+                job = submit_import_job(records, user=request.user)
+            except InputDecodeError as e:
+                return Response({"detail": str(e), "line": e.line_num}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            job = serializer.save()
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def errors(self, request, *args, **kwargs):
+        """Ошибки задания в порядке строк."""
+        job = self.get_object()
+        queryset = job.errors.order_by('line', 'id')
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+def metrics_view(request):
+    """
+    GET /metrics - гистограммы замеров запросов в текстовом формате Prometheus.
+    Нужен заголовок Authorization: Bearer <token> с [Metrics] token из settings.ini;
+    пока токен не задан, /metrics закрыт (403): замеры раскрывают устройство API.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return HttpResponse(
+            "/metrics выключен: задайте [Metrics] token в settings.ini.",
+            status=status.HTTP_403_FORBIDDEN, content_type='text/plain; charset=utf-8'
+        )
+    if not constant_time_compare(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED, headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def spa_view(request):
+    """
+    GET / - страница SPA из сборки manage.py build_spa (или из public/index.html,
+    если сборки нет): сжатая по Accept-Encoding, с ETag и перепроверкой через If-None-Match.
+    """
+    return serve_spa(request, INDEX)
+
+
+def spa_asset_view(request, name):
+    """GET /assets/<имя с хешем> - стили и скрипт SPA, кэшируются браузером на год."""
+    return serve_spa(request, ASSETS_PREFIX + name)